@@ -1,15 +1,40 @@
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from datetime import datetime
+from typing import NamedTuple, Optional
 import math
+import threading
+
+# Corpo del testo dei box: si scende fino a MIN_TEXT_SIZE se le colonne non entrano
+TEXT_SIZE = 12
+MIN_TEXT_SIZE = 7
+ORDER_SCALE = 0.75  # la commessa è scritta più piccola (9 pt su 12)
+ELLIPSIS = "\u2026"
+
+# rl_config.useA85 è globale e reportlab lo legge mentre scrive gli stream: i
+# salvataggi da più thread lo cambiano e lo ripristinano uno alla volta
+_A85_LOCK = threading.Lock()
+
+
+class TextLayout(NamedTuple):
+    """Posizioni x delle colonne di testo, relative alla colonna interna del box."""
+    size: int
+    length_x: float
+    mark_x: float
+    order_right: float  # le commesse sono allineate a destra, prima della casella
+    mark_chars: Optional[int]  # marche più lunghe troncate, None se entrano tutte
 
 class CuttingListPDF:
     def __init__(self, filename="cutting_list.pdf", num_columns=3, profilo='MIO PROFILO', commessa='Cxxx'):
         self.profilo = profilo
         self.commessa = commessa
         self.page_width, self.page_height = landscape(A4)
-        self.c = canvas.Canvas(filename, pagesize=landscape(A4))
+        self.c = canvas.Canvas(filename, pagesize=landscape(A4), pageCompression=1)
+        self.date = datetime.now().strftime("%d/%m/%Y")
+        self._forms = set()
         
         # Configurazione colonne
         self.num_columns = max(1, min(num_columns, 4))
@@ -33,6 +58,7 @@ class CuttingListPDF:
         self.max_cuts_per_column = 18
         self.min_column_width = 60*mm
         self.internal_spacing = 5*mm
+        self.column_gap = 2*mm
         
         # Calcoliamo le posizioni X di tutte le colonne
         self.column_positions = []
@@ -45,20 +71,36 @@ class CuttingListPDF:
         self.y = self.page_height - self.margin
         
     def _add_header(self):
-        self.c.setFont("Helvetica-Bold", 14)
-        self.c.drawString(self.margin, self.page_height - 15*mm, "DISTINTA DI TAGLIO")
-        self.c.drawString(self.margin + 60*mm, self.page_height - 15*mm, self.profilo)
-        self.c.drawString(self.page_width - 90*mm, self.page_height - 15*mm, self.commessa)
-        
-        current_date = datetime.now().strftime("%d/%m/%Y")
-        self.c.setFont("Helvetica", 10)
-        self.c.drawString(self.page_width - 60*mm, self.page_height - 15*mm, current_date)
-        
+        self.c.doForm(self._form("PageHeader", self._draw_page_header))
+        self.y = self.page_height - 30*mm
+
+    def _draw_page_header(self):
+        t = self.c.beginText()
+        t.setFont("Helvetica-Bold", 14)
+        for x, text in ((self.margin, "DISTINTA DI TAGLIO"), (self.margin + 60*mm, self.profilo),
+                        (self.page_width - 90*mm, self.commessa)):
+            t.setTextOrigin(x, self.page_height - 15*mm)
+            t.textOut(text)
+        t.setFont("Helvetica", 10)
+        t.setTextOrigin(self.page_width - 60*mm, self.page_height - 15*mm)
+        t.textOut(self.date)
+        self.c.drawText(t)
+
         self.c.line(self.margin, self.page_height - 20*mm,
                    self.page_width - self.margin, self.page_height - 20*mm)
-        
-        self.y = self.page_height - 30*mm
-        
+
+    def _form(self, name, draw, bbox=None):
+        """
+        Form XObject definito al primo uso e poi solo richiamato: intestazione di
+        pagina, cornici dei box con intestazioni di colonna e caselle di spunta.
+        """
+        if name not in self._forms:
+            self.c.beginForm(name, *(bbox or ()))
+            draw()
+            self.c.endForm()
+            self._forms.add(name)
+        return name
+
     def _new_page(self):
         self.c.showPage()
         self.y = self.page_height - self.margin
@@ -82,108 +124,158 @@ class CuttingListPDF:
             return True
         return False
 
+    def _columns(self, cuts, column_width, spacing):
+        """Colonne interne del box: (x relativa, tagli), max_cuts_per_column tagli ciascuna."""
+        return [
+            (col * (column_width + spacing), cuts[start:start + self.max_cuts_per_column])
+            for col, start in enumerate(range(0, len(cuts), self.max_cuts_per_column))
+        ]
+
+    def _checkbox_x(self, column_width):
+        return column_width - 10*mm
+
+    def _text_layout(self, column_width, cuts, has_orders) -> TextLayout:
+        """
+        Colonne dimensionate sulla larghezza misurata delle intestazioni e del testo più
+        largo: LUNGH da sinistra, COMM allineata a destra prima della casella di spunta,
+        MARCA nello spazio in mezzo (a metà colonna se c'è posto). Se non entrano si riduce il corpo del testo e, al
+        minimo, si troncano le marche.
+        """
+        marks = [f"'{mark}'" for _, mark, _ in cuts if mark]
+        orders = [str(order) for _, _, order in cuts if order is not None]
+        length_x = 4*mm
+        order_right = self._checkbox_x(column_width) - self.column_gap
+        for size in range(TEXT_SIZE, MIN_TEXT_SIZE - 1, -1):
+            mark_x = length_x + max(stringWidth("LUNGH", "Helvetica-Bold", size),
+                                    stringWidth("000000", "Helvetica", size)) + self.column_gap
+            mark_limit = order_right
+            if has_orders:
+                order_width = max([stringWidth("COMM", "Helvetica-Bold", size)] +
+                                  [stringWidth(order, "Helvetica", size * ORDER_SCALE) for order in orders])
+                mark_limit -= order_width + self.column_gap
+            mark_width = max([stringWidth("MARCA", "Helvetica-Bold", size)] +
+                             [stringWidth(mark, "Courier-Oblique", size) for mark in marks])
+            # La marca resta a metà colonna quando c'è spazio, altrimenti si avvicina a LUNGH
+            for x in (max(mark_x, column_width/2 - 5*mm), mark_x):
+                if x + mark_width <= mark_limit:
+                    return TextLayout(size, length_x, x, order_right, None)
+        # Courier è a passo fisso: ogni carattere è largo 0.6 volte il corpo
+        mark_chars = max(1, int((mark_limit - mark_x) // (0.6 * MIN_TEXT_SIZE)))
+        return TextLayout(MIN_TEXT_SIZE, length_x, mark_x, order_right, mark_chars)
+
+    def _draw_frame(self, width, height, column_width, columns, has_orders, layout):
+        """Cornice di un box con origine nell'angolo in alto a sinistra."""
+        self.c.rect(0, -height, width, height)
+        header_y = -self.box_top_margin - self.line_height * 1.2
+        first_row_y = header_y - self.line_height * 1.1
+
+        t = self.c.beginText()
+        t.setFont("Helvetica-Bold", layout.size)
+        for column_x, rows in columns:
+            labels = [(layout.length_x, "LUNGH"), (layout.mark_x, "MARCA")]
+            if has_orders:
+                labels.append((layout.order_right - stringWidth("COMM", "Helvetica-Bold", layout.size), "COMM"))
+            for x, label in labels:
+                t.setTextOrigin(column_x + x, header_y)
+                t.textOut(label)
+        self.c.drawText(t)
+
+        for column_x, rows in columns:
+            for row in range(rows):
+                self.c.rect(column_x + self._checkbox_x(column_width), first_row_y - row * self.line_height,
+                            self.checkbox_size, self.checkbox_size)
+
+    def _text_column(self, t, font, size, x, y, values):
+        """Una colonna di testo con interlinea fissa; le righe vuote in coda non vengono scritte."""
+        while values and values[-1] is None:
+            values = values[:-1]
+        if not values:
+            return
+        t.setFont(font, size)
+        t.setLeading(self.line_height)
+        t.setTextOrigin(x, y)
+        for value in values:
+            t.textLine("" if value is None else value)
+
+    def _right_column(self, t, font, size, right, y, values):
+        """Come _text_column, ma con ogni riga allineata a destra su right."""
+        for row, value in enumerate(values):
+            if value is None:
+                continue
+            t.setFont(font, size)
+            t.setTextOrigin(right - stringWidth(value, font, size), y - row * self.line_height)
+            t.textOut(value)
+
+    @staticmethod
+    def _mark_text(mark, mark_chars):
+        text = f"'{mark}'"
+        if mark_chars is not None and len(text) > mark_chars:
+            text = text[:max(1, mark_chars - 2)] + ELLIPSIS + "'"
+        return text
+
     def add_bar_section(self, bar_number, cuts):
+        """cuts: coppie (lunghezza, marca) o terne (lunghezza, marca, commessa)."""
+        cuts = [(cut[0], cut[1], cut[2] if len(cut) > 2 else None) for cut in cuts]
+        has_orders = any(order is not None for _, _, order in cuts)
+
         if len(cuts) <= self.max_cuts_per_column:
-            # Gestione normale per pochi tagli
+            # Un box nella colonna della pagina
+            column_width = self.box_width
+            box_width = self.box_width
             content_height = (len(cuts) * self.line_height) + (2 * self.line_height)
-            total_box_height = content_height + self.box_top_margin + self.box_bottom_margin
-            
-            self._check_space(total_box_height)
-            
-            current_x = self.column_positions[self.current_column]
-            initial_y = self.y
-            
-            # Disegna il box
-            self.c.rect(current_x, self.y - total_box_height, self.box_width, total_box_height)
-            
-            self.y -= self.box_top_margin
-            
-            # Intestazione barra
-            self.c.setFont("Helvetica-Bold", 14)
-            self.c.drawString(current_x + 2*mm, self.y, f"Barra {bar_number}")
-            self.y -= self.line_height * 1.2
-            
-            # Intestazioni colonne
-            self.c.setFont("Helvetica-Bold", 12)
-            self.c.drawString(current_x + 4*mm, self.y, "LUNGH")
-            self.c.drawString(current_x + self.box_width/2 - 5*mm, self.y, "MARCA")
-            self.y -= self.line_height * 1.1
-            
-            # Tagli
-            self.c.setFont("Helvetica", 12)
-            for length, mark in cuts:
-                self.c.drawString(current_x + 4*mm, self.y, f"{length:>6.0f}")
-                
-                if mark:
-                    self.c.setFont("Courier-Oblique", 12)
-                    self.c.drawString(current_x + self.box_width/2 - 5*mm, self.y, f"'{mark}'")
-                    self.c.setFont("Helvetica", 12)
-                
-                self.c.rect(current_x + self.box_width - 10*mm, self.y, 
-                           self.checkbox_size, self.checkbox_size)
-                
-                self.y -= self.line_height
-            
-            self.y = initial_y - total_box_height - 2*mm
-            
+            self._check_space(content_height + self.box_top_margin + self.box_bottom_margin)
         else:
-            # Calcolo del numero di colonne interne necessarie
+            # Box largo con più colonne interne
+            column_width = self.min_column_width
             num_internal_columns = math.ceil(len(cuts) / self.max_cuts_per_column)
-            
-            # Calcolo della larghezza totale necessaria
-            total_box_width = (self.min_column_width * num_internal_columns) + \
-                            (self.internal_spacing * (num_internal_columns - 1))
-            
-            # Calcolo dell'altezza necessaria
+            box_width = (self.min_column_width * num_internal_columns) + \
+                        (self.internal_spacing * (num_internal_columns - 1))
             content_height = (self.max_cuts_per_column * self.line_height) + (2 * self.line_height)
-            total_box_height = content_height + self.box_top_margin + self.box_bottom_margin
-            
-            # Controlliamo se c'è abbastanza spazio
-            self._check_space(total_box_height, total_box_width)
-            
-            current_x = self.column_positions[self.current_column]
-            initial_y = self.y
-            
-            # Disegniamo il box principale
-            self.c.rect(current_x, self.y - total_box_height, 
-                       total_box_width, total_box_height)
-            
-            # Aggiungiamo il titolo della barra
-            self.y -= self.box_top_margin
-            self.c.setFont("Helvetica-Bold", 14)
-            self.c.drawString(current_x + 2*mm, self.y, f"Barra {bar_number}")
-            self.y -= self.line_height * 1.2
-            
-            # Per ogni colonna interna
-            for col in range(num_internal_columns):
-                column_x = current_x + (col * (self.min_column_width + self.internal_spacing))
-                column_y = self.y
-                
-                # Intestazioni colonne
-                self.c.setFont("Helvetica-Bold", 12)
-                self.c.drawString(column_x + 4*mm, column_y, "LUNGH")
-                self.c.drawString(column_x + self.min_column_width/2 - 5*mm, column_y, "MARCA")
-                column_y -= self.line_height * 1.1
-                
-                # Tagli per questa colonna
-                start_idx = col * self.max_cuts_per_column
-                end_idx = min((col + 1) * self.max_cuts_per_column, len(cuts))
-                
-                self.c.setFont("Helvetica", 12)
-                for length, mark in cuts[start_idx:end_idx]:
-                    self.c.drawString(column_x + 4*mm, column_y, f"{length:>6.0f}")
-                    
-                    if mark:
-                        self.c.setFont("Courier-Oblique", 12)
-                        self.c.drawString(column_x + self.min_column_width/2 - 5*mm, column_y, f"'{mark}'")
-                        self.c.setFont("Helvetica", 12)
-                    
-                    self.c.rect(column_x + self.min_column_width - 10*mm, column_y, 
-                              self.checkbox_size, self.checkbox_size)
-                    
-                    column_y -= self.line_height
-            
-            self.y = initial_y - total_box_height - 2*mm
+            self._check_space(content_height + self.box_top_margin + self.box_bottom_margin, box_width)
+        total_box_height = content_height + self.box_top_margin + self.box_bottom_margin
+        columns = self._columns(cuts, column_width, self.internal_spacing)
+        text = self._text_layout(column_width, cuts, has_orders)
+
+        current_x = self.column_positions[self.current_column]
+        initial_y = self.y
+
+        # Cornice, intestazioni e caselle: una sola definizione per layout e numero di tagli
+        layout = "S" if len(cuts) <= self.max_cuts_per_column else "W"
+        name = (f"Frame{layout}{len(columns)}x{len(columns[-1][1])}{'C' if has_orders else ''}"
+                f"_{text.size}_{round(text.mark_x)}")
+        self._form(name, lambda: self._draw_frame(box_width, total_box_height, column_width,
+                                                  [(x, len(rows)) for x, rows in columns], has_orders, text),
+                   (-2, -total_box_height - 2, box_width + 2, 2))
+        self.c.saveState()
+        self.c.translate(current_x, initial_y)
+        self.c.doForm(name)
+        self.c.restoreState()
+
+        # Testo variabile in un solo text object, un cambio di font per colonna
+        t = self.c.beginText()
+        t.setFont("Helvetica-Bold", 14)
+        t.setTextOrigin(current_x + 2*mm, initial_y - self.box_top_margin)
+        t.textOut(f"Barra {bar_number}")
+        first_row_y = initial_y - self.box_top_margin - self.line_height * 1.2 - self.line_height * 1.1
+        for column_x, rows in columns:
+            x = current_x + column_x
+            self._text_column(t, "Helvetica", text.size, x + text.length_x, first_row_y,
+                              [f"{length:>6.0f}" for length, _, _ in rows])
+            self._text_column(t, "Courier-Oblique", text.size, x + text.mark_x, first_row_y,
+                              [self._mark_text(mark, text.mark_chars) if mark else None for _, mark, _ in rows])
+            self._right_column(t, "Helvetica", text.size * ORDER_SCALE, x + text.order_right, first_row_y,
+                               [str(order) if order is not None else None for _, _, order in rows])
+        self.c.drawText(t)
+
+        self.y = initial_y - total_box_height - 2*mm
 
     def save(self):
-        self.c.save()
\ No newline at end of file
+        # Stream solo compressi: la codifica ASCII85 (attiva di default in reportlab)
+        # allunga il file di un quarto e costa metà del tempo di salvataggio
+        with _A85_LOCK:
+            use_a85 = rl_config.useA85
+            rl_config.useA85 = 0
+            try:
+                self.c.save()
+            finally:
+                rl_config.useA85 = use_a85
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Best-fit decreasing con tutte le barre aperte indicizzate per capacità residua.
+
+I pezzi vengono presi dal più lungo e messi nella barra aperta con il residuo
+più piccolo che li contiene. Le barre aperte stanno in una lista ordinata a
+blocchi (residuo, barra): ricerca, rimozione e inserimento costano O(log barre)
+più lo spostamento dentro un blocco di dimensione limitata, quindi l'algoritmo
+regge anche 10^6 pezzi. Una barra il cui residuo è più piccolo del pezzo più
+corto viene chiusa e non entra più nell'indice.
+
+Il modello è quello di StrictCuttingStockOptimizer: dimensione = lunghezza + lama,
+capacità = stock_length + lama.
+"""
+from bisect import bisect_left, insort
+from typing import List, Optional, Sequence, Tuple
+
+EPS = 1e-9
+
+Entry = Tuple[float, int]
+
+
+class ResidualIndex:
+    """Lista ordinata a blocchi di coppie (residuo, barra)."""
+
+    LOAD = 256
+
+    def __init__(self):
+        self._chunks: List[List[Entry]] = []
+        self._maxes: List[Entry] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, entry: Entry):
+        self._size += 1
+        if not self._chunks:
+            self._chunks.append([entry])
+            self._maxes.append(entry)
+            return
+        i = bisect_left(self._maxes, entry)
+        if i == len(self._maxes):
+            i -= 1
+        chunk = self._chunks[i]
+        insort(chunk, entry)
+        self._maxes[i] = chunk[-1]
+        if len(chunk) > 2 * self.LOAD:
+            self._chunks[i:i + 1] = [chunk[:self.LOAD], chunk[self.LOAD:]]
+            self._maxes[i:i + 1] = [chunk[self.LOAD - 1], chunk[-1]]
+
+    def pop_fit(self, size: float) -> Optional[Entry]:
+        """Toglie e restituisce la barra con il residuo minimo >= size, se esiste."""
+        key = (size - EPS, -1)
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return None
+        chunk = self._chunks[i]
+        entry = chunk.pop(bisect_left(chunk, key))
+        self._size -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+        return entry
+
+
+def best_fit_decreasing(sizes: Sequence[float], capacity: float) -> List[List[int]]:
+    """
+    Piano best-fit decreasing. Restituisce le barre come liste di indici dei
+    pezzi, ciascuna in ordine di lunghezza decrescente.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i])
+    if not order:
+        return []
+    smallest = sizes[order[-1]]
+
+    bars: List[List[int]] = []
+    open_bars = ResidualIndex()
+    for i in order:
+        size = sizes[i]
+        entry = open_bars.pop_fit(size)
+        if entry is None:
+            bar, residual = len(bars), capacity
+            bars.append([])
+        else:
+            residual, bar = entry
+        bars[bar].append(i)
+        residual -= size
+        if residual >= smallest - EPS:
+            open_bars.add((residual, bar))
+    return bars
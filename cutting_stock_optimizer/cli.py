@@ -0,0 +1,78 @@
+"""
+Riga di comando per ottimizzare una distinta da Excel o CSV.
+
+Le strategie si scelgono per nome, come in strategies:
+    python cli.py My_profile.xlsx --strategy bfd --joint-strategy none --improve repack
+"""
+import argparse
+import os
+import time
+
+from from_spreadsheet import read_pieces
+from pattern_library import PatternLibrary
+from strategies import available_strategies, get_strategy
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Optimize a cutting list read from an Excel or CSV file")
+    parser.add_argument('input', nargs='?', help="Excel or CSV file: [mark,] quantity, length")
+    parser.add_argument('--stock', type=float, default=12000)
+    parser.add_argument('--blade', type=float, default=2)
+    parser.add_argument('--longer-than', type=float, default=4500)
+    parser.add_argument('--min-waste', type=float, default=100)
+    parser.add_argument('--max-joints', type=int, default=1)
+    parser.add_argument('--length-tolerance', type=float, default=None)
+    parser.add_argument('--strategy', default='greedy', help="pattern strategy (see --list-strategies)")
+    parser.add_argument('--joint-strategy', default='global', help="joint strategy (see --list-strategies)")
+    parser.add_argument('--improve', action='append', default=[], help="improvement strategy, repeatable")
+    parser.add_argument('--timeout', type=float, default=None, help="seconds before returning the best plan so far")
+    parser.add_argument('--library', action='store_true', help="use the pattern library of the profile")
+    parser.add_argument('--profile', default=None, help="profile name (default: input file name)")
+    parser.add_argument('--order', default='Cxxx')
+    parser.add_argument('--pdf', default=None, help="write the cutting list PDF to this path")
+    parser.add_argument('--list-strategies', action='store_true')
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.list_strategies:
+        for family, names in available_strategies().items():
+            print(f"{family}: {', '.join(names)}")
+        return 0
+    if args.input is None:
+        parser.error("the input file is required")
+
+    # Nomi sbagliati vengono segnalati prima di leggere il file
+    try:
+        get_strategy('pattern', args.strategy)
+        get_strategy('joint', args.joint_strategy)
+        for name in args.improve:
+            get_strategy('improve', name)
+    except ValueError as e:
+        parser.error(str(e))
+
+    profile = args.profile or os.path.splitext(os.path.basename(args.input))[0]
+    optimizer = WasteCuttingStockOptimizer(args.stock, args.blade, min_waste=args.min_waste,
+                                           max_joints=args.max_joints, length_tolerance=args.length_tolerance)
+    optimizer.joint_strategy = args.joint_strategy
+    optimizer.improve = args.improve
+    if args.library:
+        optimizer.pattern_library = PatternLibrary(profile, args.stock, args.blade)
+
+    pieces = read_pieces(args.input)
+    deadline = time.monotonic() + args.timeout if args.timeout is not None else None
+    patterns, remaining = optimizer.optimize_with_waste(pieces, args.longer_than, method=args.strategy,
+                                                        deadline=deadline)
+    optimizer.print_solution(patterns, remaining)
+    optimizer.print_summary(patterns, remaining)
+    if args.pdf:
+        optimizer.generate_pdf(args.pdf, profilo=profile, commessa=args.order, num_columns=4)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,30 +1,134 @@
-from typing import List, Tuple, Dict, Union, Optional
+from typing import List, Tuple, Dict, Union, Optional, Iterator, Callable
 from dataclasses import dataclass
-from collections import Counter
+from enum import IntFlag
+import sys
+import time
+import pydoc
+from lower_bounds import bar_lower_bound, optimality_gap
+from exact_solver import ExactSolver, should_use_exact
+from plan_result import PlanResult
+from multistart import multistart_first_fit
+from best_fit import best_fit_decreasing
+from decomposition import decomposed_plan, DEFAULT_CHUNK_SIZE
+from length_classes import LengthClasses
+from strategies import get_strategy
+
+class PieceRole(IntFlag):
+    """Ruolo di un taglio rispetto al pezzo ordinato; i flag si combinano (COMP | JOINT)."""
+    WHOLE = 0
+    FULL = 1    # barra intera di un pezzo sovradimensionato
+    COMP = 2    # complemento di un pezzo sovradimensionato
+    JOINT = 4   # segmento di una giunzione negli scarti
+
 
 @dataclass(frozen=True) 
 class MarkedPiece:
     length: float
     mark: Optional[str] = None
+    order: Optional[str] = None  # commessa di appartenenza, per ottimizzare più ordini insieme
+    role: PieceRole = PieceRole.WHOLE
+    segments: int = 0  # segmenti della giunzione, per i tagli JOINT
+    type_id: Optional[int] = None  # riga dell'ordine da cui viene il pezzo
     
     def __hash__(self):
-        return hash((self.length, self.mark))
+        return hash((self.length, self.mark, self.order, self.role, self.segments, self.type_id))
     
     def __eq__(self, other):
         if not isinstance(other, MarkedPiece):
             return NotImplemented
-        return self.length == other.length and self.mark == other.mark
+        return (self.length == other.length and self.mark == other.mark and self.order == other.order
+                and self.role == other.role and self.segments == other.segments and self.type_id == other.type_id)
+
+    @property
+    def display_mark(self) -> Optional[str]:
+        """Marca per report e PDF: la marca dell'utente seguita dal ruolo (P10/FULL, B/J/2)."""
+        if not self.role:
+            return self.mark
+        parts = [self.mark] if self.mark else []
+        if self.role & PieceRole.FULL:
+            parts.append("FULL")
+        if self.role & PieceRole.COMP:
+            parts.append("COMP")
+        if self.role & PieceRole.JOINT:
+            parts.append(f"J/{self.segments}")
+        return "/".join(parts)
 
 @dataclass
 class CuttingPattern:
     cuts: List[Union[float, MarkedPiece]]
     waste: float
 
+@dataclass(frozen=True)
+class PlanProgress:
+    """Avanzamento restituito da optimize_iter insieme a ogni barra."""
+    bars: int
+    pieces_done: int
+    pieces_total: int
+    lower_bound: int
+
+    @property
+    def fraction(self) -> float:
+        return self.pieces_done / self.pieces_total if self.pieces_total else 1.0
+
 class StrictCuttingStockOptimizer:
-    def __init__(self, stock_length: float, blade_width: float):
+    def __init__(self, stock_length: float, blade_width: float, length_tolerance: Optional[float] = None):
+        """
+        length_tolerance: se impostato, il solutore lavora su classi di lunghezza
+        (0 = stessa lunghezza, > 0 = lunghezze entro la tolleranza, arrotondate per
+        eccesso) e poi riassegna i tagli ai pezzi originali.
+        """
         self.stock_length = stock_length
         self.blade_width = blade_width
+        self.length_tolerance = length_tolerance
+        self.partial = False
+        self.lower_bound = 0
+        self.method_used = None
+        self.result = None
+        self.pieces_total = 0
+        # PatternLibrary opzionale: copre la domanda con pattern già noti e registra i nuovi
+        self.pattern_library = None
+        self.library_bars = 0
+        # Strategie di miglioramento applicate al piano, per nome (vedi strategies)
+        self.improve: List[str] = []
+        # Parametri del metodo 'multistart'
+        self.multistart_starts = 1000
+        self.multistart_seed = 0
+        # Se impostato, riceve i messaggi del solutore invece della console
+        self.log_hook: Optional[Callable[[str], None]] = None
+        # Parametri del metodo 'decompose' (vedi decomposition)
+        self.decompose_chunk_size = DEFAULT_CHUNK_SIZE
+        self.decompose_workers = None
+        self.decompose_engine = 'bfd'
+        # Se True, ogni piano viene verificato con plan_verify e un piano non valido è un errore
+        self.verify_plans = False
+        self._original_pieces = None
+        self._deadline = None
+        self._cancel_token = None
+
+    def _start_clock(self, deadline: Optional[float] = None, cancel_token=None):
+        """
+        deadline: istante assoluto in secondi di time.monotonic() oltre il quale fermarsi.
+        cancel_token: qualsiasi oggetto con is_set(), es. threading.Event.
+        """
+        self.partial = False
+        self._deadline = deadline
+        self._cancel_token = cancel_token
+
+    def _should_stop(self) -> bool:
+        if self.partial:
+            return True
+        if self._cancel_token is not None and self._cancel_token.is_set():
+            self.partial = True
+        elif self._deadline is not None and time.monotonic() >= self._deadline:
+            self.partial = True
+        return self.partial
         
+    def _log(self, text: str):
+        if self.log_hook is not None:
+            self.log_hook(text)
+        else:
+            print(text)
+
     def _calculate_waste(self, cuts: List[Union[float, MarkedPiece]]) -> float:
         if not cuts:
             return self.stock_length
@@ -55,6 +159,10 @@ class StrictCuttingStockOptimizer:
         for piece, _ in sorted_pieces:
             while (remaining[piece] > 0 and 
                    self._can_fit(pattern, piece)):
+                # Con molti pezzi piccoli una sola barra costa molto: la deadline
+                # vale anche qui, e la barra fin qui riempita resta valida
+                if self._should_stop():
+                    return pattern
                 test_pattern = pattern + [piece]
                 new_waste = self._calculate_waste(test_pattern)
                 
@@ -66,11 +174,236 @@ class StrictCuttingStockOptimizer:
                     
         return pattern
     
-    def optimize(self, pieces: List[Union[Tuple[float, int], Tuple[float, int, str]]]) -> Tuple[List[CuttingPattern], Dict[Union[float, MarkedPiece], int]]:
+    def _optimize_greedy(self, remaining_pieces: Dict[Union[float, MarkedPiece], int]) -> List[CuttingPattern]:
+        return list(self._iter_greedy(remaining_pieces))
+
+    def _iter_greedy(self, remaining_pieces: Dict[Union[float, MarkedPiece], int]) -> Iterator[CuttingPattern]:
+        """Il greedy chiude una barra alla volta: ognuna è definitiva appena prodotta."""
+        self.method_used = 'greedy'
+        while any(qty > 0 for qty in remaining_pieces.values()):
+            if self._should_stop():
+                self._log("\nWARNING: Optimization stopped before completion, returning a partial plan.")
+                break
+
+            current_pattern = self._find_best_pattern(remaining_pieces)
+            
+            if not current_pattern:
+                break
+                
+            waste = self._calculate_waste(current_pattern)
+            
+            for piece in current_pattern:
+                remaining_pieces[piece] -= 1
+
+            yield CuttingPattern(current_pattern, waste)
+
+    def _optimize_exact(self, remaining_pieces: Dict[Union[float, MarkedPiece], int], force: bool = False) -> List[CuttingPattern]:
+        """
+        Piano ottimo con ExactSolver. Il greedy fornisce il limite superiore e resta
+        il risultato se il solutore esaurisce il budget o l'ordine è troppo grande.
+        """
+        types = sorted(
+            [(piece, qty) for piece, qty in remaining_pieces.items() if qty > 0],
+            key=lambda x: -(x[0].length if isinstance(x[0], MarkedPiece) else x[0])
+        )
+        lengths = [piece.length if isinstance(piece, MarkedPiece) else piece for piece, _ in types]
+        counts = [qty for _, qty in types]
+
+        if not force and not should_use_exact(lengths, counts, self.stock_length, self.blade_width):
+            return self._optimize_greedy(remaining_pieces)
+
+        greedy_remaining = dict(remaining_pieces)
+        greedy_patterns = self._optimize_greedy(greedy_remaining)
+        if self.partial or len(greedy_patterns) <= self.lower_bound:
+            remaining_pieces.update(greedy_remaining)
+            return greedy_patterns
+
+        solver = ExactSolver(lengths, self.stock_length, self.blade_width, should_stop=self._should_stop)
+        exact_patterns = solver.solve(counts, len(greedy_patterns))
+        if exact_patterns is None:
+            # Si torna al piano greedy, completo; partial resta True se a fermare la
+            # ricerca è stata la deadline o l'annullamento, non il budget di nodi
+            self.method_used = 'greedy'
+            self._log("\nWARNING: Exact search budget exhausted, using the greedy plan.")
+        if not exact_patterns:
+            remaining_pieces.update(greedy_remaining)
+            return greedy_patterns
+
+        self.method_used = 'exact'
+        patterns = []
+        for pattern in exact_patterns:
+            cuts = [piece for (piece, _), used in zip(types, pattern) for _ in range(used)]
+            patterns.append(CuttingPattern(cuts, self._calculate_waste(cuts)))
+            for piece in cuts:
+                remaining_pieces[piece] -= 1
+        return patterns
+
+    def _expand_items(self, remaining_pieces: Dict[Union[float, MarkedPiece], int]) -> Tuple[list, List[float]]:
+        """Un elemento per pezzo da tagliare, con la sua dimensione lama compresa."""
+        items = [piece for piece, qty in remaining_pieces.items() for _ in range(max(qty, 0))]
+        sizes = [(piece.length if isinstance(piece, MarkedPiece) else piece) + self.blade_width for piece in items]
+        return items, sizes
+
+    def _patterns_from_bars(self, items: list, bars: List[List[int]],
+                            remaining_pieces: Dict[Union[float, MarkedPiece], int],
+                            presorted: bool = False) -> List[CuttingPattern]:
+        """
+        Converte le barre (liste di indici in items) in CuttingPattern e aggiorna i pezzi rimasti.
+        presorted: le barre sono già in ordine di lunghezza decrescente.
+        """
+        patterns = []
+        for bar in bars:
+            cuts = [items[i] for i in bar]
+            if not presorted:
+                cuts.sort(key=lambda x: -(x.length if isinstance(x, MarkedPiece) else x))
+            patterns.append(CuttingPattern(cuts, self._calculate_waste(cuts)))
+            for piece in cuts:
+                remaining_pieces[piece] -= 1
+        return patterns
+
+    def _optimize_multistart(self, remaining_pieces: Dict[Union[float, MarkedPiece], int]) -> List[CuttingPattern]:
+        """
+        Miglior first-fit tra multistart_starts ordinamenti perturbati, valutati in
+        blocco con NumPy; a parità di seed il piano è sempre lo stesso.
+        """
+        self.method_used = 'multistart'
+        items, sizes = self._expand_items(remaining_pieces)
+        # Limite dei pezzi da risolvere: con libreria di pattern o classi di lunghezza
+        # non coincide con self.lower_bound, calcolato sull'ordine intero
+        lower_bound = bar_lower_bound(
+            ((piece.length if isinstance(piece, MarkedPiece) else piece, qty) for piece, qty in remaining_pieces.items()),
+            self.stock_length, self.blade_width
+        )
+        plan = multistart_first_fit(sizes, self.stock_length + self.blade_width, self.multistart_starts,
+                                    self.multistart_seed, should_stop=self._should_stop, lower_bound=lower_bound)
+        # Il multi-start valuta sempre almeno un ordinamento completo
+        self.partial = False
+        return self._patterns_from_bars(items, plan, remaining_pieces)
+
+    def _optimize_bfd(self, remaining_pieces: Dict[Union[float, MarkedPiece], int]) -> List[CuttingPattern]:
+        """
+        Best-fit decreasing: a differenza del greedy tiene aperte tutte le barre e
+        mette ogni pezzo in quella con il residuo più piccolo che lo contiene.
+        """
+        self.method_used = 'bfd'
+        items, sizes = self._expand_items(remaining_pieces)
+        bars = best_fit_decreasing(sizes, self.stock_length + self.blade_width)
+        return self._patterns_from_bars(items, bars, remaining_pieces, presorted=True)
+
+    def _optimize_decomposed(self, remaining_pieces: Dict[Union[float, MarkedPiece], int]) -> List[CuttingPattern]:
+        """
+        Ordini molto grandi: blocchi bilanciati di decompose_chunk_size pezzi risolti
+        su decompose_workers processi con decompose_engine, poi le barre di coda
+        di tutti i blocchi vengono riottimizzate insieme.
+        """
+        self.method_used = 'decompose'
+        types = [piece for piece, qty in remaining_pieces.items() if qty > 0]
+        if not types:
+            return []
+        sizes = [(piece.length if isinstance(piece, MarkedPiece) else piece) + self.blade_width for piece in types]
+        bars = decomposed_plan(sizes, [remaining_pieces[piece] for piece in types],
+                               self.stock_length + self.blade_width, self.decompose_chunk_size,
+                               self.decompose_workers, self.decompose_engine)
+        return self._patterns_from_bars(types, bars, remaining_pieces)
+
+    def optimize(self, pieces: List[Union[Tuple[float, int], Tuple[float, int, str]]],
+                 deadline: Optional[float] = None, cancel_token=None,
+                 method: str = 'greedy') -> PlanResult:
+        """
+        pieces: tuple (lunghezza, quantità[, marca[, commessa]]).
+        method: nome di una strategia di pattern registrata in strategies:
+        'greedy' (default), 'exact' per il piano ottimo con branch-and-bound,
+        'auto' per scegliere in base alla dimensione dell'ordine e alla stima dei tempi,
+        'multistart' per il miglior first-fit tra molti ordinamenti (multistart_starts, multistart_seed),
+        'bfd' per il best-fit decreasing su tutte le barre aperte, adatto a ordini molto grandi,
+        'decompose' per dividere ordini enormi in blocchi risolti in parallelo.
+        Il risultato si spacchetta come (patterns, remaining).
+        """
+        self._start_clock(deadline, cancel_token)
+        self._original_pieces = pieces
+        patterns, remaining = self._optimize_pieces(pieces, method)
+        return self._make_result(patterns, remaining)
+
+    def optimize_iter(self, pieces: List[Union[Tuple[float, int], Tuple[float, int, str]]],
+                      deadline: Optional[float] = None, cancel_token=None,
+                      method: str = 'greedy') -> Iterator[Tuple[CuttingPattern, PlanProgress]]:
+        """
+        Come optimize, ma restituisce (pattern, PlanProgress) appena ogni barra è
+        definitiva, così PDF, CSV o interfaccia possono lavorare in parallelo al solutore.
+        Con il greedy le barre escono una alla volta; gli altri metodi le producono
+        tutte alla fine. Terminata l'iterazione il risultato completo è in self.result.
+        """
+        self._start_clock(deadline, cancel_token)
+        self._original_pieces = pieces
+        patterns = []
+        pieces_done = 0
+        iterator = self._iter_pieces(pieces, method)
+        while True:
+            try:
+                pattern = next(iterator)
+            except StopIteration as stop:
+                remaining = stop.value
+                break
+            patterns.append(pattern)
+            pieces_done += len(pattern.cuts)
+            yield pattern, PlanProgress(len(patterns), pieces_done, self.pieces_total, self.lower_bound)
+        self._make_result(patterns, remaining)
+
+    def _result_fields(self) -> Dict:
+        return {'lower_bound': self.lower_bound, 'partial': self.partial, 'method': self.method_used}
+
+    def _make_result(self, patterns: List[CuttingPattern], remaining: Dict[Union[float, MarkedPiece], int]) -> PlanResult:
+        self.result = PlanResult(patterns, remaining, self.stock_length, self.blade_width, **self._result_fields())
+        if self.verify_plans and self._original_pieces is not None:
+            self._verify_result(self.result)
+        if self.pattern_library is not None and not self.result.partial:
+            self.pattern_library.record(self.result.patterns)
+            self.pattern_library.save()
+        return self.result
+
+    def _verify_result(self, result: PlanResult):
+        from plan_verify import verify_plan
+        errors = verify_plan(result, result.remaining, self._original_pieces, self)
+        if errors:
+            raise ValueError("Invalid cutting plan: " + "; ".join(errors))
+
+    def _result_for(self, patterns, remaining) -> PlanResult:
+        """Riusa le statistiche già calcolate se patterns viene dall'ultimo risultato."""
+        if isinstance(patterns, PlanResult):
+            return patterns
+        if self.result is not None and patterns is self.result.patterns:
+            return self.result
+        return PlanResult(patterns, remaining, self.stock_length, self.blade_width, **self._result_fields())
+
+    def _optimize_pieces(self, pieces, method: str = 'greedy') -> Tuple[List[CuttingPattern], Dict[Union[float, MarkedPiece], int]]:
+        patterns = []
+        iterator = self._iter_pieces(pieces, method)
+        while True:
+            try:
+                patterns.append(next(iterator))
+            except StopIteration as stop:
+                return patterns, stop.value
+
+    def _run_engine(self, method: str, remaining_pieces: Dict[Union[float, MarkedPiece], int]) -> Iterator[CuttingPattern]:
+        """Strategia di pattern registrata come method, seguita dalle strategie di self.improve."""
+        patterns = get_strategy('pattern', method)(self, remaining_pieces)
+        if not self.improve:
+            return iter(patterns)
+        # Il miglioramento lavora sul piano completo: le barre escono alla fine
+        patterns = list(patterns)
+        for name in self.improve:
+            patterns = get_strategy('improve', name)(self, patterns)
+        return iter(patterns)
+
+    def _iter_pieces(self, pieces, method: str = 'greedy') -> Iterator[CuttingPattern]:
+        """Produce le barre del metodo scelto; il valore di ritorno sono i pezzi rimasti."""
         # Convert input pieces to MarkedPiece if mark is provided
         processed_pieces = []
         for piece in pieces:
-            if len(piece) == 3:
+            if len(piece) == 4:
+                length, qty, mark, order = piece
+                processed_pieces.append((MarkedPiece(length, mark, order), qty))
+            elif len(piece) == 3:
                 length, qty, mark = piece
                 processed_pieces.append((MarkedPiece(length, mark), qty))
             else:
@@ -83,85 +416,125 @@ class StrictCuttingStockOptimizer:
         ]
         
         if too_long_pieces:
-            print("\nWARNING: The following pieces are too long to fit into the stock and will be skipped:")
+            self._log("\nWARNING: The following pieces are too long to fit into the stock and will be skipped:")
             for piece in too_long_pieces:
                 length = piece.length if isinstance(piece, MarkedPiece) else piece
-                print(f"  - Length: {length:.2f}mm")
+                self._log(f"  - Length: {length:.2f}mm")
         
         filtered_pieces = [
             (piece, qty) for piece, qty in processed_pieces
             if (piece.length if isinstance(piece, MarkedPiece) else piece) <= self.stock_length
         ]
         
-        remaining_pieces = dict(filtered_pieces)
-        patterns = []
+        # Righe ripetute con lo stesso pezzo sommano le quantità invece di sovrascriverle
+        remaining_pieces = {}
+        for piece, qty in filtered_pieces:
+            remaining_pieces[piece] = remaining_pieces.get(piece, 0) + qty
+        self.pieces_total = sum(qty for qty in remaining_pieces.values() if qty > 0)
+        self.lower_bound = bar_lower_bound(
+            ((piece.length if isinstance(piece, MarkedPiece) else piece, qty) for piece, qty in filtered_pieces),
+            self.stock_length, self.blade_width
+        )
         
-        while any(qty > 0 for qty in remaining_pieces.values()):
-            current_pattern = self._find_best_pattern(remaining_pieces)
-            
-            if not current_pattern:
-                break
-                
-            waste = self._calculate_waste(current_pattern)
-            patterns.append(CuttingPattern(current_pattern, waste))
-            
-            for piece in current_pattern:
-                remaining_pieces[piece] -= 1
+        self.library_bars = 0
+        if self.pattern_library is not None:
+            for cuts in self.pattern_library.cover(remaining_pieces):
+                self.library_bars += 1
+                yield CuttingPattern(cuts, self._calculate_waste(cuts))
+
+        if self.length_tolerance is None:
+            yield from self._run_engine(method, remaining_pieces)
+        else:
+            classes = LengthClasses(remaining_pieces, self.length_tolerance)
+            for pattern in self._run_engine(method, dict(classes.classes)):
+                cuts = classes.restore_cuts(pattern.cuts)
+                yield CuttingPattern(cuts, self._calculate_waste(cuts))
+            remaining_pieces = classes.remaining()
 
         for piece, qty in processed_pieces:
             if (piece.length if isinstance(piece, MarkedPiece) else piece) > self.stock_length:
                 remaining_pieces[piece] = qty
                 
-        return patterns, remaining_pieces
+        return remaining_pieces
     
-    def print_solution(self, patterns: List[CuttingPattern], remaining: Dict[Union[float, MarkedPiece], int]):
-        if not patterns:
+    def _write_report(self, lines: List[str], output_widget=None, max_lines: Optional[int] = None, pager: bool = False):
+        """
+        Scrive un report già composto con una sola scrittura su console e un solo
+        insert sul widget tkinter. max_lines tronca i report lunghi, pager li
+        mostra a pagine sulla console (pydoc.pager).
+        """
+        text = "\n".join(lines)
+        if max_lines is not None:
+            rendered = text.split("\n")
+            if len(rendered) > max_lines:
+                hidden = len(rendered) - max_lines
+                text = "\n".join(rendered[:max_lines] + [f"... {hidden} more lines not shown"])
+        text += "\n"
+
+        if pager:
+            pydoc.pager(text)
+        else:
+            sys.stdout.write(text)  # Stampa sempre su console
+
+        if output_widget:
+            try:
+                output_widget.configure(state='normal')
+                output_widget.insert('end', text)
+                output_widget.configure(state='disabled')
+                output_widget.see('end')
+            except Exception as e:
+                print(f"Errore nella visualizzazione su widget: {e}")
+
+    def print_solution(self, patterns: List[CuttingPattern], remaining: Dict[Union[float, MarkedPiece], int],
+                       max_lines: Optional[int] = None, pager: bool = False):
+        result = self._result_for(patterns, remaining)
+        if not result.patterns:
             print("\nNo solution found!")
             return
-            
-        print(f"\nOptimized Cutting Solution:")
-        print(f"Stock Length: {self.stock_length}mm")
-        print(f"Blade Width: {self.blade_width}mm")
-        print("\nCutting Patterns:")
-        
-        total_waste = 0
-        piece_counts = Counter()
+
+        lines = [f"\nOptimized Cutting Solution:"]
+        lines.append(f"Stock Length: {self.stock_length}mm")
+        lines.append(f"Blade Width: {self.blade_width}mm")
+        lines.append("\nCutting Patterns:")
         
-        for i, pattern in enumerate(patterns, 1):
-            total_waste += pattern.waste
-            for cut in pattern.cuts:
-                piece_counts[cut.length if isinstance(cut, MarkedPiece) else cut] += 1
-                
-            print(f"\nBar {i}:")
+        for i, pattern in enumerate(result.patterns, 1):
+            lines.append(f"\nBar {i}:")
             cuts_str = []
             for cut in pattern.cuts:
                 if isinstance(cut, MarkedPiece):
-                    cuts_str.append(f"{cut.length:.2f}({cut.mark})")
+                    cuts_str.append(f"{cut.length:.2f}({cut.display_mark})")
                 else:
                     cuts_str.append(f"{cut:.2f}")
-            print(f"  Cuts: {cuts_str}")
-            print(f"  Number of cuts: {len(pattern.cuts)}")
-            print(f"  Waste: {pattern.waste:.2f}mm")
-            print(f"  Usage: {((self.stock_length - pattern.waste) / self.stock_length * 100):.1f}%")
+            lines.append(f"  Cuts: {cuts_str}")
+            lines.append(f"  Number of cuts: {len(pattern.cuts)}")
+            lines.append(f"  Waste: {pattern.waste:.2f}mm")
+            lines.append(f"  Usage: {result.usage[i - 1] * 100:.1f}%")
         
-        print(f"\nSummary:")
-        print(f"Total bars needed: {len(patterns)}")
-        print(f"Total waste: {total_waste:.2f}mm")
-        print(f"Average waste per bar: {(total_waste/len(patterns)):.2f}mm")
-        print(f"Overall material usage: {((len(patterns)*self.stock_length - total_waste)/(len(patterns)*self.stock_length) * 100):.1f}%")
+        lines.append(f"\nSummary:")
+        if result.partial:
+            lines.append("WARNING: Partial plan, the optimization was stopped early.")
+        lines.append(f"Total bars needed: {result.bar_count}")
+        lines.append(f"Total waste: {result.total_waste:.2f}mm")
+        lines.append(f"Average waste per bar: {result.average_waste:.2f}mm")
+        lines.append(f"Overall material usage: {result.total_usage * 100:.1f}%")
+        gap, gap_pct = optimality_gap(result.bar_count, result.lower_bound)
+        lines.append(f"Lower bound: {result.lower_bound} bars")
+        lines.append(f"Optimality gap: {gap} bars ({gap_pct:.1f}%)")
         
-        print("\nPiece counts:")
-        for length, count in sorted(piece_counts.items()):
-            print(f"  Length {length:.2f}mm: {count} pieces")
+        lines.append("\nPiece counts:")
+        for length, count in sorted(result.cut_counts.items()):
+            lines.append(f"  Length {length:.2f}mm: {count} pieces")
             
-        if any(qty > 0 for qty in remaining.values()):
-            print("\nWARNING - Remaining pieces that couldn't be fit:")
-            for piece, qty in remaining.items():
+        if result.remaining_count:
+            lines.append("\nWARNING - Remaining pieces that couldn't be fit:")
+            for piece, qty in result.remaining.items():
                 if qty > 0:
                     if isinstance(piece, MarkedPiece):
-                        print(f"  Length {piece.length:.2f}mm (Mark: {piece.mark}): {qty} pieces")
+                        lines.append(f"  Length {piece.length:.2f}mm (Mark: {piece.display_mark}): {qty} pieces")
                     else:
-                        print(f"  Length {piece:.2f}mm: {qty} pieces")
+                        lines.append(f"  Length {piece:.2f}mm: {qty} pieces")
+
+        self._write_report(lines, max_lines=max_lines, pager=pager)
 
 
 # Example usage
@@ -177,5 +550,5 @@ if __name__ == "__main__":
     ]
     
     optimizer = StrictCuttingStockOptimizer(stock_length, blade_width)
-    patterns, remaining = optimizer.optimize(pieces)
-    optimizer.print_solution(patterns, remaining)
\ No newline at end of file
+    result = optimizer.optimize(pieces)
+    optimizer.print_solution(*result)
\ No newline at end of file
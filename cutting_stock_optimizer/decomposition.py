@@ -0,0 +1,129 @@
+"""
+Decomposizione a blocchi per ordini molto grandi.
+
+La domanda viene divisa in blocchi bilanciati: ogni tipo di pezzo è ripartito
+tra i blocchi in proporzione, così ogni blocco ha lo stesso mix di lunghezze
+dell'ordine intero. Ogni blocco viene risolto in un processo separato
+ricevendo solo le dimensioni dei tipi e i conteggi, non i pezzi.
+
+Alla fine ogni blocco lascia qualche barra di coda ancora aperta (residuo
+sufficiente per il pezzo più corto). Le barre di coda di tutti i blocchi
+vengono svuotate e i loro pezzi riottimizzati insieme: la perdita rispetto a
+una soluzione unica resta limitata alle code, che sono poche per blocco.
+
+Il modello è quello di StrictCuttingStockOptimizer: dimensione = lunghezza + lama,
+capacità = stock_length + lama. Le barre restituite sono liste di indici di tipo.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+from best_fit import best_fit_decreasing
+from multistart import multistart_first_fit
+
+EPS = 1e-9
+
+# Pezzi per blocco sotto i quali non conviene dividere
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _solve_bfd(sizes: Sequence[float], capacity: float) -> List[List[int]]:
+    return best_fit_decreasing(sizes, capacity)
+
+
+def _solve_multistart(sizes: Sequence[float], capacity: float) -> List[List[int]]:
+    return multistart_first_fit(sizes, capacity, n_starts=64)
+
+
+CHUNK_ENGINES = {
+    'bfd': _solve_bfd,
+    'multistart': _solve_multistart,
+}
+
+
+def split_counts(counts: Sequence[int], n_chunks: int) -> List[List[int]]:
+    """
+    Ripartisce i conteggi per tipo in n_chunks blocchi. Ogni tipo dà a ogni
+    blocco la sua quota intera; i resti vanno ai blocchi a rotazione, partendo
+    da dove si era fermato il tipo precedente, così i blocchi differiscono al
+    più di un pezzo.
+    """
+    chunks = [[0] * len(counts) for _ in range(n_chunks)]
+    offset = 0
+    for t, qty in enumerate(counts):
+        base, extra = divmod(max(qty, 0), n_chunks)
+        for c in range(n_chunks):
+            chunks[c][t] = base
+        for k in range(extra):
+            chunks[(offset + k) % n_chunks][t] += 1
+        offset = (offset + extra) % n_chunks
+    return chunks
+
+
+def _solve_chunk(type_sizes: Sequence[float], counts: Sequence[int], capacity: float,
+                 engine: str) -> List[List[int]]:
+    """Risolve un blocco; le barre tornano come liste di indici di tipo."""
+    types = [t for t, qty in enumerate(counts) for _ in range(qty)]
+    bars = CHUNK_ENGINES[engine]([type_sizes[t] for t in types], capacity)
+    return [[types[i] for i in bar] for bar in bars]
+
+
+def _residual(bar: Sequence[int], type_sizes: Sequence[float], capacity: float) -> float:
+    return capacity - sum(type_sizes[t] for t in bar)
+
+
+def merge_tails(chunk_bars: List[List[List[int]]], type_sizes: Sequence[float],
+                capacity: float) -> List[List[int]]:
+    """
+    Unisce le barre dei blocchi. Le barre di coda (residuo >= pezzo più corto)
+    vengono riottimizzate insieme con il best-fit decreasing; il nuovo piano
+    delle code sostituisce il vecchio solo se non usa più barre.
+    """
+    smallest = min(type_sizes)
+    full, tails = [], []
+    for bars in chunk_bars:
+        for bar in bars:
+            if _residual(bar, type_sizes, capacity) >= smallest - EPS:
+                tails.append(bar)
+            else:
+                full.append(bar)
+    if len(tails) < 2:
+        return full + tails
+
+    types = [t for bar in tails for t in bar]
+    repacked = best_fit_decreasing([type_sizes[t] for t in types], capacity)
+    if len(repacked) <= len(tails):
+        tails = [[types[i] for i in bar] for bar in repacked]
+    return full + tails
+
+
+def decomposed_plan(type_sizes: Sequence[float], counts: Sequence[int], capacity: float,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None,
+                    engine: str = 'bfd') -> List[List[int]]:
+    """
+    Piano per blocchi. type_sizes e counts descrivono i tipi di pezzo
+    (dimensione con la lama, quantità). Con un solo blocco o un solo worker
+    i blocchi vengono risolti nel processo corrente.
+    """
+    if engine not in CHUNK_ENGINES:
+        expected = ", ".join(f"'{key}'" for key in CHUNK_ENGINES)
+        raise ValueError(f"Unknown chunk engine '{engine}', expected one of {expected}")
+    total = sum(max(qty, 0) for qty in counts)
+    if total == 0:
+        return []
+
+    n_chunks = max(1, math.ceil(total / max(chunk_size, 1)))
+    chunks = split_counts(counts, n_chunks)
+    workers = min(workers or os.cpu_count() or 1, n_chunks)
+
+    if workers <= 1:
+        chunk_bars = [_solve_chunk(type_sizes, chunk, capacity, engine) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_solve_chunk, list(type_sizes), chunk, capacity, engine) for chunk in chunks]
+            chunk_bars = [future.result() for future in futures]
+
+    if n_chunks == 1:
+        return chunk_bars[0]
+    return merge_tails(chunk_bars, type_sizes, capacity)
@@ -0,0 +1,177 @@
+"""
+Solutore esatto per ordini piccoli e medi.
+
+Branch-and-bound barra per barra sugli stati "quantità residue per lunghezza":
+- ogni barra contiene il pezzo più lungo rimasto e non può accogliere altri
+  pezzi (pattern massimali): le altre barre sono dominate;
+- i sottoproblemi sono memorizzati con il loro valore esatto o con il limite
+  inferiore dimostrato, così ogni stato viene esplorato al più una volta per limite;
+- il limite L2 (vedi lower_bounds) pota i rami che non possono migliorare.
+
+Il modello è quello di StrictCuttingStockOptimizer: dimensione = lunghezza + lama,
+capacità = stock_length + lama.
+"""
+import math
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lower_bounds import EPS, bar_lower_bound, l2_bound
+
+State = Tuple[int, ...]
+Pattern = Tuple[int, ...]
+
+# Oltre queste soglie il dispatcher sceglie l'euristica
+EXACT_MAX_PIECES = 300
+EXACT_MAX_ESTIMATE = 100_000_000
+EXACT_NODE_LIMIT = 20_000
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def estimate_exact_cost(lengths: Sequence[float], counts: Sequence[int], stock_length: float, blade_width: float) -> float:
+    """
+    Stima grossolana del lavoro: nodi esplorati (il minore tra il numero di stati
+    distinti e la ramificazione dei pattern elevata alla profondità) per i pattern
+    da enumerare in ogni nodo. I pattern di una barra sono al più i multinsiemi di
+    al più k pezzi da d tipi, C(k + d, d), e al più il prodotto dei (pezzi che
+    entrano + 1) di ogni tipo.
+    """
+    capacity = stock_length + blade_width
+    log_states = sum(math.log(count + 1) for count in counts)
+    fits = [min(count, int(capacity // (length + blade_width))) for length, count in zip(lengths, counts)]
+    per_bar = sum(fits)
+    bars = bar_lower_bound(zip(lengths, counts), stock_length, blade_width)
+    log_tree = bars * math.log(max(per_bar, 2))
+
+    types = sum(1 for count in counts if count > 0)
+    most = min(per_bar, int(capacity // (min(lengths) + blade_width))) if types else 0
+    log_multisets = math.lgamma(most + types + 1) - math.lgamma(most + 1) - math.lgamma(types + 1)
+    log_patterns = min(sum(math.log(fit + 1) for fit in fits), log_multisets)
+    return math.exp(min(min(log_states, log_tree) + log_patterns, 700.0))
+
+
+def should_use_exact(lengths: Sequence[float], counts: Sequence[int], stock_length: float, blade_width: float,
+                     max_pieces: int = EXACT_MAX_PIECES, max_estimate: float = EXACT_MAX_ESTIMATE) -> bool:
+    if sum(counts) > max_pieces:
+        return False
+    return estimate_exact_cost(lengths, counts, stock_length, blade_width) <= max_estimate
+
+
+class ExactSolver:
+    def __init__(self, lengths: Sequence[float], stock_length: float, blade_width: float,
+                 node_limit: int = EXACT_NODE_LIMIT, should_stop: Optional[Callable[[], bool]] = None):
+        """lengths: lunghezze dei tipi di pezzo, ordinate in modo decrescente."""
+        self.lengths = list(lengths)
+        self.sizes = [length + blade_width for length in self.lengths]
+        self.stock_length = stock_length
+        self.blade_width = blade_width
+        self.capacity = stock_length + blade_width
+        self.node_limit = node_limit
+        self.should_stop = should_stop
+        self.nodes = 0
+        self._exact: Dict[State, int] = {}
+        self._known_lb: Dict[State, int] = {}
+        self._choice: Dict[State, Pattern] = {}
+
+    def _lower_bound(self, state: State, limit: int) -> int:
+        # L1 costa O(d): L2 solo se L1 non basta già a potare
+        total = sum(size * count for size, count in zip(self.sizes, state))
+        bound = max(0, math.ceil(total / self.capacity - EPS))
+        if bound > limit:
+            return bound
+        return max(bound, l2_bound(zip(self.lengths, state), self.stock_length, self.blade_width))
+
+    def _charge(self):
+        """Conta un'unità di lavoro (nodo o pattern generato) contro budget e deadline."""
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise _BudgetExceeded()
+        if self.should_stop is not None and self.nodes % 256 == 0 and self.should_stop():
+            raise _BudgetExceeded()
+
+    def _maximal_patterns(self, state: State) -> Iterator[Pattern]:
+        """
+        Pattern massimali che contengono il pezzo più lungo rimasto, generati uno alla
+        volta dal più pieno per ogni tipo: con molti tipi sono troppi per elencarli
+        tutti, e ogni pattern generato conta nel budget di nodi.
+        """
+        n = len(state)
+        first = next(i for i, count in enumerate(state) if count > 0)
+        current = [0] * n
+
+        def extend(i: int, residual: float) -> Iterator[Pattern]:
+            if i == n:
+                self._charge()
+                if current[first] == 0:
+                    return
+                # Massimale: nessun pezzo rimasto entra nello spazio residuo
+                for j in range(n):
+                    if state[j] - current[j] > 0 and self.sizes[j] <= residual + EPS:
+                        return
+                yield tuple(current)
+                return
+            if state[i] == 0:
+                yield from extend(i + 1, residual)
+                return
+            fit = min(state[i], int((residual + EPS) // self.sizes[i]))
+            low = 1 if i == first else 0
+            for count in range(fit, low - 1, -1):
+                current[i] = count
+                yield from extend(i + 1, residual - count * self.sizes[i])
+            current[i] = 0
+
+        return extend(first, self.capacity)
+
+    def _solve(self, state: State, limit: int) -> int:
+        """Valore ottimo di state se <= limit, altrimenti un limite inferiore > limit."""
+        if not any(state):
+            return 0
+        if state in self._exact:
+            return self._exact[state]
+
+        bound = self._known_lb.get(state, 0)
+        if bound > limit:
+            return bound
+        bound = max(bound, self._lower_bound(state, limit))
+        if bound > limit:
+            return bound
+
+        self._charge()
+
+        best = limit + 1
+        for pattern in self._maximal_patterns(state):
+            child = tuple(count - used for count, used in zip(state, pattern))
+            value = 1 + self._solve(child, min(limit, best - 1) - 1)
+            if value < best:
+                best = value
+                self._choice[state] = pattern
+                if best <= bound:
+                    break
+
+        if best <= limit:
+            self._exact[state] = best
+        else:
+            self._known_lb[state] = max(self._known_lb.get(state, 0), limit + 1)
+        return best
+
+    def solve(self, counts: Sequence[int], upper_bound: int) -> Optional[List[Pattern]]:
+        """
+        Cerca un piano con meno di upper_bound barre.
+        Restituisce i pattern ottimi, [] se upper_bound è già ottimo,
+        None se il budget di nodi o la deadline si esauriscono.
+        """
+        state = tuple(counts)
+        try:
+            value = self._solve(state, upper_bound - 1)
+        except _BudgetExceeded:
+            return None
+        if value >= upper_bound:
+            return []
+
+        patterns = []
+        while any(state):
+            pattern = self._choice[state]
+            patterns.append(pattern)
+            state = tuple(count - used for count, used in zip(state, pattern))
+        return patterns
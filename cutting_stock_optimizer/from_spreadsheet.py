@@ -2,12 +2,6 @@ import pandas as pd
 import os
 from waste_cutting_optimizer import WasteCuttingStockOptimizer
 
-folder_path = r"C:\Users\FEDERICO\Documents\Python_Scripts\Projects\GitHub\Ottimizzazione taglio\examples"
-file_name = 'My_profile.xlsx'
-file_path = os.path.join(folder_path, file_name)
-
-df = pd.read_excel(file_path, header=None, dtype=str)
-    
 def clean_number(value):
     """Converte un numero formattato con il punto come separatore delle migliaia in un intero."""
     try:
@@ -34,25 +28,38 @@ def excel_to_raw_data(df):
 
     return pieces
 
+def read_pieces(file_path):
+    """Legge i pezzi da un foglio Excel o da un CSV con la stessa struttura di colonne."""
+    if file_path.lower().endswith('.csv'):
+        df = pd.read_csv(file_path, header=None, dtype=str)
+    else:
+        df = pd.read_excel(file_path, header=None, dtype=str)
+    return excel_to_raw_data(df)
+
+
+if __name__ == '__main__':
+    folder_path = r"C:\Users\FEDERICO\Documents\Python_Scripts\Projects\GitHub\Ottimizzazione taglio\examples"
+    file_name = 'My_profile.xlsx'
+    file_path = os.path.join(folder_path, file_name)
 
-longer_than = 4500
-stock_length = 12000
-blade_width = 2
+    longer_than = 4500
+    stock_length = 12000
+    blade_width = 2
 
-pieces = excel_to_raw_data(df) 
+    pieces = read_pieces(file_path)
 
-#print('Pezzi da tagliare:', pieces)
-cuts = WasteCuttingStockOptimizer(stock_length, blade_width, max_joints=1)
+    #print('Pezzi da tagliare:', pieces)
+    cuts = WasteCuttingStockOptimizer(stock_length, blade_width, max_joints=1)
 
-patterns, remaining = cuts.optimize_with_waste(pieces, longer_than)
+    patterns, remaining = cuts.optimize_with_waste(pieces, longer_than)
 
-cuts.print_solution(patterns, remaining)
-cuts.print_summary(patterns, remaining)
-order = 'Ord #1'
-if '.' in file_name:
-    last_dot_id = file_name.rfind(".")
-    profile_name = file_name[:last_dot_id]
-    bom_name = f"Distinta_{profile_name}.pdf"
+    cuts.print_solution(patterns, remaining)
+    cuts.print_summary(patterns, remaining)
+    order = 'Ord #1'
+    if '.' in file_name:
+        last_dot_id = file_name.rfind(".")
+        profile_name = file_name[:last_dot_id]
+        bom_name = f"Distinta_{profile_name}.pdf"
 
 
-cuts.generate_pdf(os.path.join(folder_path, bom_name), profilo=profile_name, commessa=order, num_columns=4)
+    cuts.generate_pdf(os.path.join(folder_path, bom_name), profilo=profile_name, commessa=order, num_columns=4)
@@ -0,0 +1,70 @@
+"""
+Riduzione dell'ordine a classi di lunghezza prima dell'ottimizzazione.
+
+Righe con la stessa lunghezza (anche con marche o commesse diverse) o con
+lunghezze entro una tolleranza finiscono nella stessa classe. La classe prende
+la lunghezza massima dei suoi pezzi (arrotondamento per eccesso), così ogni
+pezzo reale entra dove entra la classe. Il solutore lavora sulle classi; poi
+ogni taglio viene riassegnato a un pezzo originale con la sua marca.
+"""
+from typing import Dict, List, Union
+
+EPS = 1e-9
+
+
+def _length(piece) -> float:
+    return piece.length if hasattr(piece, 'length') else piece
+
+
+class LengthClasses:
+    def __init__(self, pieces: Dict, tolerance: float = 0.0):
+        """
+        pieces: {pezzo: quantità}; i pezzi con quantità <= 0 restano fuori dalle classi.
+        tolerance: differenza massima di lunghezza (mm) tra i pezzi di una classe.
+        """
+        self.tolerance = max(0.0, tolerance)
+        self.classes: Dict[float, int] = {}
+        self._members: Dict[float, List[list]] = {}
+        self._untouched = {piece: qty for piece, qty in pieces.items() if qty <= 0}
+
+        group: List[list] = []
+        start = None
+        for piece, qty in sorted(((p, q) for p, q in pieces.items() if q > 0), key=lambda x: _length(x[0])):
+            length = _length(piece)
+            if group and length > start + self.tolerance + EPS:
+                self._close(group)
+                group = []
+            if not group:
+                start = length
+            group.append([piece, qty])
+        if group:
+            self._close(group)
+
+    def _close(self, group: List[list]):
+        class_length = max(_length(piece) for piece, _ in group)
+        # I pezzi più lunghi della classe vengono assegnati per primi
+        group.sort(key=lambda member: -_length(member[0]))
+        self._members[class_length] = group
+        self.classes[class_length] = sum(qty for _, qty in group)
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def restore_cut(self, class_length: float):
+        """Pezzo originale per un taglio della classe class_length."""
+        for member in self._members[class_length]:
+            if member[1] > 0:
+                member[1] -= 1
+                return member[0]
+        raise ValueError(f"More cuts than pieces for length class {class_length}")
+
+    def restore_cuts(self, cuts: List[float]) -> List:
+        return [self.restore_cut(cut) for cut in cuts]
+
+    def remaining(self) -> Dict[Union[float, object], int]:
+        """Pezzi originali non ancora riassegnati, nel formato {pezzo: quantità}."""
+        result = dict(self._untouched)
+        for members in self._members.values():
+            for piece, qty in members:
+                result[piece] = result.get(piece, 0) + qty
+        return result
@@ -0,0 +1,84 @@
+"""
+Limiti inferiori sul numero di barre necessarie.
+
+Il taglio è modellato come bin packing: ogni pezzo occupa la sua lunghezza più
+una lama e la barra ha capacità ``stock_length + blade_width`` (l'ultimo taglio
+non consuma lama, come in ``StrictCuttingStockOptimizer._can_fit``).
+"""
+import math
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+EPS = 1e-9
+
+
+def _ceil(value: float) -> int:
+    return max(0, math.ceil(value - EPS))
+
+
+def _item_sizes(pieces: Iterable[Tuple[float, int]], blade_width: float) -> Dict[float, int]:
+    sizes = Counter()
+    for length, qty in pieces:
+        if qty > 0:
+            sizes[length + blade_width] += qty
+    return sizes
+
+
+def material_bound(pieces: Iterable[Tuple[float, int]], stock_length: float, blade_width: float) -> int:
+    """L1: lunghezza totale (lama compresa) diviso la capacità di una barra."""
+    capacity = stock_length + blade_width
+    total = sum(size * qty for size, qty in _item_sizes(pieces, blade_width).items())
+    return _ceil(total / capacity)
+
+
+def l2_bound(pieces: Iterable[Tuple[float, int]], stock_length: float, blade_width: float) -> int:
+    """Limite L2 di Martello-Toth, calcolato in O(d log d) sulle d lunghezze distinte."""
+    capacity = stock_length + blade_width
+    sizes = _item_sizes(pieces, blade_width)
+    if not sizes:
+        return 0
+
+    values = sorted(sizes)
+    count_prefix = [0]
+    sum_prefix = [0.0]
+    for value in values:
+        count_prefix.append(count_prefix[-1] + sizes[value])
+        sum_prefix.append(sum_prefix[-1] + value * sizes[value])
+
+    def count_sum(low: int, high: int) -> Tuple[int, float]:
+        return count_prefix[high] - count_prefix[low], sum_prefix[high] - sum_prefix[low]
+
+    half = capacity / 2
+    i_half = bisect_right(values, half + EPS)  # values[:i_half] <= C/2
+    best = 0
+    for alpha in [0.0] + values[:i_half]:
+        i_big = bisect_right(values, capacity - alpha + EPS)  # J1: size > C - alpha
+        n1, _ = count_sum(i_big, len(values))
+        n2, s2 = count_sum(i_half, max(i_half, i_big))
+        _, s3 = count_sum(bisect_left(values, alpha - EPS), i_half)
+        free = n2 * capacity - s2
+        best = max(best, n1 + n2 + _ceil((s3 - free) / capacity))
+    return best
+
+
+def bar_lower_bound(pieces: Iterable[Tuple[float, int]], stock_length: float, blade_width: float) -> int:
+    """Miglior limite disponibile per il taglio senza giunzioni: max(L1, L2)."""
+    pieces = list(pieces)
+    return max(material_bound(pieces, stock_length, blade_width),
+               l2_bound(pieces, stock_length, blade_width))
+
+
+def jointed_lower_bound(pieces: Iterable[Tuple[float, int]], stock_length: float) -> int:
+    """
+    Limite per i piani con giunzioni: i pezzi possono essere divisi su più barre,
+    quindi vale solo il limite di materiale senza lama.
+    """
+    total = sum(length * qty for length, qty in pieces if qty > 0)
+    return _ceil(total / stock_length)
+
+
+def optimality_gap(bars: int, lower_bound: int) -> Tuple[int, float]:
+    """Distanza dal limite inferiore, in barre e in percentuale del limite."""
+    gap = max(0, bars - lower_bound)
+    return gap, (gap / lower_bound * 100) if lower_bound else 0.0
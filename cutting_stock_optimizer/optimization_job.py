@@ -0,0 +1,123 @@
+"""
+Ottimizzazione in background per interfacce grafiche.
+
+OptimizationJob esegue il solutore in un thread di lavoro e pubblica gli eventi
+su una queue.Queue thread-safe: l'interfaccia li legge con poll() (per esempio
+da root.after in tkinter) senza mai bloccarsi. Eventi:
+- 'progress': una barra definitiva (pattern) con il suo PlanProgress;
+- 'log': un messaggio del solutore, che altrimenti andrebbe sulla console;
+- 'done': il PlanResult finale (result.partial se annullato o scaduto);
+- 'error': l'eccezione che ha interrotto il solutore.
+'done' o 'error' è sempre l'ultimo evento di un job.
+
+Il thread basta: il solutore controlla cancel_token tra una barra e l'altra,
+e il widget non viene mai toccato fuori dal thread dell'interfaccia.
+"""
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from cutting_stock_optimizer import CuttingPattern, PlanProgress
+
+
+@dataclass(frozen=True)
+class JobEvent:
+    kind: str
+    pattern: Optional[CuttingPattern] = None
+    progress: Optional[PlanProgress] = None
+    message: Optional[str] = None
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+class OptimizationJob:
+    def __init__(self, optimizer, pieces, longer_than: Optional[float] = None, method: str = 'greedy',
+                 deadline: Optional[float] = None):
+        """
+        optimizer: StrictCuttingStockOptimizer o WasteCuttingStockOptimizer.
+        longer_than: richiesto da WasteCuttingStockOptimizer; con None si usa optimize_iter.
+        deadline / method: vedi StrictCuttingStockOptimizer.optimize.
+        """
+        self.optimizer = optimizer
+        self.pieces = pieces
+        self.longer_than = longer_than
+        self.method = method
+        self.deadline = deadline
+        self.events: "queue.Queue[JobEvent]" = queue.Queue()
+        self.cancel_token = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'OptimizationJob':
+        if self._thread is not None:
+            raise RuntimeError("Job already started")
+        self._thread = threading.Thread(target=self._run, name="optimization-job", daemon=True)
+        self._thread.start()
+        return self
+
+    def _iterate(self):
+        if self.longer_than is not None:
+            return self.optimizer.optimize_with_waste_iter(self.pieces, self.longer_than, self.deadline,
+                                                           self.cancel_token, self.method)
+        return self.optimizer.optimize_iter(self.pieces, self.deadline, self.cancel_token, self.method)
+
+    def _run(self):
+        previous_hook = self.optimizer.log_hook
+        self.optimizer.log_hook = lambda text: self.events.put(JobEvent('log', message=text.strip('\n')))
+        try:
+            for pattern, progress in self._iterate():
+                self.events.put(JobEvent('progress', pattern=pattern, progress=progress))
+            self.result = self.optimizer.result
+            self.events.put(JobEvent('done', result=self.result))
+        except Exception as e:
+            self.error = e
+            self.events.put(JobEvent('error', error=e))
+        finally:
+            self.optimizer.log_hook = previous_hook
+
+    def cancel(self):
+        """Chiede al solutore di fermarsi: il job termina con il miglior piano parziale."""
+        self.cancel_token.set()
+
+    def done(self) -> bool:
+        return self._thread is not None and not self._thread.is_alive()
+
+    def poll(self, max_events: Optional[int] = None) -> List[JobEvent]:
+        """Eventi arrivati finora, senza attendere."""
+        events = []
+        while max_events is None or len(events) < max_events:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def wait(self, timeout: Optional[float] = None):
+        """Attende la fine del job e restituisce il risultato; rilancia l'errore del solutore."""
+        if self._thread is None:
+            raise RuntimeError("Job not started")
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise TimeoutError("Optimization job still running")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def attach_to_tk(widget, job: OptimizationJob, on_event: Callable[[JobEvent], None], interval_ms: int = 100,
+                 max_events: int = 200):
+    """
+    Legge gli eventi del job dal thread di tkinter ogni interval_ms millisecondi e li
+    passa a on_event, fino all'evento finale. max_events limita il lavoro per giro,
+    così anche i piani con migliaia di barre non bloccano l'interfaccia.
+    """
+    def pump():
+        for event in job.poll(max_events):
+            on_event(event)
+            if event.kind in ('done', 'error'):
+                return
+        widget.after(interval_ms, pump)
+
+    widget.after(interval_ms, pump)
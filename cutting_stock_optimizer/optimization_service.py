@@ -0,0 +1,424 @@
+"""
+Servizio HTTP asyncio per l'ottimizzazione on-demand.
+
+Espone ``WasteCuttingStockOptimizer.optimize_with_waste`` e ``generate_pdf``
+via HTTP usando solo la libreria standard (``asyncio.start_server``), così
+il servizio gira in locale e può essere sottoposto a load test su una sola
+macchina.
+
+Endpoint:
+    GET  /health    -> stato del servizio e richieste in corso
+    POST /optimize  -> piano di taglio in JSON
+    POST /pdf       -> distinta di taglio in PDF
+
+Corpo delle richieste POST (JSON):
+    {"stock_length": 12000, "blade_width": 2, "longer_than": 4500,
+     "min_waste": 100, "max_joints": 1, "excluded_to_joint": [],
+     "pieces": [[8535, 9, "P10"], [1200, 5]],
+     "profilo": "MIO PROFILO", "commessa": "Cxxx", "num_columns": 2}
+
+Un corpo non valido o fuori intervallo riceve 400 (vedi parse_request); un
+client che non invia la richiesta entro read_timeout secondi riceve 408.
+
+Le ottimizzazioni sono CPU-bound e girano in un pool di processi limitato.
+Le richieste identiche concorrenti condividono un'unica ottimizzazione.
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+from strategies import get_strategy
+
+
+MAX_BODY_SIZE = 4 * 1024 * 1024
+# Pezzi per richiesta, contando un pezzo più lungo della barra per i segmenti in cui si divide
+MAX_PIECES = 100_000
+# Secondi concessi al client per inviare riga di richiesta, header e corpo
+READ_TIMEOUT = 30.0
+
+_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    408: 'Request Timeout',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+class ServiceBusy(Exception):
+    """La coda delle richieste è piena."""
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _number(value, name: str) -> float:
+    # bool è un int per Python, ma true/false non sono misure
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"'{name}' must be a finite number")
+    return float(value)
+
+
+def parse_request(payload: Any) -> Dict[str, Any]:
+    """
+    Valida il corpo della richiesta e lo normalizza in un dizionario canonico.
+    Solleva ValueError (risposta 400) per valori fuori intervallo: stock_length > 0,
+    blade_width >= 0, lunghezze > 0, quantità intere >= 0, al più MAX_PIECES pezzi.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("request body must be a JSON object")
+
+    for key in ('stock_length', 'blade_width', 'longer_than', 'pieces'):
+        if key not in payload:
+            raise ValueError(f"missing field '{key}'")
+
+    stock_length = _number(payload['stock_length'], 'stock_length')
+    blade_width = _number(payload['blade_width'], 'blade_width')
+    if stock_length <= 0:
+        raise ValueError("'stock_length' must be greater than 0")
+    if blade_width < 0:
+        raise ValueError("'blade_width' must not be negative")
+    if not isinstance(payload['pieces'], list):
+        raise ValueError("'pieces' must be a list")
+
+    pieces = []
+    total = 0
+    for piece in payload['pieces']:
+        if not isinstance(piece, (list, tuple)) or len(piece) not in (2, 3):
+            raise ValueError("each piece must be [length, qty] or [length, qty, mark]")
+        length, qty = _number(piece[0], 'length'), piece[1]
+        if length <= 0:
+            raise ValueError("piece lengths must be greater than 0")
+        if isinstance(qty, bool) or not isinstance(qty, int) or qty < 0:
+            raise ValueError("piece quantities must be integers >= 0")
+        # I pezzi più lunghi della barra vengono divisi: contano per i loro segmenti
+        total += qty * math.ceil(length / stock_length)
+        if total > MAX_PIECES:
+            raise ValueError(f"too many pieces (max {MAX_PIECES})")
+        if len(piece) == 3 and piece[2] is not None:
+            pieces.append((length, qty, str(piece[2])))
+        else:
+            pieces.append((length, qty))
+    if not pieces:
+        raise ValueError("'pieces' must not be empty")
+
+    excluded = payload.get('excluded_to_joint') or []
+    if isinstance(excluded, int):
+        excluded = [excluded]
+
+    # Le strategie vengono validate subito: un nome sconosciuto è un errore 400
+    method = str(payload.get('method', 'greedy'))
+    joint_strategy = str(payload.get('joint_strategy', 'global'))
+    improve = [str(name) for name in payload.get('improve') or []]
+    get_strategy('pattern', method)
+    get_strategy('joint', joint_strategy)
+    for name in improve:
+        get_strategy('improve', name)
+
+    return {
+        'stock_length': stock_length,
+        'blade_width': blade_width,
+        'longer_than': float(payload['longer_than']),
+        'min_waste': float(payload.get('min_waste', 100)),
+        'max_joints': int(payload.get('max_joints', 1)),
+        'excluded_to_joint': [int(i) for i in excluded],
+        'pieces': pieces,
+        'method': method,
+        'joint_strategy': joint_strategy,
+        'improve': improve,
+        'profilo': str(payload.get('profilo', 'MIO PROFILO')),
+        'commessa': str(payload.get('commessa', 'Cxxx')),
+        'num_columns': int(payload.get('num_columns', 2)),
+    }
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """Chiave di coalescenza: richieste identiche producono la stessa chiave."""
+    canonical = json.dumps([kind, request], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _piece_to_json(piece) -> Tuple[float, Optional[str]]:
+    length = piece.length if hasattr(piece, 'length') else piece
+    # Nel JSON la marca include il ruolo del taglio (P10/FULL, B/J/2)
+    mark = getattr(piece, 'display_mark', None)
+    return length, mark
+
+
+def solve_request(kind: str, request: Dict[str, Any], time_limit: Optional[float] = None):
+    """
+    Esegue un'ottimizzazione nel processo worker.
+    Restituisce un dizionario serializzabile ('optimize') o i byte del PDF ('pdf').
+    Con time_limit (secondi) l'ottimizzazione si ferma e restituisce un piano parziale.
+    """
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    optimizer = WasteCuttingStockOptimizer(
+        request['stock_length'],
+        request['blade_width'],
+        min_waste=request['min_waste'],
+        max_joints=request['max_joints'],
+        excluded_to_joint=request['excluded_to_joint'],
+    )
+    optimizer.joint_strategy = request.get('joint_strategy', 'global')
+    optimizer.improve = list(request.get('improve', []))
+
+    # L'ottimizzatore stampa il log su console: nel worker lo scartiamo
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = optimizer.optimize_with_waste(request['pieces'], request['longer_than'], deadline=deadline,
+                                               method=request.get('method', 'greedy'))
+
+        if kind == 'pdf':
+            fd, path = tempfile.mkstemp(suffix='.pdf')
+            os.close(fd)
+            try:
+                optimizer.generate_pdf(path, profilo=request['profilo'],
+                                       commessa=request['commessa'],
+                                       num_columns=request['num_columns'])
+                with open(path, 'rb') as f:
+                    return f.read()
+            finally:
+                os.remove(path)
+
+    return {
+        'patterns': [
+            {'cuts': [list(_piece_to_json(cut)) for cut in pattern.cuts], 'waste': pattern.waste}
+            for pattern in result.patterns
+        ],
+        'remaining': [
+            list(_piece_to_json(piece)) + [qty]
+            for piece, qty in result.remaining.items() if qty > 0
+        ],
+        'summary': {
+            'bars': result.bar_count,
+            'partial': result.partial,
+            'total_waste': result.total_waste,
+            'usage': result.total_usage,
+            'lower_bound': result.lower_bound,
+            'joint_combinations': dict(result.joint_combinations),
+        },
+    }
+
+
+class OptimizationService:
+    """
+    Coordina le ottimizzazioni: pool di processi limitato, coda con
+    backpressure, timeout per richiesta e coalescenza delle richieste identiche.
+
+    Allo scadere di ``timeout`` l'ottimizzatore restituisce un piano parziale;
+    ``grace`` è il margine concesso al worker per consegnarlo prima del 504.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 32,
+                 timeout: float = 60.0, executor: Optional[Executor] = None, grace: float = 5.0,
+                 read_timeout: float = READ_TIMEOUT):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.read_timeout = read_timeout
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.grace = grace
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._slots = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.solves = 0
+        self.coalesced = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+    async def _run(self, kind: str, request: Dict[str, Any], deadline: float):
+        async with self._slots:
+            self.solves += 1
+            loop = asyncio.get_running_loop()
+            time_limit = max(0.0, deadline - loop.time())
+            return await loop.run_in_executor(self._executor, solve_request, kind, request, time_limit)
+
+    async def submit(self, kind: str, request: Dict[str, Any], timeout: Optional[float] = None):
+        """
+        Accoda un'ottimizzazione e ne attende il risultato.
+        Solleva ServiceBusy se la coda è piena e asyncio.TimeoutError allo scadere del timeout.
+        """
+        self._ensure_started()
+        key = request_key(kind, request)
+        timeout = timeout or self.timeout
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            if len(self._inflight) >= self.max_pending:
+                raise ServiceBusy(f"{len(self._inflight)} requests pending")
+            deadline = asyncio.get_running_loop().time() + timeout
+            task = asyncio.ensure_future(self._run(kind, request, deadline))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+
+        # shield: il timeout di un client non annulla l'ottimizzazione condivisa
+        return await asyncio.wait_for(asyncio.shield(task), timeout + self.grace)
+
+    def close(self):
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # --- HTTP ---
+
+    async def _readline(self, reader: asyncio.StreamReader) -> bytes:
+        try:
+            return await reader.readline()
+        except ValueError:
+            # StreamReader rifiuta le righe oltre il suo limite (64 KiB)
+            raise HTTPError(400, 'header line too long')
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await self._readline(reader)
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, 'malformed request line')
+
+        headers = {}
+        while True:
+            line = await self._readline(reader)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        # Solo cifre ASCII: int() accetterebbe anche segno, spazi e '1_000'
+        content_length = headers.get('content-length')
+        if content_length is None:
+            if method.upper() == 'POST':
+                raise HTTPError(411, 'Content-Length required')
+            length = 0
+        elif content_length.isascii() and content_length.isdigit():
+            length = int(content_length)
+        else:
+            raise HTTPError(400, 'invalid Content-Length')
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413, 'request body too large')
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path.split('?', 1)[0], body
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, str, bytes]:
+        if path == '/health':
+            if method != 'GET':
+                raise HTTPError(405, 'method not allowed')
+            return 200, 'application/json', json.dumps(
+                {'status': 'ok', 'pending': self.pending, 'solves': self.solves}).encode()
+
+        if path not in ('/optimize', '/pdf'):
+            raise HTTPError(404, 'not found')
+        if method != 'POST':
+            raise HTTPError(405, 'method not allowed')
+
+        try:
+            request = parse_request(json.loads(body or b'null'))
+        except (ValueError, TypeError) as e:
+            raise HTTPError(400, str(e))
+
+        kind = path[1:]
+        try:
+            result = await self.submit(kind, request)
+        except ServiceBusy:
+            raise HTTPError(503, 'too many pending requests')
+        except asyncio.TimeoutError:
+            raise HTTPError(504, 'optimization timed out')
+
+        if kind == 'pdf':
+            return 200, 'application/pdf', result
+        return 200, 'application/json', json.dumps(result).encode()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                try:
+                    parsed = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+                except asyncio.TimeoutError:
+                    raise HTTPError(408, 'request not received in time')
+                if parsed is None:
+                    return
+                status, content_type, payload = await self._dispatch(*parsed)
+            except HTTPError as e:
+                status, content_type = e.status, 'application/json'
+                payload = json.dumps({'error': e.message}).encode()
+            except Exception as e:
+                status, content_type = 500, 'application/json'
+                payload = json.dumps({'error': str(e)}).encode()
+
+            head = [
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(payload)}",
+                "Connection: close",
+            ]
+            if status == 503:
+                head.append("Retry-After: 1")
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        self._ensure_started()
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8080, **kwargs):
+    service = OptimizationService(**kwargs)
+    server = await service.start(host, port)
+    print(f"Optimization service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="HTTP service for cutting stock optimization")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-pending', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--grace', type=float, default=5.0)
+    parser.add_argument('--read-timeout', type=float, default=READ_TIMEOUT)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, max_workers=args.workers,
+                          max_pending=args.max_pending, timeout=args.timeout, grace=args.grace,
+                          read_timeout=args.read_timeout))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,116 @@
+"""
+Ricerca delle combinazioni di giunzione su più processi.
+
+Con max_joints alto la ricerca di find_best_combination domina il tempo di
+optimize_with_waste. Qui lo spazio di ricerca viene diviso per indice della
+prima barra: ogni worker esplora un sottoinsieme dei primi indici (interleaved,
+per bilanciare il carico) leggendo gli scarti da un blocco di memoria condivisa,
+e restituisce il miglior candidato del suo pezzo. Nello stesso blocco i worker
+condividono la migliore eccedenza trovata, per potare anche con i risultati altrui,
+e leggono il flag di annullamento che il processo principale alza quando scatta il
+cancel_token dell'ottimizzazione. L'unione dei candidati dà la
+stessa scelta del percorso seriale:
+- se c'è un incastro perfetto vince quello con indici lessicograficamente minimi
+  (il seriale si ferma al primo che incontra);
+- altrimenti vince la minima eccedenza, a parità gli indici minimi.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from waste_cutting_optimizer import find_best_combination
+
+PERFECT_FIT = 1e-9
+# Ogni quanto (secondi) il processo principale controlla l'annullamento durante una ricerca
+CANCEL_POLL = 0.05
+
+Candidate = Tuple[float, Tuple[int, ...]]
+
+
+def _search_chunk(shm_name: str, m: int, need: float, n_joints: int, start: int, step: int,
+                  deadline: Optional[float]) -> Optional[Candidate]:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray((m + 2,), dtype=np.float64, buffer=shm.buf)
+    try:
+        # block[0] è il flag di annullamento, block[1] la migliore eccedenza comune, poi gli scarti
+        wastes = block[2:].tolist()
+
+        def should_stop():
+            return block[0] != 0 or (deadline is not None and time.monotonic() >= deadline)
+
+        return find_best_combination(wastes, need, n_joints, range(start, m - n_joints + 1, step), should_stop,
+                                     shared_bound=block[1:2])
+    finally:
+        del block
+        shm.close()
+
+
+def merge_candidates(candidates: Iterable[Optional[Candidate]]) -> Optional[Candidate]:
+    """Sceglie tra i migliori candidati dei pezzi di ricerca come farebbe la ricerca seriale."""
+    found = [candidate for candidate in candidates if candidate is not None]
+    if not found:
+        return None
+    perfect = [candidate for candidate in found if candidate[0] <= PERFECT_FIT]
+    if perfect:
+        return min(perfect, key=lambda candidate: candidate[1])
+    return min(found)
+
+
+class JointSearchPool:
+    """Pool di processi e blocco condiviso degli scarti, riusati per tutte le ricerche di un piano."""
+
+    def __init__(self, workers: int, capacity: int, chunks_per_worker: int = 4):
+        self.workers = workers
+        self.n_chunks = workers * chunks_per_worker
+        self._shm = shared_memory.SharedMemory(create=True, size=(capacity + 2) * 8)
+        self._block = np.ndarray((capacity + 2,), dtype=np.float64, buffer=self._shm.buf)
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def search(self, wastes: List[float], need: float, n_joints: int,
+               deadline: Optional[float] = None, should_stop=None) -> Optional[Candidate]:
+        """
+        should_stop: controllato ogni CANCEL_POLL secondi mentre i worker cercano (per
+        esempio _should_stop dell'ottimizzatore, che segue il cancel_token). Se scatta,
+        i pezzi ancora in coda vengono annullati, quelli in corso si fermano al flag
+        condiviso e la ricerca restituisce None.
+        """
+        m = len(wastes)
+        if m + 2 > len(self._block):
+            raise ValueError(f"Waste pool of {m} bars exceeds the shared capacity of {len(self._block) - 2}")
+        self._block[0] = 0
+        self._block[1] = np.inf
+        self._block[2:m + 2] = wastes
+
+        n_chunks = max(1, min(self.n_chunks, m - n_joints + 1))
+        futures = [
+            self._executor.submit(_search_chunk, self._shm.name, m, need, n_joints, start, n_chunks, deadline)
+            for start in range(n_chunks)
+        ]
+        pending = futures
+        while pending:
+            _, pending = wait(pending, timeout=CANCEL_POLL if should_stop is not None else None)
+            if pending and should_stop():
+                self._block[0] = 1
+                for future in pending:
+                    future.cancel()
+                # I worker già partiti leggono ancora il blocco: si aspetta che escano
+                # prima che la ricerca successiva lo riscriva
+                wait(pending)
+                return None
+        return merge_candidates(future.result() for future in futures)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        # La vista NumPy va rilasciata prima di chiudere il blocco condiviso
+        self._block = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
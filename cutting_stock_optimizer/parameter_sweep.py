@@ -0,0 +1,158 @@
+"""
+Sweep dei parametri di WasteCuttingStockOptimizer su un ordine.
+
+Valuta una griglia di lunghezze di barra, longer_than, max_joints e min_waste
+su un pool di processi. La preparazione dei pezzi (tipi di pezzo, suddivisione
+dei pezzi sovradimensionati, ordinamento per lunghezza) si fa una volta per
+lunghezza di barra nel processo principale e arriva a ogni worker una sola
+volta, con l'initializer del pool.
+
+Il risultato è una tabella di SweepRow; sono marcate come pareto le righe
+complete che nessun'altra batte contemporaneamente su barre, sfrido e giunzioni.
+"""
+import io
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cutting_stock_optimizer import MarkedPiece
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+
+Prepared = Tuple[List[Tuple[MarkedPiece, int]], Dict[str, int]]
+
+# Pezzi preparati per lunghezza di barra, impostati nei worker dall'initializer
+_PREPARED: Dict[float, Prepared] = {}
+
+
+@dataclass
+class SweepRow:
+    stock_length: float
+    longer_than: float
+    max_joints: int
+    min_waste: float
+    bars: int = 0
+    total_waste: float = 0.0
+    joints: int = 0
+    unplaced: int = 0
+    solve_time: float = 0.0
+    partial: bool = False
+    pareto: bool = False
+
+    @property
+    def complete(self) -> bool:
+        return not self.partial and self.unplaced == 0
+
+    def objectives(self) -> Tuple[int, float, int]:
+        return self.bars, self.total_waste, self.joints
+
+
+def prepare_pieces(pieces, stock_length: float, blade_width: float) -> Prepared:
+    """
+    Pezzi pronti per una lunghezza di barra, come coppie (MarkedPiece, quantità) dal
+    più lungo con ruolo e type_id, e le giunzioni dei pezzi sovradimensionati già divisi.
+    """
+    optimizer = WasteCuttingStockOptimizer(stock_length, blade_width)
+    processed = optimizer._prepare_pieces(pieces, 0)
+    # Ordinamento stabile: a parità di lunghezza resta l'ordine di inserimento,
+    # quindi i solutori danno lo stesso piano che con i pezzi originali
+    processed.sort(key=lambda item: -item[0].length)
+    return processed, dict(optimizer.joint_combinations)
+
+
+def _init_worker(prepared: Dict[float, Prepared]):
+    global _PREPARED
+    _PREPARED = prepared
+
+
+def _run_setting(row: SweepRow, blade_width: float, method: str,
+                 time_limit: Optional[float], excluded_to_joint=None) -> SweepRow:
+    pieces, oversize_joints = _PREPARED[row.stock_length]
+    optimizer = WasteCuttingStockOptimizer(row.stock_length, blade_width,
+                                           min_waste=row.min_waste, max_joints=row.max_joints,
+                                           excluded_to_joint=excluded_to_joint)
+    optimizer.joint_combinations.update(oversize_joints)
+
+    start = time.perf_counter()
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    # I messaggi della pianificazione delle giunzioni non servono nella tabella
+    with redirect_stdout(io.StringIO()):
+        result = optimizer.optimize_with_waste(pieces, row.longer_than, deadline=deadline, method=method)
+    row.solve_time = time.perf_counter() - start
+
+    row.bars = result.bar_count
+    row.total_waste = result.total_waste
+    row.joints = result.joint_count
+    row.unplaced = result.remaining_count
+    row.partial = result.partial
+    return row
+
+
+def mark_pareto(rows: Sequence[SweepRow]):
+    """Marca le righe complete non dominate su (barre, sfrido, giunzioni)."""
+    complete = [row for row in rows if row.complete]
+    for row in rows:
+        row.pareto = row.complete and not any(
+            other is not row
+            and all(a <= b for a, b in zip(other.objectives(), row.objectives()))
+            and other.objectives() != row.objectives()
+            for other in complete
+        )
+
+
+def parameter_sweep(pieces, blade_width: float, stock_lengths: Iterable[float],
+                    longer_than_values: Iterable[float], max_joints_values: Iterable[int] = (1,),
+                    min_waste_values: Iterable[float] = (100,), method: str = 'greedy',
+                    workers: Optional[int] = None, time_limit: Optional[float] = None,
+                    excluded_to_joint=None) -> List[SweepRow]:
+    """
+    Ottimizza l'ordine per ogni combinazione dei valori dati.
+    pieces: nel formato di optimize_with_waste.
+    excluded_to_joint: come in WasteCuttingStockOptimizer, riferito alle righe di pieces.
+    workers: processi del pool (default: numero di CPU); con 1 tutto gira nel processo corrente.
+    time_limit: secondi per ogni combinazione, oltre i quali vale il piano parziale.
+    Le righe escono nell'ordine della griglia, con pareto impostato.
+    """
+    stock_lengths = list(stock_lengths)
+    prepared = {stock_length: prepare_pieces(pieces, stock_length, blade_width) for stock_length in stock_lengths}
+    rows = [
+        SweepRow(stock_length, longer_than, max_joints, min_waste)
+        for stock_length, longer_than, max_joints, min_waste in itertools.product(
+            stock_lengths, longer_than_values, max_joints_values, min_waste_values)
+    ]
+
+    workers = min(workers or os.cpu_count() or 1, len(rows))
+    if workers <= 1:
+        _init_worker(prepared)
+        rows = [_run_setting(row, blade_width, method, time_limit, excluded_to_joint) for row in rows]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prepared,)) as executor:
+            rows = list(executor.map(_run_setting, rows, itertools.repeat(blade_width),
+                                     itertools.repeat(method), itertools.repeat(time_limit),
+                                     itertools.repeat(excluded_to_joint)))
+    mark_pareto(rows)
+    return rows
+
+
+def format_sweep(rows: Sequence[SweepRow]) -> List[str]:
+    """Tabella di testo dello sweep; le impostazioni pareto-ottime sono marcate con '*'."""
+    lines = [
+        f"{'':1} {'Stock':>8} {'Longer':>8} {'MaxJ':>6} {'MinWaste':>8} "
+        f"{'Bars':>5} {'Waste':>10} {'Joints':>6} {'Time(s)':>8}",
+        "-" * 71,
+    ]
+    for row in rows:
+        flag = '*' if row.pareto else ('!' if not row.complete else ' ')
+        lines.append(
+            f"{flag:1} {row.stock_length:>8.0f} {row.longer_than:>8.0f} {row.max_joints:>6} {row.min_waste:>8.0f} "
+            f"{row.bars:>5} {row.total_waste:>10.2f} {row.joints:>6} {row.solve_time:>8.3f}"
+        )
+    lines.append("* Pareto-optimal (bars, waste, joints)   ! incomplete plan")
+    return lines
+
+
+def print_sweep(rows: Sequence[SweepRow]):
+    print("\n".join(format_sweep(rows)))
@@ -0,0 +1,150 @@
+"""
+Libreria locale di pattern per profilo.
+
+Per ogni profilo un file JSON conserva i pattern ad alta resa delle
+ottimizzazioni precedenti (lunghezze dei tagli, utilizzo della barra, quante
+volte sono stati usati). Un'ottimizzazione con libreria prima copre la
+domanda con i pattern noti, dal più efficiente, e lascia al solutore solo i
+pezzi che restano: per ordini ricorrenti il piano è quasi immediato.
+
+I pattern con segmenti di giunzione non vengono registrati: dipendono dagli
+scarti di quel piano e non sono riutilizzabili.
+"""
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from cutting_stock_optimizer import PieceRole
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cutting_stock_optimizer", "patterns")
+EPS = 1e-9
+
+Lengths = Tuple[float, ...]
+
+
+def _length(piece) -> float:
+    return piece.length if hasattr(piece, 'length') else piece
+
+
+def _is_joint_segment(piece) -> bool:
+    return bool(getattr(piece, 'role', 0) & PieceRole.JOINT)
+
+
+class PatternLibrary:
+    def __init__(self, profile: str, stock_length: float, blade_width: float,
+                 directory: str = DEFAULT_DIRECTORY, min_usage: float = 0.95, max_patterns: int = 500):
+        """
+        min_usage: utilizzo minimo della barra perché un pattern venga registrato.
+        max_patterns: i pattern oltre questo numero (i meno efficienti) vengono scartati.
+        """
+        self.profile = profile
+        self.stock_length = stock_length
+        self.blade_width = blade_width
+        self.min_usage = min_usage
+        self.max_patterns = max_patterns
+        self.path = os.path.join(directory, re.sub(r'[^\w.-]+', '_', profile) + ".json")
+        # lunghezze ordinate in modo decrescente -> numero di utilizzi
+        self.patterns: Dict[Lengths, int] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        # Pattern di un'altra barra o di un'altra lama non sono validi
+        if data.get('stock_length') != self.stock_length or data.get('blade_width') != self.blade_width:
+            return
+        for record in data.get('patterns', []):
+            lengths = tuple(sorted(record['lengths'], reverse=True))
+            if self._fits(lengths):
+                self.patterns[lengths] = self.patterns.get(lengths, 0) + record['uses']
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            'profile': self.profile,
+            'stock_length': self.stock_length,
+            'blade_width': self.blade_width,
+            'patterns': [
+                {'lengths': list(lengths), 'uses': uses, 'usage': round(self.usage(lengths), 6)}
+                for lengths, uses in self._ranked()
+            ],
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _fits(self, lengths: Sequence[float]) -> bool:
+        return sum(lengths) + (len(lengths) - 1) * self.blade_width <= self.stock_length + EPS
+
+    def usage(self, lengths: Sequence[float]) -> float:
+        return sum(lengths) / self.stock_length
+
+    def _ranked(self) -> List[Tuple[Lengths, int]]:
+        """Pattern dal più efficiente; a parità il più usato, poi quello con meno tagli."""
+        return sorted(self.patterns.items(),
+                      key=lambda item: (-self.usage(item[0]), -item[1], len(item[0]), item[0]))
+
+    def record(self, patterns) -> int:
+        """Registra i pattern ad alta resa di un piano; restituisce quanti ne sono stati registrati."""
+        recorded = 0
+        for pattern in patterns:
+            if not pattern.cuts or any(_is_joint_segment(cut) for cut in pattern.cuts):
+                continue
+            lengths = tuple(sorted((float(_length(cut)) for cut in pattern.cuts), reverse=True))
+            if self.usage(lengths) + EPS < self.min_usage or not self._fits(lengths):
+                continue
+            self.patterns[lengths] = self.patterns.get(lengths, 0) + 1
+            recorded += 1
+        if len(self.patterns) > self.max_patterns:
+            self.patterns = dict(self._ranked()[:self.max_patterns])
+        return recorded
+
+    def cover(self, remaining_pieces: Dict) -> List[list]:
+        """
+        Copre la domanda con i pattern noti, dal più efficiente. Ogni pattern viene
+        applicato tutte le volte che i pezzi rimasti lo permettono; i pezzi usati
+        vengono tolti da remaining_pieces. Restituisce le barre come liste di pezzi.
+        """
+        by_length: Dict[float, List] = defaultdict(list)
+        for piece, qty in remaining_pieces.items():
+            if qty > 0:
+                by_length[float(_length(piece))].append(piece)
+
+        bars = []
+        for lengths, _ in self._ranked():
+            need = Counter(lengths)
+            times = min(
+                sum(remaining_pieces[piece] for piece in by_length.get(length, ())) // count
+                for length, count in need.items()
+            )
+            for _ in range(times):
+                bar = []
+                for length in lengths:
+                    piece = next(p for p in by_length[length] if remaining_pieces[p] > 0)
+                    remaining_pieces[piece] -= 1
+                    bar.append(piece)
+                bars.append(bar)
+        return bars
+
+    def columns(self, lengths: Sequence[float]) -> List[Tuple[int, ...]]:
+        """
+        Pattern noti come vettori di conteggi sulle lunghezze date (colonne iniziali
+        per solutori basati su pattern); restano fuori quelli con altre lunghezze.
+        """
+        index = {float(length): i for i, length in enumerate(lengths)}
+        columns = []
+        for pattern, _ in self._ranked():
+            if all(length in index for length in pattern):
+                column = [0] * len(index)
+                for length in pattern:
+                    column[index[length]] += 1
+                columns.append(tuple(column))
+        return columns
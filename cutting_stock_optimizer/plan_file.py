@@ -0,0 +1,236 @@
+"""
+Salvataggio e ricarica dei piani in un formato binario compatto.
+
+Struttura del file (little endian, sezioni allineate a 8 byte):
+    magic "CSOPLAN\\0" | versione uint32 | lunghezza header uint32 | header JSON
+    | bar_offsets int64[n_barre + 1] | wastes float64[n_barre]
+    | cut_lengths float64[n_tagli] | cut_marks int32[n_tagli] | cut_orders int32[n_tagli]
+    | cut_roles uint8[n_tagli] | cut_segments uint16[n_tagli] | cut_types int32[n_tagli]
+
+L'header contiene i parametri del piano (barra, lama, e per i piani con giunzioni
+min_waste, max_joints e longer_than), le giunzioni, i pezzi rimasti, le
+tabelle delle marche e delle commesse (i tagli ne salvano solo l'indice) e la
+posizione di ogni sezione. All'apertura le sezioni vengono mappate in memoria
+con np.memmap: nessun MarkedPiece viene creato finché non si chiede una barra.
+"""
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from cutting_stock_optimizer import CuttingPattern, MarkedPiece, PieceRole
+from plan_result import PlanResult
+
+MAGIC = b"CSOPLAN\0"
+VERSION = 1
+
+# Indici speciali nella sezione cut_marks
+NO_MARK = -1       # MarkedPiece senza marca
+PLAIN_CUT = -2     # taglio salvato come float semplice
+
+SECTIONS = (
+    ('bar_offsets', '<i8'),
+    ('wastes', '<f8'),
+    ('cut_lengths', '<f8'),
+    ('cut_marks', '<i4'),
+    ('cut_orders', '<i4'),
+    ('cut_roles', '<u1'),
+    ('cut_segments', '<u2'),
+    ('cut_types', '<i4'),
+)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _piece_record(piece, qty) -> list:
+    if isinstance(piece, MarkedPiece):
+        return [piece.length, piece.mark, piece.order, qty, True, int(piece.role), piece.segments, piece.type_id]
+    return [piece, None, None, qty, False]
+
+
+def _piece_from_record(length, mark, order, qty, marked, role=0, segments=0, type_id=None):
+    return (MarkedPiece(length, mark, order, PieceRole(role), segments, type_id) if marked else length), qty
+
+
+def plan_arrays(patterns) -> Tuple[Dict[str, np.ndarray], List[str], List[str]]:
+    """
+    Sezioni del file per una lista di pattern, con le tabelle delle marche e delle
+    commesse a cui rimandano cut_marks e cut_orders.
+    """
+    n_bars = len(patterns)
+    sizes = np.fromiter((len(p.cuts) for p in patterns), dtype=np.int64, count=n_bars)
+    n_cuts = int(sizes.sum())
+
+    marks: Dict[Optional[str], int] = {}
+    orders: Dict[Optional[str], int] = {}
+
+    def mark_index(cut) -> int:
+        if not isinstance(cut, MarkedPiece):
+            return PLAIN_CUT
+        if cut.mark is None:
+            return NO_MARK
+        return marks.setdefault(cut.mark, len(marks))
+
+    def order_index(cut) -> int:
+        order = getattr(cut, 'order', None)
+        if order is None:
+            return -1
+        return orders.setdefault(order, len(orders))
+
+    arrays = {
+        'bar_offsets': np.concatenate(([0], np.cumsum(sizes))).astype('<i8'),
+        'wastes': np.fromiter((p.waste for p in patterns), dtype='<f8', count=n_bars),
+        'cut_lengths': np.fromiter((c.length if isinstance(c, MarkedPiece) else c
+                                    for p in patterns for c in p.cuts), dtype='<f8', count=n_cuts),
+        'cut_marks': np.fromiter((mark_index(c) for p in patterns for c in p.cuts), dtype='<i4', count=n_cuts),
+        'cut_orders': np.fromiter((order_index(c) for p in patterns for c in p.cuts), dtype='<i4', count=n_cuts),
+        'cut_roles': np.fromiter((getattr(c, 'role', 0) for p in patterns for c in p.cuts), dtype='<u1', count=n_cuts),
+        'cut_segments': np.fromiter((getattr(c, 'segments', 0) for p in patterns for c in p.cuts),
+                                    dtype='<u2', count=n_cuts),
+        'cut_types': np.fromiter((-1 if getattr(c, 'type_id', None) is None else c.type_id
+                                  for p in patterns for c in p.cuts), dtype='<i4', count=n_cuts),
+    }
+    return arrays, list(marks), list(orders)
+
+
+def save_plan(path: str, result: PlanResult) -> None:
+    """Scrive il risultato di un'ottimizzazione in path."""
+    arrays, marks, orders = plan_arrays(result.patterns)
+
+    header = {
+        'stock_length': result.stock_length,
+        'blade_width': result.blade_width,
+        'lower_bound': result.lower_bound,
+        'partial': result.partial,
+        'method': result.method,
+        'joint_combinations': dict(result.joint_combinations),
+        'min_waste': result.min_waste,
+        'max_joints': result.max_joints,
+        'longer_than': result.longer_than,
+        'remaining': [_piece_record(piece, qty) for piece, qty in result.remaining.items()],
+        'marks': marks,
+        'orders': orders,
+        'sections': {},
+    }
+
+    # Le posizioni delle sezioni dipendono dalla lunghezza dell'header: si itera
+    # finché la lunghezza si stabilizza (al più un paio di volte)
+    header_bytes = b''
+    while True:
+        start = _align(len(MAGIC) + 8 + len(header_bytes))
+        offset = start
+        for name, dtype in SECTIONS:
+            header['sections'][name] = {'offset': offset, 'count': int(len(arrays[name]))}
+            offset = _align(offset + arrays[name].nbytes)
+        encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        # Si assegna prima di uscire: l'header scritto deve essere la codifica
+        # che contiene le posizioni appena calcolate
+        done = len(encoded) == len(header_bytes)
+        header_bytes = encoded
+        if done:
+            break
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.array([VERSION, len(header_bytes)], dtype='<u4').tobytes())
+        f.write(header_bytes)
+        for name, _ in SECTIONS:
+            section = header['sections'][name]
+            f.write(b'\0' * (section['offset'] - f.tell()))
+            f.write(arrays[name].tobytes())
+
+
+class PlanFile:
+    """
+    Piano aperto da load_plan. Le sezioni sono mappate in memoria; le barre
+    si leggono una alla volta con cuts() o iterando su patterns().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a cutting plan file")
+            version, header_len = np.frombuffer(f.read(8), dtype='<u4')
+            if version > VERSION:
+                raise ValueError(f"Unsupported plan file version {version} (max {VERSION})")
+            header = json.loads(f.read(int(header_len)).decode('utf-8'))
+
+        self.stock_length = header['stock_length']
+        self.blade_width = header['blade_width']
+        self.lower_bound = header['lower_bound']
+        self.partial = header['partial']
+        self.method = header['method']
+        self.joint_combinations: Dict[str, int] = header['joint_combinations']
+        self.min_waste: Optional[float] = header['min_waste']
+        self.max_joints: Optional[int] = header['max_joints']
+        self.longer_than: Optional[float] = header['longer_than']
+        self.remaining = dict(_piece_from_record(*record) for record in header['remaining'])
+        self.marks: List[str] = header['marks']
+        self.orders: List[str] = header['orders']
+
+        for name, dtype in SECTIONS:
+            section = header['sections'][name]
+            if section['count']:
+                array = np.memmap(path, dtype=dtype, mode='r', offset=section['offset'], shape=(section['count'],))
+            else:
+                array = np.empty(0, dtype=dtype)
+            setattr(self, name, array)
+
+    def close(self):
+        """Rilascia le mappature (su Windows il file resta bloccato finché sono aperte)."""
+        for name, dtype in SECTIONS:
+            setattr(self, name, np.empty(0, dtype=dtype))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def bar_count(self) -> int:
+        return len(self.wastes)
+
+    @property
+    def cut_count(self) -> int:
+        return len(self.cut_lengths)
+
+    def __len__(self) -> int:
+        return self.bar_count
+
+    def _cut(self, length: float, mark: int, order: int, role: int, segments: int, type_id: int):
+        if mark == PLAIN_CUT:
+            return length
+        return MarkedPiece(length, self.marks[mark] if mark >= 0 else None,
+                           self.orders[order] if order >= 0 else None,
+                           PieceRole(role), segments, type_id if type_id >= 0 else None)
+
+    def cut_slice(self, index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Viste (lunghezze, indici marca, indici commessa) della barra index, senza copie."""
+        start, end = self.bar_offsets[index], self.bar_offsets[index + 1]
+        return self.cut_lengths[start:end], self.cut_marks[start:end], self.cut_orders[start:end]
+
+    def cuts(self, index: int) -> list:
+        start, end = self.bar_offsets[index], self.bar_offsets[index + 1]
+        columns = (self.cut_lengths, self.cut_marks, self.cut_orders, self.cut_roles, self.cut_segments, self.cut_types)
+        return [self._cut(*cut) for cut in zip(*(column[start:end].tolist() for column in columns))]
+
+    def pattern(self, index: int) -> CuttingPattern:
+        return CuttingPattern(self.cuts(index), float(self.wastes[index]))
+
+    def patterns(self) -> Iterator[CuttingPattern]:
+        for index in range(self.bar_count):
+            yield self.pattern(index)
+
+    def to_result(self) -> PlanResult:
+        """Ricostruisce il PlanResult completo (crea tutti i tagli)."""
+        return PlanResult(list(self.patterns()), self.remaining, self.stock_length, self.blade_width,
+                          self.lower_bound, self.partial, self.method, self.joint_combinations,
+                          self.min_waste, self.max_joints, self.longer_than)
+
+
+def load_plan(path: str) -> PlanFile:
+    return PlanFile(path)
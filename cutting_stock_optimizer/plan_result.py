@@ -0,0 +1,120 @@
+"""
+Risultato immutabile di un'ottimizzazione.
+
+Le statistiche (sfrido, utilizzo, conteggi dei pezzi e delle giunzioni) vengono
+calcolate una sola volta alla creazione, con aggregazioni NumPy sui tagli;
+stampa, PDF ed esportazioni le leggono da qui invece di ripercorrere i pattern.
+
+Per compatibilità il risultato si comporta come la vecchia tupla (patterns, remaining):
+    patterns, remaining = optimizer.optimize(pieces)
+    patterns = optimizer.optimize(pieces)[0]
+len(result) vale quindi 2; il numero di barre è result.bar_count.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+def _cut_length(cut) -> float:
+    return cut.length if hasattr(cut, 'length') else cut
+
+
+def _cut_role(cut) -> int:
+    return getattr(cut, 'role', 0)
+
+
+def _cut_order(cut) -> Optional[str]:
+    return getattr(cut, 'order', None)
+
+
+@dataclass(frozen=True, eq=False)
+class PlanResult:
+    patterns: Tuple = ()
+    remaining: Mapping = field(default_factory=dict)
+    stock_length: float = 0.0
+    blade_width: float = 0.0
+    lower_bound: int = 0
+    partial: bool = False
+    method: Optional[str] = None
+    joint_combinations: Mapping[str, int] = field(default_factory=dict)
+    # Parametri delle giunzioni (None per i piani senza giunzioni)
+    min_waste: Optional[float] = None
+    max_joints: Optional[int] = None
+    longer_than: Optional[float] = None
+
+    # Statistiche calcolate in __post_init__
+    bar_count: int = field(init=False)
+    wastes: np.ndarray = field(init=False, repr=False)
+    usage: np.ndarray = field(init=False, repr=False)
+    total_waste: float = field(init=False)
+    total_usage: float = field(init=False)
+    cut_counts: Mapping[float, int] = field(init=False, repr=False)
+    piece_counts: Mapping[float, int] = field(init=False, repr=False)
+    order_counts: Mapping[str, int] = field(init=False, repr=False)
+    joint_parts: Mapping[str, Tuple[float, ...]] = field(init=False, repr=False)
+    joint_count: int = field(init=False)
+    remaining_count: int = field(init=False)
+
+    def __post_init__(self):
+        set_ = object.__setattr__
+        patterns = tuple(self.patterns)
+        set_(self, 'patterns', patterns)
+        set_(self, 'remaining', MappingProxyType(dict(self.remaining)))
+        set_(self, 'joint_combinations', MappingProxyType(dict(self.joint_combinations)))
+
+        n_bars = len(patterns)
+        sizes = np.fromiter((len(p.cuts) for p in patterns), dtype=np.int64, count=n_bars)
+        n_cuts = int(sizes.sum())
+        lengths = np.fromiter((_cut_length(c) for p in patterns for c in p.cuts), dtype=np.float64, count=n_cuts)
+        wastes = np.fromiter((p.waste for p in patterns), dtype=np.float64, count=n_bars)
+
+        # I segmenti (FULL, COMP, giunzioni) non contano come pezzi interi
+        whole = np.fromiter((_cut_role(c) for p in patterns for c in p.cuts), dtype=np.int8, count=n_cuts) == 0
+
+        stock = float(self.stock_length)
+        set_(self, 'bar_count', n_bars)
+        set_(self, 'wastes', wastes)
+        set_(self, 'usage', (stock - wastes) / stock if stock else np.zeros(n_bars))
+        set_(self, 'total_waste', float(wastes.sum()))
+        set_(self, 'total_usage',
+             float((n_bars * stock - wastes.sum()) / (n_bars * stock)) if n_bars and stock else 0.0)
+        set_(self, 'cut_counts', MappingProxyType(self._count(lengths)))
+        set_(self, 'piece_counts', MappingProxyType(self._count(lengths[whole])))
+        # Tagli per commessa, segmenti di giunzione e sovradimensionati compresi
+        set_(self, 'order_counts', MappingProxyType(dict(Counter(
+            order for order in (_cut_order(c) for p in patterns for c in p.cuts) if order is not None
+        ))))
+        set_(self, 'joint_parts', MappingProxyType({
+            key: tuple(float(x) for x in key.split(" + ")) for key in self.joint_combinations
+        }))
+        set_(self, 'joint_count', int(sum(self.joint_combinations.values())))
+        set_(self, 'remaining_count', int(sum(qty for qty in self.remaining.values() if qty > 0)))
+
+    @staticmethod
+    def _count(lengths: np.ndarray) -> Dict[float, int]:
+        values, counts = np.unique(lengths, return_counts=True)
+        return {float(v): int(c) for v, c in zip(values, counts)}
+
+    @property
+    def average_waste(self) -> float:
+        return self.total_waste / self.bar_count if self.bar_count else 0.0
+
+    def _as_tuple(self) -> Tuple:
+        return self.patterns, self.remaining
+
+    def __iter__(self):
+        return iter(self._as_tuple())
+
+    def __getitem__(self, index):
+        return self._as_tuple()[index]
+
+    def __len__(self) -> int:
+        return len(self._as_tuple())
+
+    def __reduce__(self):
+        # MappingProxyType non è serializzabile: si ricostruisce dai campi di input
+        return (PlanResult, (self.patterns, dict(self.remaining), self.stock_length, self.blade_width,
+                             self.lower_bound, self.partial, self.method, dict(self.joint_combinations),
+                             self.min_waste, self.max_joints, self.longer_than))
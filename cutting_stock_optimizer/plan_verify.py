@@ -0,0 +1,217 @@
+"""
+Verifica veloce di un piano di taglio, per i test dei solutori e come controllo
+dopo ogni ottimizzazione.
+
+verify_plan controlla con operazioni su array che:
+- nessuna barra superi stock_length, lame comprese;
+- ogni pezzo dell'ordine sia tagliato una volta o riportato nei rimasti;
+- i segmenti (FULL, COMP, giunzioni) di ogni pezzo sommino alla sua lunghezza
+  e ogni giunzione abbia tutti i suoi segmenti;
+- lo sfrido riportato per ogni barra sia quello ricalcolato.
+
+I segmenti di pezzi uguali non si distinguono tra loro: le somme si controllano
+per tipo di pezzo. Un PlanFile si verifica direttamente sulle sezioni mappate
+(millisecondi anche con 10^6 tagli); una lista di pattern va prima convertita
+negli stessi array, e la conversione costa più della verifica.
+"""
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from cutting_stock_optimizer import MarkedPiece, PieceRole
+from plan_file import PLAIN_CUT, SECTIONS, PlanFile, plan_arrays
+from plan_result import PlanResult
+
+MAX_LISTED = 5
+
+
+def _param(params, name: str) -> float:
+    if isinstance(params, Mapping):
+        return float(params[name])
+    return float(getattr(params, name))
+
+
+def _sections(patterns) -> Tuple[Dict[str, np.ndarray], List[str], List[str]]:
+    if isinstance(patterns, PlanFile):
+        return {name: getattr(patterns, name) for name, _ in SECTIONS}, patterns.marks, patterns.orders
+    if isinstance(patterns, PlanResult):
+        patterns = patterns.patterns
+    return plan_arrays(list(patterns))
+
+
+def _order_rows(order) -> List[Tuple[float, int, Optional[str], Optional[str]]]:
+    rows = []
+    for piece in order:
+        if isinstance(piece[0], MarkedPiece):
+            rows.append((piece[0].length, piece[1], piece[0].mark, piece[0].order))
+        else:
+            rows.append((piece[0], piece[1], piece[2] if len(piece) >= 3 else None,
+                         piece[3] if len(piece) == 4 else None))
+    return rows
+
+
+def _listed(values) -> str:
+    shown = ", ".join(str(v) for v in values[:MAX_LISTED])
+    return shown + (", ..." if len(values) > MAX_LISTED else "")
+
+
+def _check_bars(offsets: np.ndarray, lengths: np.ndarray, wastes: np.ndarray, stock: float, blade: float,
+                tolerance: float) -> List[str]:
+    """Lunghezza usata e sfrido di ogni barra, con una somma per segmenti sui tagli."""
+    errors = []
+    sizes = np.diff(offsets)
+    used = np.zeros(len(sizes))
+    filled = sizes > 0
+    if lengths.size:
+        used[filled] = np.add.reduceat(lengths, offsets[:-1][filled])
+
+    bad = np.flatnonzero(lengths <= 0)
+    if bad.size:
+        errors.append(f"{bad.size} cuts have a non-positive length (cuts {_listed(bad)})")
+
+    # L'ultimo taglio non consuma lama, come in _can_fit
+    over = np.flatnonzero(used + np.maximum(sizes - 1, 0) * blade > stock + tolerance)
+    if over.size:
+        errors.append(f"{over.size} bars exceed the stock length (bars {_listed(over)})")
+
+    expected = np.where(filled, np.maximum(0.0, stock - used - sizes * blade), stock)
+    wrong = np.flatnonzero(np.abs(wastes - expected) > tolerance)
+    if wrong.size:
+        errors.append(f"{wrong.size} bars report a wrong waste (bars {_listed(wrong)}, "
+                      f"first: {wastes[wrong[0]]:.2f} instead of {expected[wrong[0]]:.2f})")
+    return errors
+
+
+def verify_plan(patterns, remaining: Mapping, order, params, tolerance: float = 1e-6) -> List[str]:
+    """
+    Controlla un piano e restituisce la lista dei problemi trovati (vuota se è valido).
+    patterns: lista di CuttingPattern, PlanResult o PlanFile aperto con load_plan.
+    remaining: pezzi non tagliati, come nel risultato dell'ottimizzazione.
+    order: i pezzi passati al solutore, (lunghezza, quantità[, marca[, commessa]]).
+    params: oggetto o dizionario con stock_length e blade_width (per esempio l'ottimizzatore).
+    """
+    stock = _param(params, 'stock_length')
+    blade = _param(params, 'blade_width')
+    arrays, marks, orders = _sections(patterns)
+    offsets = np.asarray(arrays['bar_offsets'], dtype=np.int64)
+    lengths = np.asarray(arrays['cut_lengths'], dtype=np.float64)
+    errors = _check_bars(offsets, lengths, np.asarray(arrays['wastes'], dtype=np.float64), stock, blade, tolerance)
+
+    # Ogni riga dell'ordine diventa una chiave intera (lunghezza, marca, commessa);
+    # le righe uguali finiscono nello stesso gruppo
+    rows = _order_rows(order)
+    mark_ids = {mark: i for i, mark in enumerate(marks)}
+    order_ids = {name: i for i, name in enumerate(orders)}
+    for _, _, mark, name in rows:
+        if mark is not None:
+            mark_ids.setdefault(mark, len(mark_ids))
+        if name is not None:
+            order_ids.setdefault(name, len(order_ids))
+    n_marks, n_orders = len(mark_ids) + 1, len(order_ids) + 1
+
+    row_lengths = np.array([row[0] for row in rows], dtype=np.float64)
+    row_qty = np.array([row[1] for row in rows], dtype=np.int64)
+    row_marks = np.array([-1 if row[2] is None else mark_ids[row[2]] for row in rows], dtype=np.int64)
+    row_orders = np.array([-1 if row[3] is None else order_ids[row[3]] for row in rows], dtype=np.int64)
+    unique_lengths = np.unique(row_lengths)
+
+    def keys(lengths, mark_index, order_index):
+        code = np.searchsorted(unique_lengths, lengths)
+        exact = code < len(unique_lengths)
+        exact[exact] = unique_lengths[code[exact]] == lengths[exact]
+        return (code * n_marks + mark_index + 1) * n_orders + order_index + 1, exact
+
+    row_keys, _ = keys(row_lengths, row_marks, row_orders)
+    group_keys, first_row, row_group = np.unique(row_keys, return_index=True, return_inverse=True)
+    n_groups = len(group_keys)
+    demand = np.bincount(row_group, weights=row_qty, minlength=n_groups)
+    group_lengths = row_lengths[first_row]
+
+    def describe(groups) -> str:
+        labels = []
+        for g in groups[:MAX_LISTED]:
+            length, _, mark, name = rows[first_row[g]]
+            labels.append(f"{length:.2f}" + (f" {mark}" if mark is not None else "")
+                          + (f" ({name})" if name is not None else ""))
+        return ", ".join(labels) + (", ..." if len(groups) > MAX_LISTED else "")
+
+    # Gruppo di ogni taglio: dal type_id se c'è, altrimenti dalla chiave
+    types = np.asarray(arrays['cut_types'])
+    group = np.full(len(lengths), -1, dtype=np.int64)
+    typed = (types >= 0) & (types < len(rows))
+    group[typed] = row_group[types[typed]]
+    untyped = np.flatnonzero(types < 0)
+    if untyped.size and n_groups:
+        cut_marks = np.asarray(arrays['cut_marks'], dtype=np.int64)[untyped]
+        cut_marks[cut_marks == PLAIN_CUT] = -1
+        cut_keys, exact = keys(lengths[untyped], cut_marks, np.asarray(arrays['cut_orders'], dtype=np.int64)[untyped])
+        position = np.minimum(np.searchsorted(group_keys, cut_keys), n_groups - 1)
+        found = exact & (group_keys[position] == cut_keys)
+        group[untyped[found]] = position[found]
+    unmatched = np.flatnonzero(group < 0)
+    if unmatched.size:
+        bars = np.searchsorted(offsets, unmatched, side='right') - 1
+        errors.append(f"{unmatched.size} cuts match no ordered piece (bars {_listed(np.unique(bars))})")
+
+    roles = np.asarray(arrays['cut_roles'])
+    valid = group >= 0
+    whole = valid & (roles == PieceRole.WHOLE)
+    segment = valid & (roles != PieceRole.WHOLE)
+    whole_cut = np.bincount(group[whole], minlength=n_groups)
+    segment_length = np.bincount(group[segment], weights=lengths[segment], minlength=n_groups)
+    segment_count = np.bincount(group[segment], minlength=n_groups)
+
+    # I tagli senza type_id hanno già la lunghezza esatta della loro chiave
+    checked = np.flatnonzero(whole & typed)
+    wrong = checked[np.abs(lengths[checked] - group_lengths[group[checked]]) > tolerance]
+    if wrong.size:
+        errors.append(f"{wrong.size} whole cuts differ from their ordered length (cuts {_listed(wrong)})")
+
+    # Ogni segmento di una giunzione vale 1/segments di pezzo: la somma per tipo deve essere intera
+    joint = valid & ((roles & PieceRole.JOINT) != 0)
+    joint_segments = np.asarray(arrays['cut_segments'], dtype=np.float64)[joint]
+    if (joint_segments < 2).any():
+        errors.append(f"{int((joint_segments < 2).sum())} joint cuts have fewer than 2 segments")
+    jointed = np.bincount(group[joint], weights=1 / np.maximum(joint_segments, 1), minlength=n_groups)
+    incomplete = np.flatnonzero(np.abs(jointed - np.round(jointed)) > 1e-6)
+    if incomplete.size:
+        errors.append(f"Joints with missing segments: {describe(incomplete)}")
+
+    # I rimasti sono pochi: un ciclo Python basta
+    key_group = {(row[0], row[2], row[3]): row_group[i] for i, row in enumerate(rows)}
+    whole_left = np.zeros(n_groups, dtype=np.int64)
+    stray = []
+    for piece, qty in remaining.items():
+        if qty <= 0:
+            continue
+        if isinstance(piece, MarkedPiece):
+            length, role, type_id = piece.length, piece.role, piece.type_id
+            g = row_group[type_id] if type_id is not None and 0 <= type_id < len(rows) \
+                else key_group.get((length, piece.mark, piece.order))
+        else:
+            length, role = piece, PieceRole.WHOLE
+            g = key_group.get((length, None, None))
+        if g is None:
+            stray.append(piece)
+        elif role == PieceRole.WHOLE:
+            whole_left[g] += qty
+        else:
+            segment_length[g] += length * qty
+            segment_count[g] += qty
+    if stray:
+        errors.append(f"{len(stray)} remaining pieces match no ordered piece")
+
+    # I pezzi non tagliati interi né rimasti devono essere coperti dai loro segmenti
+    split = demand - whole_cut - whole_left
+    extra = np.flatnonzero(split < 0)
+    if extra.size:
+        errors.append(f"Pieces cut or left over more times than ordered: {describe(extra)}")
+    expected = np.maximum(split, 0) * group_lengths
+    mismatch = np.abs(segment_length - expected) > tolerance * (segment_count + 1)
+    missing = np.flatnonzero(mismatch & (segment_count == 0))
+    if missing.size:
+        errors.append(f"Pieces neither cut nor reported as remaining: {describe(missing)}")
+    uneven = np.flatnonzero(mismatch & (segment_count > 0))
+    if uneven.size:
+        errors.append(f"Segments do not add up to their piece: {describe(uneven)}")
+    return errors
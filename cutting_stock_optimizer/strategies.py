@@ -0,0 +1,140 @@
+"""
+Registro delle strategie di ottimizzazione, condiviso dalle due classi.
+
+Tre famiglie, selezionabili per nome:
+- pattern: (optimizer, remaining_pieces) -> iterabile di CuttingPattern.
+  Genera le barre e decrementa remaining_pieces per ogni pezzo tagliato.
+  Scelta con il parametro method di optimize / optimize_with_waste.
+- joint: (optimizer) -> None. Pianifica le giunzioni modificando
+  optimizer._cuts_dict e optimizer.joint_combinations.
+  Scelta con WasteCuttingStockOptimizer.joint_strategy.
+- improve: (optimizer, patterns) -> lista di CuttingPattern. Migliora un piano
+  completo senza cambiare l'insieme dei tagli. Scelte con optimizer.improve
+  (lista di nomi, applicate in ordine).
+
+Un nuovo motore si aggiunge con il decoratore della sua famiglia, senza
+toccare giunzioni e report; tests/test_strategies.py lo verifica in automatico.
+"""
+from collections import Counter
+from typing import Callable, Dict, List
+
+from exact_solver import ExactSolver
+
+PATTERN_STRATEGIES: Dict[str, Callable] = {}
+JOINT_STRATEGIES: Dict[str, Callable] = {}
+IMPROVE_STRATEGIES: Dict[str, Callable] = {}
+
+_FAMILIES = {
+    'pattern': PATTERN_STRATEGIES,
+    'joint': JOINT_STRATEGIES,
+    'improve': IMPROVE_STRATEGIES,
+}
+
+
+def _register(registry: Dict[str, Callable], name: str):
+    def decorator(strategy: Callable) -> Callable:
+        registry[name] = strategy
+        return strategy
+    return decorator
+
+
+def register_pattern_strategy(name: str):
+    return _register(PATTERN_STRATEGIES, name)
+
+
+def register_joint_strategy(name: str):
+    return _register(JOINT_STRATEGIES, name)
+
+
+def register_improve_strategy(name: str):
+    return _register(IMPROVE_STRATEGIES, name)
+
+
+def get_strategy(family: str, name: str) -> Callable:
+    registry = _FAMILIES[family]
+    if name not in registry:
+        expected = ", ".join(f"'{key}'" for key in registry)
+        raise ValueError(f"Unknown {family} strategy '{name}', expected one of {expected}")
+    return registry[name]
+
+
+def available_strategies() -> Dict[str, List[str]]:
+    return {family: list(registry) for family, registry in _FAMILIES.items()}
+
+
+# Strategie di generazione dei pattern
+
+@register_pattern_strategy('greedy')
+def greedy_patterns(optimizer, remaining_pieces):
+    return optimizer._iter_greedy(remaining_pieces)
+
+
+@register_pattern_strategy('exact')
+def exact_patterns(optimizer, remaining_pieces):
+    return optimizer._optimize_exact(remaining_pieces, force=True)
+
+
+@register_pattern_strategy('auto')
+def auto_patterns(optimizer, remaining_pieces):
+    return optimizer._optimize_exact(remaining_pieces, force=False)
+
+
+@register_pattern_strategy('multistart')
+def multistart_patterns(optimizer, remaining_pieces):
+    return optimizer._optimize_multistart(remaining_pieces)
+
+
+@register_pattern_strategy('bfd')
+def bfd_patterns(optimizer, remaining_pieces):
+    return optimizer._optimize_bfd(remaining_pieces)
+
+
+@register_pattern_strategy('decompose')
+def decomposed_patterns(optimizer, remaining_pieces):
+    return optimizer._optimize_decomposed(remaining_pieces)
+
+
+# Strategie di giunzione
+
+@register_joint_strategy('global')
+def global_joints(optimizer):
+    optimizer._plan_joints_global()
+
+
+@register_joint_strategy('none')
+def no_joints(optimizer):
+    pass
+
+
+# Strategie di miglioramento
+
+@register_improve_strategy('repack')
+def repack_worst_bars(optimizer, patterns, max_bars: int = 8, max_pieces: int = 40):
+    """
+    Riottimizza in modo esatto i pezzi delle barre con più sfrido: se ci stanno
+    in meno barre, queste sostituiscono quelle originali.
+    """
+    if len(patterns) < 2:
+        return patterns
+    worst = sorted(range(len(patterns)), key=lambda i: -patterns[i].waste)
+    chosen, n_pieces = [], 0
+    for i in worst[:max_bars]:
+        if n_pieces + len(patterns[i].cuts) > max_pieces:
+            break
+        chosen.append(i)
+        n_pieces += len(patterns[i].cuts)
+    if len(chosen) < 2:
+        return patterns
+
+    demand = Counter(cut for i in chosen for cut in patterns[i].cuts)
+    types = sorted(demand, key=lambda piece: -(piece.length if hasattr(piece, 'length') else piece))
+    lengths = [piece.length if hasattr(piece, 'length') else piece for piece in types]
+    solver = ExactSolver(lengths, optimizer.stock_length, optimizer.blade_width, should_stop=optimizer._should_stop)
+    solution = solver.solve([demand[piece] for piece in types], len(chosen))
+    if not solution:
+        return patterns
+
+    bars = [[i for i, used in enumerate(pattern) for _ in range(used)] for pattern in solution]
+    repacked = optimizer._patterns_from_bars(types, bars, dict(demand))
+    chosen = set(chosen)
+    return [pattern for i, pattern in enumerate(patterns) if i not in chosen] + repacked
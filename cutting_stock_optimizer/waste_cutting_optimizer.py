@@ -1,9 +1,19 @@
-from typing import List, Tuple, Dict, Union, Optional
+from typing import List, Tuple, Dict, Union, Optional, Iterator
 from dataclasses import dataclass
 from collections import Counter, defaultdict
-from itertools import combinations
-from cutting_stock_optimizer import StrictCuttingStockOptimizer, CuttingPattern, MarkedPiece
+from bisect import bisect_left, bisect_right
+from cutting_stock_optimizer import StrictCuttingStockOptimizer, CuttingPattern, MarkedPiece, PieceRole, PlanProgress
 from PDF_cut_list import CuttingListPDF
+from lower_bounds import jointed_lower_bound, optimality_gap
+from plan_result import PlanResult
+from strategies import get_strategy
+
+# Sotto queste soglie il costo dei processi supera il guadagno della ricerca parallela
+PARALLEL_MIN_JOINTS = 4
+PARALLEL_MIN_POOL = 48
+# Nodi del branch and bound sull'assegnazione delle giunzioni
+JOINT_NODE_LIMIT = 20_000
+JOINT_MAX_TARGETS = 200
 
 @dataclass
 class JointCombination:
@@ -11,9 +21,195 @@ class JointCombination:
     wastes: List[float]
     total_waste: float
 
+def split_oversize(length: float, stock_length: float) -> Tuple[int, float]:
+    """
+    Numero di barre intere e resto per un pezzo più lungo della barra: i segmenti
+    sono ceil(length / stock_length), tutti lunghi stock_length tranne l'ultimo.
+    Con un multiplo esatto il resto è 0 e non c'è segmento COMP.
+    """
+    full_count = int(length // stock_length)
+    remaining_length = length - full_count * stock_length
+    # Resti dovuti solo all'arrotondamento dei float non diventano segmenti
+    if remaining_length < 1e-6:
+        remaining_length = 0.0
+    return full_count, remaining_length
+
+
+def find_best_combination(wastes: List[float], need: float, n_joints: int,
+                          first_range: Optional[range] = None, should_stop=None,
+                          shared_bound=None) -> Optional[Tuple[float, Tuple[int, ...]]]:
+    """
+    Cerca n_joints indici distinti di wastes (ordinato in modo crescente) la cui
+    somma è >= need con la minima eccedenza. Gli indici vengono visitati in ordine
+    lessicografico: a parità di eccedenza vince la prima combinazione.
+    L'ultimo indice si trova con bisect, i prefissi senza speranza vengono potati.
+    first_range limita il primo indice (per dividere la ricerca tra più processi).
+    shared_bound: sequenza di un elemento con la migliore eccedenza trovata dagli
+    altri processi; pota solo i rami strettamente peggiori, così i pareggi restano
+    e l'unione dei risultati coincide con la ricerca seriale.
+
+    Restituisce (eccedenza, indici) oppure None.
+    """
+    m = len(wastes)
+    if n_joints < 1 or m < n_joints:
+        return None
+
+    # top[k] = somma dei k scarti più grandi
+    top = [0.0]
+    for waste in reversed(wastes[-n_joints:]):
+        top.append(top[-1] + waste)
+
+    best = None
+    visited = 0
+    chosen = []
+
+    def search(start: int, k_left: int, partial: float, indices) -> bool:
+        nonlocal best, visited
+        if k_left == 1:
+            j = bisect_left(wastes, need - partial - 1e-9, lo=start)
+            if j < m:
+                surplus = partial + wastes[j] - need
+                if best is None or surplus < best[0]:
+                    best = (surplus, tuple(chosen) + (j,))
+                    if shared_bound is not None and surplus < shared_bound[0]:
+                        shared_bound[0] = surplus
+                    return surplus <= 1e-9
+            return False
+
+        for i in indices:
+            visited += 1
+            if should_stop is not None and visited % 1024 == 0 and should_stop():
+                return True
+            if partial + wastes[i] + top[k_left - 1] < need - 1e-9:
+                continue
+            # Il minimo raggiungibile da qui cresce con i: se supera il migliore, basta
+            lowest = partial + sum(wastes[i:i + k_left])
+            if best is not None and lowest - need >= best[0]:
+                break
+            if shared_bound is not None and lowest - need > shared_bound[0]:
+                break
+            chosen.append(i)
+            done = search(i + 1, k_left - 1, partial + wastes[i], range(i + 1, m - k_left + 2))
+            chosen.pop()
+            if done:
+                return True
+        return False
+
+    if first_range is None:
+        first_range = range(0, m - n_joints + 1)
+    search(0, n_joints, 0.0, first_range)
+    if should_stop is not None and should_stop():
+        return None
+    return best
+
+
+class _AssignmentStopped(Exception):
+    pass
+
+
+def plan_joint_assignment(targets: List[Tuple[int, float]], wastes: Dict[int, float], max_joints: int,
+                          blade_width: float, min_waste: float, beat: int = 0, max_cover: Optional[int] = None,
+                          node_limit: int = JOINT_NODE_LIMIT,
+                          should_stop=None) -> Optional[List[Tuple[int, Tuple[int, ...]]]]:
+    """
+    Assegnazione globale dei pezzi da giuntare agli scarti, con branch and bound.
+
+    targets: (barra, lunghezza del pezzo) delle barre con un solo pezzo, dal più lungo.
+    wastes: scarto attuale di ogni barra.
+    Ogni pezzo viene coperto oppure lasciato sulla sua barra; coprirlo elimina la
+    barra, toglie dal pool gli scarti usati e vi rimette il residuo dell'ultima
+    barra donatrice, come fa _update_cuts_dict. Per un pezzo coperto si prova solo
+    la combinazione con meno giunzioni e minima eccedenza: la ricerca decide quali
+    pezzi coprire e in che ordine consumano il pool, ed è esatta su queste scelte.
+    Ogni pezzo coperto consuma almeno lunghezza + lama di scarto: i pezzi più
+    corti finché basta lo scarto totale limitano quanti se ne possono ancora coprire.
+
+    beat: barre già eliminate da un'altra assegnazione; conta solo un piano migliore.
+    max_cover: oltre questo numero di barre eliminate il piano è ottimo.
+    Restituisce le coppie (barra eliminata, barre donatrici) nell'ordine in cui
+    applicarle, oppure None se entro node_limit nodi non si trova di meglio.
+    """
+    if max_cover is None:
+        max_cover = len(targets)
+    pool = sorted((waste, bar_idx) for bar_idx, waste in wastes.items() if waste >= min_waste)
+    best_count, best_plan = beat, None
+    plan = []
+    nodes = 0
+
+    def pool_without(pool_wastes, pool_bars, drop):
+        kept = [(waste, bar_idx) for waste, bar_idx in zip(pool_wastes, pool_bars) if bar_idx not in drop]
+        return [waste for waste, _ in kept], [bar_idx for _, bar_idx in kept]
+
+    def coverable(i, pool_wastes, donated) -> int:
+        mass = sum(pool_wastes) + 1e-9
+        count = 0
+        for need in sorted(length + blade_width for bar_idx, length in targets[i:] if bar_idx not in donated):
+            mass -= need
+            if mass < 0:
+                break
+            count += 1
+        return count
+
+    def search(i, pool_wastes, pool_bars, donated, count):
+        nonlocal best_count, best_plan, nodes
+        nodes += 1
+        if nodes > node_limit or (should_stop is not None and nodes % 256 == 0 and should_stop()):
+            raise _AssignmentStopped()
+        if count > best_count:
+            best_count, best_plan = count, list(plan)
+        if count >= max_cover or i == len(targets) or count + coverable(i, pool_wastes, donated) <= best_count:
+            return
+
+        bar_idx, length = targets[i]
+        # Una barra che ha già ceduto scarto ha due pezzi: non è più eliminabile
+        if bar_idx not in donated:
+            own_wastes, own_bars = pool_without(pool_wastes, pool_bars, {bar_idx})
+            for n_joints in range(2, max_joints + 1):
+                found = find_best_combination(own_wastes, length + (n_joints - 1) * blade_width, n_joints,
+                                              should_stop=should_stop)
+                if found is None:
+                    if should_stop is not None and should_stop():
+                        raise _AssignmentStopped()
+                    continue
+                current = {own_bars[k]: own_wastes[k] for k in found[1]}
+                donors = tuple(sorted(current))
+                used = [current[donor] for donor in donors]
+                # Stessi conti di _update_cuts_dict per il residuo dell'ultima barra
+                remaining_length = length - used[0] - sum(used[1:-1])
+                residual = used[-1] - remaining_length - blade_width
+                next_wastes, next_bars = pool_without(own_wastes, own_bars, current)
+                if residual >= min_waste:
+                    k = bisect_right(next_wastes, residual)
+                    next_wastes.insert(k, residual)
+                    next_bars.insert(k, donors[-1])
+                plan.append((bar_idx, donors))
+                search(i + 1, next_wastes, next_bars, donated | current.keys(), count + 1)
+                plan.pop()
+                break
+        search(i + 1, pool_wastes, pool_bars, donated, count)
+
+    try:
+        search(0, [waste for waste, _ in pool], [bar_idx for _, bar_idx in pool], frozenset(), 0)
+    except _AssignmentStopped:
+        pass
+    return best_plan
+
+
 class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
-    def __init__(self, stock_length: float, blade_width: float, min_waste: float = 100, max_joints: int = 1, excluded_to_joint: Union[List[int], Tuple, int] = None):
-        super().__init__(stock_length, blade_width)
+    def __init__(self, stock_length: float, blade_width: float, min_waste: float = 100, max_joints: int = 1, excluded_to_joint: Union[List[int], Tuple, int] = None,
+                 length_tolerance: Optional[float] = None, joint_workers: int = 1):
+        """
+        joint_workers: processi per la ricerca delle combinazioni di giunzione;
+        usati solo con max_joints >= 4 e molte barre con scarto utile.
+        """
+        super().__init__(stock_length, blade_width, length_tolerance)
+        self.joint_workers = joint_workers
+        # Strategia di giunzione registrata in strategies: 'global' o 'none'
+        self.joint_strategy = 'global'
+        self.parallel_min_joints = PARALLEL_MIN_JOINTS
+        self.parallel_min_pool = PARALLEL_MIN_POOL
+        self.joint_node_limit = JOINT_NODE_LIMIT
+        self._joint_pool = None
         self._cuts_dict = {}
         self.max_waste_index = None
         self.max_waste_bar = None
@@ -40,18 +236,25 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
         #print("\nDEBUG: Inizializzazione joint_combinations come defaultdict(int)")
         self.joint_combinations = defaultdict(int)
         self._original_pieces = None
+        # type_id delle righe escluse dalle giunzioni, calcolati in _prepare_pieces
+        self._excluded_types = set()
         self.iteration = 0
         self.total_waste = 0
         self.piece_counts = Counter()
         self.patterns = None
         self.remaining = None
+        self.orders = []
 
     
     def _get_piece_length(self, piece):
         return piece.length if isinstance(piece, MarkedPiece) else piece
     
     def _get_piece_mark(self, piece):
-        return piece.mark if isinstance(piece, MarkedPiece) else None
+        """Marca da mostrare, con il ruolo del taglio (FULL, COMP, J/n)."""
+        return piece.display_mark if isinstance(piece, MarkedPiece) else None
+
+    def _get_piece_order(self, piece):
+        return piece.order if isinstance(piece, MarkedPiece) else None
 
     def _generate_cuts_dict(self, patterns):
         self._cuts_dict = {
@@ -73,61 +276,54 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
                        key=lambda k: (available_bars[k][1], k))
         return max_index, available_bars[max_index]
 
-    def _find_waste_combinations_n(self, target_length: float, n_joints: int) -> List[JointCombination]:
-        print(f"\nCercando combinazioni per {n_joints} giunzioni:")
-        print(f"Target length: {target_length:.2f}")
-        
-        combinations_list = []
-        for bar_indices in combinations(self._cuts_dict.keys(), n_joints):
-            if self.max_waste_index in bar_indices:
-                continue
-                
-            wastes = [self._cuts_dict[i][1] for i in bar_indices]
-            if all(waste >= self.min_waste for waste in wastes):
-                total_waste = sum(wastes) - (n_joints - 1) * self.blade_width
-                if total_waste >= target_length:
-                    combination = JointCombination(
-                        list(bar_indices),
-                        wastes,
-                        total_waste
-                    )
-                    combinations_list.append(combination)
-                    print(f"Trovata combinazione valida:")
-                    print(f"  Barre: {combination.bar_indices}")
-                    print(f"  Scarti: {[f'{w:.2f}' for w in combination.wastes]}")
-                    print(f"  Scarto totale: {combination.total_waste:.2f}")
-
-        combinations_list.sort(key=lambda x: abs(x.total_waste - target_length))
-        return combinations_list
+    def _find_best_combination(self, pool_wastes: List[float], pool_bars: List[int],
+                               target_length: float, n_joints: int) -> Optional[JointCombination]:
+        """
+        Combinazione di n_joints scarti del pool (ordinato per scarto) che copre
+        target_length con la minima eccedenza.
+        """
+        need = target_length + (n_joints - 1) * self.blade_width
+        if self._joint_pool is not None and n_joints >= self.parallel_min_joints \
+                and len(pool_wastes) >= self.parallel_min_pool:
+            found = self._joint_pool.search(pool_wastes, need, n_joints, self._deadline, self._should_stop)
+            if self._should_stop():
+                found = None
+        else:
+            found = find_best_combination(pool_wastes, need, n_joints, should_stop=self._should_stop)
+        if found is None:
+            return None
+
+        bar_indices = sorted(pool_bars[i] for i in found[1])
+        wastes = [self._cuts_dict[i][1] for i in bar_indices]
+        return JointCombination(bar_indices, wastes, sum(wastes) - (n_joints - 1) * self.blade_width)
 
     def _process_oversize_pieces(self, pieces):
+        """
+        Divide in una sola passata i pezzi più lunghi della barra: ogni pezzo diventa
+        i segmenti FULL (barre intere) che servono più un resto COMP, il più corto
+        possibile, che il solutore mette negli scarti delle altre barre come un pezzo
+        qualsiasi (e che la pianificazione delle giunzioni può ancora dividere).
+        """
         processed = []
-        processed_count = 0  # Contatore per generare marche fittizie uniche
 
         for piece in pieces:
             p, qty = piece  # `p` è un oggetto MarkedPiece
-            mark = p.mark   # Accedi alla marca dall'attributo `mark`
             length = self._get_piece_length(p)
-            
+
             if length > self.stock_length:
-                full_length = self.stock_length
-                remaining_length = length - self.stock_length
-
-                if mark:  # Usa la marca fornita
-                    full_mark = f"{mark}/FULL"
-                    comp_mark = f"{mark}/COMP"
-                else:  # Genera marche fittizie
-                    base_mark = f"'''${processed_count}'''"
-                    full_mark = f"{base_mark}/FULL"
-                    comp_mark = f"{base_mark}/COMP"
-                    processed_count += 1
-
-                # Aggiungi i pezzi suddivisi
-                processed.append((MarkedPiece(full_length, full_mark), qty))
-                processed.append((MarkedPiece(remaining_length, comp_mark), qty))
+                full_count, remaining_length = split_oversize(length, self.stock_length)
+                segments = [self.stock_length] * full_count
+
+                # La marca dell'utente resta invariata: il ruolo è nei flag
+                processed.append((MarkedPiece(self.stock_length, p.mark, p.order, PieceRole.FULL, type_id=p.type_id),
+                                  qty * full_count))
+                if remaining_length > 0:
+                    segments.append(remaining_length)
+                    processed.append((MarkedPiece(remaining_length, p.mark, p.order, PieceRole.COMP,
+                                                  type_id=p.type_id), qty))
 
                 # Aggiorna `joint_combinations`
-                joint_key = f"{full_length:.2f} + {remaining_length:.2f}"
+                joint_key = " + ".join(f"{segment:.2f}" for segment in segments)
                 self.joint_combinations[joint_key] = self.joint_combinations.get(joint_key, 0) + qty
             else:
                 # Aggiungi i pezzi normali direttamente
@@ -138,10 +334,6 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
 
 
     def _update_cuts_dict(self, combination: JointCombination, target_length: float):
-        #print("\nDEBUG joint_combinations prima dell'aggiornamento:")
-        for k, v in dict(self.joint_combinations).items():
-            print(f"  {k}: {v}")
-
         n = len(combination.bar_indices)
         first_cut = combination.wastes[0]
         middle_cuts = combination.wastes[1:-1]
@@ -151,18 +343,19 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
         joint_key = " + ".join(f"{cut:.2f}" for cut in cuts_list)
         self.joint_combinations[joint_key] += 1
 
-        # Determina il mark base per tutti i pezzi di questa combinazione
-        original_mark = (self.max_waste_bar[0][0].mark or "") if self.max_waste_bar[0] else ""
-        mark_prefix = f"{original_mark}/" if original_mark else ""
-        joint_mark = f"{mark_prefix}J/{n}"  # Ora creiamo un unico mark per tutti i pezzi
+        # I segmenti ereditano marca, commessa, ruolo e riga del pezzo giuntato
+        target = self.max_waste_bar[0][0] if self.max_waste_bar[0] else MarkedPiece(target_length)
 
         for i, (bar_idx, waste) in enumerate(zip(combination.bar_indices, combination.wastes)):
             cuts, _ = self._cuts_dict[bar_idx]
             
-            # Assegna lo stesso mark a tutti i pezzi della combinazione
             new_cut = MarkedPiece(
                 waste if i < n-1 else remaining_length,
-                joint_mark  # Usa lo stesso mark per tutti i pezzi
+                target.mark,
+                target.order,
+                target.role | PieceRole.JOINT,
+                n,
+                target.type_id,
             )
 
             new_waste = 0 if i < n-1 else combination.wastes[-1] - remaining_length - self.blade_width
@@ -171,40 +364,28 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
         if self.max_waste_index in self._cuts_dict:
             del self._cuts_dict[self.max_waste_index]
 
-        # print("\nDEBUG joint_combinations dopo l'aggiornamento:")
-        # for k, v in dict(self.joint_combinations).items():
-        #     print(f"  {k}: {v}")       
-
     def _should_exclude_piece(self, piece) -> bool:
         """Determina se un pezzo deve essere escluso dalle giunzioni"""
-        # Verifica FULL
-        if isinstance(piece, MarkedPiece) and piece.mark is not None and 'FULL' in piece.mark:
+        if not isinstance(piece, MarkedPiece):
+            return False
+        if piece.role & PieceRole.FULL:
             return True
+        return piece.role == PieceRole.WHOLE and piece.type_id in self._excluded_types
 
-        if not self._original_pieces or not self.excluded_to_joint:
+    def _is_joint_target(self, cuts) -> bool:
+        """Barra con un solo pezzo, abbastanza lungo e non escluso: può essere giuntata."""
+        # Considera solo barre con un singolo pezzo
+        if len(cuts) != 1:
+            return False
+        cut = cuts[0]  # c'è solo un pezzo
+        # Skip if this cut should be excluded
+        if self._should_exclude_piece(cut):
             return False
+        return self._get_piece_length(cut) >= self.longer_than
 
-        current_length = piece.length
-        current_mark = piece.mark
-
-        for idx in self.excluded_to_joint:
-            if idx >= len(self._original_pieces):
-                continue
-                
-            excluded_piece = self._original_pieces[idx]
-            excluded_length = excluded_piece[0]
-            excluded_mark = excluded_piece[2] if len(excluded_piece) > 2 else None
-            
-            # Se il pezzo escluso ha un mark, richiedi corrispondenza esatta
-            if excluded_mark is not None:
-                if abs(current_length - excluded_length) < 0.01 and current_mark == excluded_mark:
-                    return True
-            # Se il pezzo escluso non ha mark, confronta solo lunghezza
-            else:
-                if abs(current_length - excluded_length) < 0.01:
-                    return True
-                    
-        return False
+    def _is_fixed_bar(self, cuts, waste) -> bool:
+        """Le giunzioni non toccano la barra: non cede scarto e non può essere eliminata."""
+        return self.max_joints < 2 or (waste < self.min_waste and not self._is_joint_target(cuts))
 
     def _find_eligible_cuts(self):
         """
@@ -217,165 +398,307 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
         #print(f"Indici esclusi: {self.excluded_to_joint}")
         
         for bar_idx, (cuts, waste) in self._cuts_dict.items():
-            # Considera solo barre con un singolo pezzo
-            if len(cuts) != 1:
-                continue
-                
-            cut = cuts[0]  # c'è solo un pezzo
-            length = self._get_piece_length(cut)
-            mark = self._get_piece_mark(cut) if isinstance(cut, MarkedPiece) else None
-            
-            # Skip if this cut should be excluded
-            if self._should_exclude_piece(cut):
-                #print(f"  Escluso: L={length:.2f}" + (f" ({mark})" if mark else ""))
-                continue
-                
-            if length >= self.longer_than:
-                #print(f"  Incluso: L={length:.2f}" + (f" ({mark})" if mark else ""))
-                eligible_cuts.append((bar_idx, cut, 0))  # cut_index è sempre 0
+            if self._is_joint_target(cuts):
+                eligible_cuts.append((bar_idx, cuts[0], 0))  # cut_index è sempre 0
         
         sorted_cuts = sorted(eligible_cuts, key=lambda x: self._get_piece_length(x[1]), reverse=True)
         #print(f"\nTotale tagli eleggibili: {len(sorted_cuts)}")
         return sorted_cuts
 
 
-    def _calculate_statistics(self, patterns: List[CuttingPattern], remaining: Dict[MarkedPiece, int]):
-        self.patterns = patterns
-        self.remaining = remaining
-        self.total_waste = 0
-        self.piece_counts = Counter()
-        
-        #print("\nDEBUG Analisi pezzi:")
-        for pattern in patterns:
-            self.total_waste += pattern.waste
-            for cut in pattern.cuts:
-                length = cut.length
-                mark = cut.mark
-                
-                should_count = True
-                if mark is not None and any(x in mark for x in ['FULL', '/2', '/J/', 'J/', 'COMP']):
-                    should_count = False
-                    
-                #print(f"  Pezzo: L={length:.2f}" + (f", mark={mark}" if mark else " (no mark)") + 
-                #    f" -> {'aggiunto' if should_count else 'ignorato'}")
-                
-                if should_count:
-                    self.piece_counts[length] += 1
+    def _open_joint_pool(self):
+        """Avvia i processi per la ricerca delle combinazioni solo se la ricerca è abbastanza grande."""
+        if self.joint_workers > 1 and self.max_joints >= self.parallel_min_joints \
+                and len(self._cuts_dict) >= self.parallel_min_pool:
+            # Import locale: parallel_joints importa find_best_combination da questo modulo
+            from parallel_joints import JointSearchPool
+            self._joint_pool = JointSearchPool(self.joint_workers, len(self._cuts_dict))
+
+    def _close_joint_pool(self):
+        if self._joint_pool is not None:
+            self._joint_pool.close()
+            self._joint_pool = None
+
+    def _plan_joints(self):
+        get_strategy('joint', self.joint_strategy)(self)
+
+    def _plan_joints_global(self):
+        """
+        Pianificazione globale delle giunzioni, al posto della scansione ripetuta.
+
+        Prima due passate greedy (_assign_joints) con i pezzi dal più corto e dal più
+        lungo: per ogni pezzo la combinazione con meno giunzioni e minima eccedenza,
+        cercata con bisect sul pool ordinato degli scarti. La migliore diventa il piano
+        da battere per plan_joint_assignment, che cerca con branch and bound quali
+        pezzi coprire considerando tutti i tagli eleggibili e tutti gli scarti insieme;
+        il suo piano si applica solo se elimina più barre. Il branch and bound ha un
+        budget di joint_node_limit nodi e si salta oltre JOINT_MAX_TARGETS pezzi: in quel
+        caso resta il risultato greedy.
+        """
+        eligible_cuts = self._find_eligible_cuts()
+        if not eligible_cuts or self.max_joints < 2:
+            self._log("\nNessun taglio da giuntare. Terminazione.")
+            return
+
+        start_state = (dict(self._cuts_dict), self.joint_combinations.copy(), self.iteration)
+        best_state = None
+        self._open_joint_pool()
+        try:
+            for targets in (list(reversed(eligible_cuts)), eligible_cuts):
+                self._restore_joint_state(start_state)
+                self._assign_joints(targets)
+                state = (self._cuts_dict, self.joint_combinations, self.iteration)
+                if best_state is None or len(state[0]) < len(best_state[0]):
+                    best_state = state
+                if self.partial or len(self._cuts_dict) <= self.lower_bound:
+                    break
+        finally:
+            self._close_joint_pool()
+
+        bars = len(start_state[0])
+        if not self.partial and len(best_state[0]) > self.lower_bound and len(eligible_cuts) <= JOINT_MAX_TARGETS:
+            plan = plan_joint_assignment(
+                [(bar_idx, cut.length) for bar_idx, cut, _ in eligible_cuts],
+                {bar_idx: waste for bar_idx, (_, waste) in start_state[0].items()},
+                self.max_joints, self.blade_width, self.min_waste,
+                beat=bars - len(best_state[0]), max_cover=bars - self.lower_bound,
+                node_limit=self.joint_node_limit, should_stop=self._should_stop)
+            if plan is not None:
+                self._restore_joint_state(start_state)
+                self._apply_joint_plan(plan)
+                best_state = (self._cuts_dict, self.joint_combinations, self.iteration)
+
+        self._cuts_dict, self.joint_combinations, self.iteration = best_state
+        self._log(f"\nGiunzioni eseguite: {self.iteration - start_state[2]}")
+
+    def _restore_joint_state(self, state):
+        self._cuts_dict, self.joint_combinations, self.iteration = dict(state[0]), state[1].copy(), state[2]
+
+    def _apply_joint_plan(self, plan):
+        """Applica le coppie (barra eliminata, barre donatrici) di plan_joint_assignment."""
+        for bar_idx, donors in plan:
+            self.iteration += 1
+            self.max_waste_index = bar_idx
+            self.max_waste_bar = self._cuts_dict[bar_idx]
+            wastes = [self._cuts_dict[donor][1] for donor in donors]
+            combination = JointCombination(list(donors), wastes, sum(wastes) - (len(donors) - 1) * self.blade_width)
+            self._update_cuts_dict(combination, self.max_waste_bar[0][0].length)
+
+    def _assign_joints(self, targets):
+        """Una passata di assegnazione sui tagli eleggibili, nell'ordine dato."""
+        pool = sorted((waste, bar_idx) for bar_idx, (_, waste) in self._cuts_dict.items()
+                      if waste >= self.min_waste)
+        pool_wastes = [waste for waste, _ in pool]
+        pool_bars = [bar_idx for _, bar_idx in pool]
+
+        def pool_remove(bar_idx, waste):
+            i = bisect_left(pool_wastes, waste)
+            while i < len(pool_bars) and pool_bars[i] != bar_idx:
+                i += 1
+            if i < len(pool_bars):
+                del pool_wastes[i]
+                del pool_bars[i]
+                return True
+            return False
+
+        def pool_add(bar_idx, waste):
+            if waste >= self.min_waste:
+                i = bisect_right(pool_wastes, waste)
+                pool_wastes.insert(i, waste)
+                pool_bars.insert(i, bar_idx)
+
+        for bar_idx, cut, _ in targets:
+            if self._should_stop():
+                self._log("\nTempo scaduto o ottimizzazione annullata: restituisco il piano parziale.")
+                break
+            if len(self._cuts_dict) <= self.lower_bound:
+                self._log("\nRaggiunto il limite inferiore di barre: il piano è ottimo. Terminazione.")
+                break
 
+            # La barra potrebbe aver già ceduto il suo scarto a un'altra giunzione
+            cuts, waste = self._cuts_dict[bar_idx]
+            if len(cuts) != 1:
+                continue
+
+            target_length = cut.length
+            own_in_pool = pool_remove(bar_idx, waste)
+
+            combination = None
+            for n_joints in range(2, self.max_joints + 1):
+                combination = self._find_best_combination(pool_wastes, pool_bars, target_length, n_joints)
+                if combination is not None or self.partial:
+                    break
+
+            if combination is None:
+                if own_in_pool:
+                    pool_add(bar_idx, waste)
+                continue
+
+            self.iteration += 1
+            self.max_waste_index = bar_idx
+            self.max_waste_bar = self._cuts_dict[bar_idx]
+            for donor_idx, donor_waste in zip(combination.bar_indices, combination.wastes):
+                pool_remove(donor_idx, donor_waste)
+            self._update_cuts_dict(combination, target_length)
+
+            # L'ultima barra della combinazione conserva lo scarto residuo
+            last_idx = combination.bar_indices[-1]
+            pool_add(last_idx, self._cuts_dict[last_idx][1])
+
+    def _calculate_statistics(self, patterns: List[CuttingPattern], remaining: Dict[MarkedPiece, int]) -> PlanResult:
+        """Statistiche dal risultato già calcolato; i pezzi giuntati non contano come interi."""
+        result = self._result_for(patterns, remaining)
+        self.patterns = result.patterns
+        self.remaining = result.remaining
+        self.total_waste = result.total_waste
+        self.piece_counts = Counter(result.piece_counts)
+        return result
+
+    def optimize_with_waste(self, pieces, longer_than, deadline: Optional[float] = None, cancel_token=None,
+                            method: str = 'greedy'):
+        """
+        deadline / cancel_token / method: vedi StrictCuttingStockOptimizer.optimize.
+        Allo scadere restituisce il miglior piano trovato finora con self.partial = True.
+        """
+        for _ in self.optimize_with_waste_iter(pieces, longer_than, deadline, cancel_token, method):
+            pass
+        return self.result
 
+    def optimize_with_waste_iter(self, pieces, longer_than, deadline: Optional[float] = None, cancel_token=None,
+                                 method: str = 'greedy') -> Iterator[Tuple[CuttingPattern, PlanProgress]]:
+        """
+        Versione a generatore di optimize_with_waste: restituisce (pattern, PlanProgress).
+        Le barre che le giunzioni non possono toccare (scarto sotto min_waste e nessun
+        pezzo da giuntare) escono appena prodotte; le altre dopo la pianificazione
+        delle giunzioni. L'ordine può quindi differire da self.result.patterns,
+        che a fine iterazione contiene il piano completo.
+        """
+        processed_pieces = self._prepare_pieces(pieces, longer_than)
+        self._start_clock(deadline, cancel_token)
 
+        patterns = []
+        fixed = set()
+        pieces_done = 0
+        iterator = self._iter_pieces(processed_pieces, method)
+        while True:
+            try:
+                pattern = next(iterator)
+            except StopIteration as stop:
+                remaining = stop.value
+                break
+            patterns.append(pattern)
+            pieces_done += len(pattern.cuts)
+            if self._is_fixed_bar(pattern.cuts, pattern.waste):
+                fixed.add(len(patterns) - 1)
+                yield pattern, PlanProgress(len(fixed), pieces_done, self.pieces_total, self.lower_bound)
 
+        self._generate_cuts_dict(patterns)
 
-    def optimize_with_waste(self, pieces, longer_than):
-        # Trova lunghezze duplicate e assegna marche fittizie se necessario
-        length_counts = Counter(piece[0] for piece in pieces)
-        marked_pieces = []
+        # Con le giunzioni i pezzi possono dividersi tra più barre: vale solo il limite
+        # di materiale, calcolato sui tagli effettivamente piazzati
+        if self.max_joints > 1:
+            self.lower_bound = jointed_lower_bound(
+                ((self._get_piece_length(cut), 1) for pattern in patterns for cut in pattern.cuts),
+                self.stock_length
+            )
         
-        for piece in pieces:
+        self._plan_joints()
+
+        # Crea i pattern finali; le barre già restituite non sono cambiate
+        final_patterns = [patterns[i] if i in fixed else CuttingPattern(cuts, waste)
+                for i, (cuts, waste) in self._cuts_dict.items()]
+        self._make_result(final_patterns, remaining)
+
+        bars = len(fixed)
+        for i, pattern in zip(self._cuts_dict, final_patterns):
+            if i not in fixed:
+                bars += 1
+                yield pattern, PlanProgress(bars, pieces_done, self.pieces_total, self.lower_bound)
+
+    def _prepare_pieces(self, pieces, longer_than):
+        """Tipi di pezzo, esclusioni e suddivisione dei pezzi sovradimensionati."""
+        # Ogni riga diventa un tipo di pezzo: type_id distingue anche righe con la
+        # stessa lunghezza e senza marca, senza marche fittizie
+        normalized_pieces = []
+        for type_id, piece in enumerate(pieces):
+            if isinstance(piece[0], MarkedPiece):
+                # Pezzi già preparati (es. parameter_sweep): ruolo e type_id restano
+                normalized_pieces.append((piece[0], piece[1]))
+                continue
             length, qty = piece[:2]
-            mark = piece[2] if len(piece) == 3 else None
-            
-            # Se ci sono duplicati e il pezzo non ha già una marca, assegna una marca fittizia
-            if length_counts[length] > 1 and mark is None:
-                mark = f"'''$'''{length_counts[length]}"
-                length_counts[length] -= 1
-            
-            marked_pieces.append((length, qty, mark))
+            mark = piece[2] if len(piece) >= 3 else None
+            order = piece[3] if len(piece) == 4 else None
+            normalized_pieces.append((MarkedPiece(length, mark, order, type_id=type_id), qty))
 
-        # Normalizza i pezzi in MarkedPiece
-        normalized_pieces = [
-            (MarkedPiece(length, mark), qty) for length, qty, mark in marked_pieces
-        ]
-        
         self._original_pieces = pieces
         self.longer_than = longer_than 
+        self.orders = list(dict.fromkeys(piece.order for piece, _ in normalized_pieces if piece.order is not None))
+
+        # Gli indici di excluded_to_joint sono righe dell'ordine originale, cioè type_id:
+        # i pezzi già preparati sono riordinati e hanno in più i segmenti FULL e COMP
+        n_rows = 1 + max((piece.type_id for piece, _ in normalized_pieces if piece.type_id is not None), default=-1)
 
         # Se abbiamo un pezzo temporaneo da escludere, trova il suo indice
         if hasattr(self, '_temp_excluded_piece'):
-            for i, piece in enumerate(pieces):
-                if piece[0] == self._temp_excluded_piece[0] and piece[1] == self._temp_excluded_piece[1]:
-                    self.excluded_to_joint = [i]
+            for piece, qty in normalized_pieces:
+                if piece.role == PieceRole.WHOLE and piece.length == self._temp_excluded_piece[0] \
+                        and qty == self._temp_excluded_piece[1]:
+                    self.excluded_to_joint = [piece.type_id]
                     break
             delattr(self, '_temp_excluded_piece')
 
-        # Log dei pezzi esclusi
-        if self.excluded_to_joint:
-            for idx in self.excluded_to_joint:
-                if idx < len(pieces):
-                    piece = pieces[idx]
+        # Indici negativi come in una lista Python; quelli fuori intervallo vengono ignorati
+        self._excluded_types = {
+            idx % n_rows for idx in self.excluded_to_joint if -n_rows <= idx < n_rows
+        }
 
         # Processa i pezzi sovradimensionati con il nuovo sistema di tracking
-        processed_pieces = self._process_oversize_pieces(normalized_pieces)
-        patterns, remaining = super().optimize(processed_pieces)
-        self._generate_cuts_dict(patterns)
-        
-        while True:
-            self.iteration += 1
-            
-            # Trova tutti i tagli eleggibili
-            eligible_cuts = self._find_eligible_cuts()
-            if not eligible_cuts:
-                print("\nNessun taglio più lungo della soglia trovato. Terminazione.")
-                break
-                
-            # Prova a trovare combinazioni per ogni taglio eleggibile
-            found_combination = False
-            for bar_idx, cut, _ in eligible_cuts:
-                target_length = cut.length
-                print(f"\nAnalizzando taglio di lunghezza: {target_length:.2f}")
-                
-                self.max_waste_index = bar_idx
-                self.max_waste_bar = self._cuts_dict[bar_idx]
-                
-                for n_joints in range(2, self.max_joints + 1):
-                    combinations = self._find_waste_combinations_n(target_length, n_joints)
-                    if combinations:
-                        print(f"\nTrovata combinazione valida con {n_joints} giunzioni")
-                        self._update_cuts_dict(combinations[0], target_length)
-                        found_combination = True
-                        break
-                
-                if found_combination:
-                    break
-            
-            if not found_combination:
-                print("\nNessuna combinazione valida trovata. Terminazione.")
-                break
+        return self._process_oversize_pieces(normalized_pieces)
 
-        # Crea i pattern finali
-        final_patterns = [CuttingPattern(cuts, waste) 
-                for cuts, waste in self._cuts_dict.values()]
-                
-        return final_patterns, remaining
+    def optimize_orders(self, orders, longer_than, **kwargs):
+        """
+        Ottimizza insieme più commesse dello stesso profilo, così condividono barre
+        e scarti: una sola ottimizzazione invece di una per commessa.
+        orders: dict {commessa: pezzi} o lista di coppie (commessa, pezzi), con i pezzi
+        nel formato di optimize_with_waste. Ogni taglio, compresi i segmenti di
+        giunzione e dei pezzi sovradimensionati, conserva la sua commessa in MarkedPiece.order.
+        kwargs: vedi optimize_with_waste.
+        """
+        items = list(orders.items()) if isinstance(orders, dict) else list(orders)
+        pieces = [
+            (piece[0], piece[1], piece[2] if len(piece) > 2 else None, order)
+            for order, order_pieces in items for piece in order_pieces
+        ]
+        return self.optimize_with_waste(pieces, longer_than, **kwargs)
+
+    def _result_fields(self) -> Dict:
+        fields = super()._result_fields()
+        fields['joint_combinations'] = self.joint_combinations
+        fields['min_waste'] = self.min_waste
+        fields['max_joints'] = self.max_joints
+        fields['longer_than'] = getattr(self, 'longer_than', None)
+        return fields
 
     
     def _print_or_display(self, text: str, output_widget=None):
         """
         Gestisce l'output del testo sia su console che su widget tkinter.
+        Per i report di più righe usare _write_report, che scrive tutto in una volta.
         """
-        print(text)  # Stampa sempre su console
-        if output_widget:
-            try:
-                output_widget.configure(state='normal')
-                output_widget.insert('end', text + '\n')
-                output_widget.configure(state='disabled')
-                output_widget.see('end')
+        self._write_report([text], output_widget)
 
-            except Exception as e:
-                print(f"Errore nella visualizzazione su widget: {e}")
-
-    def print_solution(self, patterns: List[CuttingPattern], remaining: Dict[Union[float, MarkedPiece], int], output_widget=None):
-        if not patterns:
+    def print_solution(self, patterns: List[CuttingPattern], remaining: Dict[Union[float, MarkedPiece], int], output_widget=None,
+                       max_lines: Optional[int] = None, pager: bool = False):
+        result = self._calculate_statistics(patterns, remaining)
+        if not result.patterns:
             self._print_or_display("\nNo solution found!", output_widget)
             return
-            
-        self._calculate_statistics(patterns, remaining)
 
-        self._print_or_display(f"\nOptimized Cutting Solution:", output_widget)
-        self._print_or_display(f"Stock Length: {self.stock_length}mm", output_widget)
-        self._print_or_display(f"Blade Width: {self.blade_width}mm", output_widget)
-        self._print_or_display(f"Max Joints: {self.max_joints}", output_widget)
-        self._print_or_display("\nCutting Patterns:", output_widget)
+        lines = [f"\nOptimized Cutting Solution:"]
+        lines.append(f"Stock Length: {self.stock_length}mm")
+        lines.append(f"Blade Width: {self.blade_width}mm")
+        lines.append(f"Max Joints: {self.max_joints}")
+        lines.append("\nCutting Patterns:")
 
         # Creiamo un dizionario dei mark originali
         original_marks = {}
@@ -384,8 +707,8 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
                 if len(piece) > 2:  # se ha un mark originale
                     original_marks[piece[0]] = piece[2]
 
-        for i, pattern in enumerate(patterns, 1):
-            self._print_or_display(f"\nBar {i}:", output_widget)
+        for i, pattern in enumerate(result.patterns, 1):
+            lines.append(f"\nBar {i}:")
             
             cuts_str = []
             for cut in pattern.cuts:
@@ -403,60 +726,67 @@ class WasteCuttingStockOptimizer(StrictCuttingStockOptimizer):
                     show_mark = original_marks[length]
                 
                 # Costruiamo la stringa del taglio
-                if show_mark:
-                    cuts_str.append(f"{length:.2f}({show_mark})")
-                else:
-                    cuts_str.append(f"{length:.2f}")
+                cut_str = f"{length:.2f}({show_mark})" if show_mark else f"{length:.2f}"
+                order = self._get_piece_order(cut)
+                cuts_str.append(f"{cut_str}[{order}]" if order is not None else cut_str)
                 
-            self._print_or_display(f"  Cuts: {', '.join(cuts_str)}", output_widget)
-            self._print_or_display(f"  Number of cuts: {len(pattern.cuts)}", output_widget)
-            self._print_or_display(f"  Waste: {pattern.waste:.2f}mm", output_widget)
-            self._print_or_display(f"  Usage: {((self.stock_length - pattern.waste) / self.stock_length * 100):.1f}%", output_widget)
-
-    def print_summary(self, patterns: List[CuttingPattern], remaining: Dict[Union[float, MarkedPiece], int], output_widget=None):
-        self._calculate_statistics(patterns, remaining)
-
-        self._print_or_display(f"\nSummary:", output_widget)
-        self._print_or_display(f"Total bars needed: {len(self.patterns)}", output_widget)
-        self._print_or_display(f"Total waste: {self.total_waste:.2f}mm", output_widget)
-        self._print_or_display(f"Average waste per bar: {(self.total_waste/len(self.patterns)):.2f}mm", output_widget)
-        self._print_or_display(f"Overall material usage: {((len(self.patterns)*self.stock_length - self.total_waste)/(len(self.patterns)*self.stock_length) * 100):.1f}%", output_widget)
-
-        # Raccogliamo tutte le lunghezze usate nelle combinazioni
-        joint_lengths = set()
-        for joint_key in self.joint_combinations:
-            joint_lengths.update(float(x) for x in joint_key.split(" + "))
-
-        self._print_or_display("\nPiece counts:", output_widget)
-        # Prima stampa i pezzi normali che non sono in joint_lengths
-        for length, count in sorted(self.piece_counts.items()):
-            if length not in joint_lengths:
-                self._print_or_display(f"  Length {length:.2f}mm: {count} pieces", output_widget)
-            else:
-                # Pezzi singoli che hanno stessa lunghezza di parti giuntate
-                self._print_or_display(f"  Length {length:.2f}mm: {count} pieces", output_widget)
+            lines.append(f"  Cuts: {', '.join(cuts_str)}")
+            lines.append(f"  Number of cuts: {len(pattern.cuts)}")
+            lines.append(f"  Waste: {pattern.waste:.2f}mm")
+            lines.append(f"  Usage: {result.usage[i - 1] * 100:.1f}%")
+
+        self._write_report(lines, output_widget, max_lines, pager)
+
+    def print_summary(self, patterns: List[CuttingPattern], remaining: Dict[Union[float, MarkedPiece], int], output_widget=None,
+                      max_lines: Optional[int] = None, pager: bool = False):
+        result = self._calculate_statistics(patterns, remaining)
+
+        lines = [f"\nSummary:"]
+        if result.partial:
+            lines.append("WARNING: Partial plan, the optimization was stopped early.")
+        lines.append(f"Total bars needed: {result.bar_count}")
+        lines.append(f"Total waste: {result.total_waste:.2f}mm")
+        lines.append(f"Average waste per bar: {result.average_waste:.2f}mm")
+        lines.append(f"Overall material usage: {result.total_usage * 100:.1f}%")
+        gap, gap_pct = optimality_gap(result.bar_count, result.lower_bound)
+        lines.append(f"Lower bound: {result.lower_bound} bars")
+        lines.append(f"Optimality gap: {gap} bars ({gap_pct:.1f}%)")
+
+        lines.append("\nPiece counts:")
+        for length, count in sorted(result.piece_counts.items()):
+            lines.append(f"  Length {length:.2f}mm: {count} pieces")
 
         # Poi stampa le combinazioni
-        for joint_key, count in sorted(self.joint_combinations.items()):
-            parts = [float(x) for x in joint_key.split(" + ")]
-            total = sum(parts)
-            self._print_or_display(f"  Length {joint_key}mm = {total:.2f}: {count} pieces", output_widget)
+        for joint_key, count in sorted(result.joint_combinations.items()):
+            total = sum(result.joint_parts[joint_key])
+            lines.append(f"  Length {joint_key}mm = {total:.2f}: {count} pieces")
+
+        if result.order_counts:
+            lines.append("\nCuts per order:")
+            for order, count in result.order_counts.items():
+                lines.append(f"  {order}: {count} cuts")
+
+        self._write_report(lines, output_widget, max_lines, pager)
 
     def generate_pdf(self, filename="cutting_list.pdf", profilo='MIO PROFILO', commessa='Cxxx', num_columns=2):
         """
         Genera un PDF della distinta di taglio usando CuttingListPDF
         """
         self.profilo = profilo
+        # Con più commesse ottimizzate insieme l'intestazione le elenca tutte
+        if commessa == 'Cxxx' and self.orders:
+            commessa = " + ".join(str(order) for order in self.orders)
         self.commessa = commessa
 
-        if not self.patterns:
+        patterns = self.result.patterns if self.result is not None else self.patterns
+        if not patterns:
             raise ValueError("Nessun pattern disponibile. Esegui prima l'ottimizzazione.")
             
         pdf = CuttingListPDF(filename, profilo=self.profilo, commessa=self.commessa, num_columns=num_columns)
         pdf._add_header()
         
-        for i, pattern in enumerate(self.patterns, 1):
-            cuts = [(self._get_piece_length(cut), self._get_piece_mark(cut))
+        for i, pattern in enumerate(patterns, 1):
+            cuts = [(self._get_piece_length(cut), self._get_piece_mark(cut), self._get_piece_order(cut))
                     for cut in pattern.cuts]
             pdf.add_bar_section(i, cuts)  # Rimosso self.stock_length
         
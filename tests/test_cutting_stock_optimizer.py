@@ -3,7 +3,17 @@ from collections import Counter
 import sys
 from io import StringIO
 import time
+import threading
+import pickle
+from dataclasses import FrozenInstanceError
 from cutting_stock_optimizer import StrictCuttingStockOptimizer, CuttingPattern
+from lower_bounds import material_bound, l2_bound, bar_lower_bound
+from best_fit import ResidualIndex
+from length_classes import LengthClasses
+from decomposition import split_counts
+from exact_solver import ExactSolver, should_use_exact
+import numpy as np
+from multistart import multistart_first_fit, perturbed_ordering_blocks, perturbed_orderings
 
 class TestStrictCuttingStockOptimizer(unittest.TestCase):
     def setUp(self): 
@@ -197,6 +207,270 @@ class TestStrictCuttingStockOptimizer(unittest.TestCase):
         self.assertLess(total_waste, max_waste, 
             f"FAIL: Total waste ({total_waste}) should be less than available stock ({max_waste})")
 
+    def test_008_deadline_and_cancellation(self):
+        """Test: deadline scaduta o annullamento restituiscono un piano parziale coerente."""
+        pieces = [(2500, 20), (1200, 10)]
+
+        patterns, remaining = self.optimizer.optimize(pieces, deadline=time.monotonic() - 1)
+        self.assertTrue(self.optimizer.partial, "FAIL: Expired deadline should flag the plan as partial")
+        self.assertEqual(len(patterns), 0,
+            f"FAIL: Expected no patterns after an expired deadline, but got {len(patterns)}")
+        self.assertEqual(remaining[2500], 20,
+            f"FAIL: Unplaced pieces should stay in remaining, but got {remaining[2500]}")
+
+        token = threading.Event()
+        patterns, remaining = self.optimizer.optimize(pieces, cancel_token=token)
+        self.assertFalse(self.optimizer.partial, "FAIL: Complete plan should not be flagged as partial")
+
+        token.set()
+        patterns, remaining = self.optimizer.optimize(pieces, cancel_token=token)
+        self.assertTrue(self.optimizer.partial, "FAIL: Cancelled plan should be flagged as partial")
+        placed = sum(len(pattern.cuts) for pattern in patterns)
+        self.assertEqual(placed + sum(remaining.values()), 30,
+            "FAIL: Every piece should be either in a pattern or in remaining")
+
+    def test_009_lower_bounds(self):
+        """Test: limiti inferiori L1/L2 e gap riportato dall'ottimizzatore."""
+        # L1 non vede che due pezzi da 7000 non stanno nella stessa barra, L2 sì
+        pieces = [(7000, 4), (1000, 4)]
+        self.assertEqual(material_bound(pieces, 12000, 0), 3,
+            f"FAIL: Expected material bound 3, but got {material_bound(pieces, 12000, 0)}")
+        self.assertEqual(l2_bound(pieces, 12000, 0), 4,
+            f"FAIL: Expected L2 bound 4, but got {l2_bound(pieces, 12000, 0)}")
+
+        # La lama conta: 4 pezzi da 3000 non stanno in 12000 con lama da 3
+        self.assertEqual(bar_lower_bound([(3000, 4)], 12000, 3), 2,
+            "FAIL: Blade width should be included in the lower bound")
+
+        patterns, _ = self.optimizer.optimize([(5998, 2), (3000, 1)])
+        self.assertLessEqual(self.optimizer.lower_bound, len(patterns),
+            "FAIL: Lower bound cannot exceed the number of bars of a valid plan")
+        self.assertEqual(self.optimizer.lower_bound, 2,
+            f"FAIL: Expected lower bound 2, but got {self.optimizer.lower_bound}")
+
+    def test_010_exact_method(self):
+        """Test: il metodo esatto trova il piano ottimo dove il greedy spreca una barra."""
+        optimizer = StrictCuttingStockOptimizer(stock_length=10000, blade_width=0)
+        pieces = [(5000, 1), (4000, 1), (3000, 3), (2000, 1)]
+
+        greedy, _ = optimizer.optimize(pieces)
+        self.assertEqual(len(greedy), 3, f"FAIL: Expected 3 greedy bars, but got {len(greedy)}")
+
+        for method in ('exact', 'auto'):
+            patterns, remaining = optimizer.optimize(pieces, method=method)
+            self.assertEqual(len(patterns), 2,
+                f"FAIL: Expected 2 bars with method '{method}', but got {len(patterns)}")
+            self.assertEqual(optimizer.method_used, 'exact',
+                f"FAIL: Expected exact engine with method '{method}', but got {optimizer.method_used}")
+            self.assertEqual(sorted(cut for pattern in patterns for cut in pattern.cuts),
+                [2000, 3000, 3000, 3000, 4000, 5000], "FAIL: Every piece should be cut exactly once")
+            self.assertTrue(all(qty == 0 for qty in remaining.values()),
+                "FAIL: No piece should remain with the exact method")
+
+        with self.assertRaises(ValueError):
+            optimizer.optimize(pieces, method='unknown')
+
+    def test_011_plan_result(self):
+        """Test: il risultato è immutabile e contiene le statistiche già calcolate."""
+        pieces = [(5000, 3), (2000, 4), (13000, 1)]
+        result = self.optimizer.optimize(pieces)
+
+        patterns, remaining = result
+        self.assertIs(patterns, result.patterns, "FAIL: Unpacking should return the result patterns")
+        # Come la vecchia tupla: indici, slice e len
+        self.assertIs(result[0], result.patterns, "FAIL: result[0] should be the patterns")
+        self.assertIs(result[1], result.remaining, "FAIL: result[1] should be the remaining pieces")
+        self.assertIs(result[-1], result.remaining, "FAIL: Negative indices should work as on a tuple")
+        self.assertEqual(result[:], (result.patterns, result.remaining), "FAIL: Slicing should give the tuple view")
+        self.assertEqual(len(result), 2, f"FAIL: Expected len 2 as the old tuple, but got {len(result)}")
+        with self.assertRaises(IndexError):
+            result[2]
+        self.assertEqual(result.bar_count, len(patterns),
+            f"FAIL: Expected {len(patterns)} bars, but got {result.bar_count}")
+        self.assertAlmostEqual(result.total_waste, sum(p.waste for p in patterns), places=6,
+            msg="FAIL: Total waste should match the patterns")
+        self.assertEqual(dict(result.cut_counts), {2000.0: 4, 5000.0: 3},
+            f"FAIL: Unexpected piece counts {dict(result.cut_counts)}")
+        self.assertEqual(result.remaining_count, 1,
+            f"FAIL: Expected 1 remaining piece, but got {result.remaining_count}")
+
+        with self.assertRaises(FrozenInstanceError):
+            result.partial = True
+        with self.assertRaises(TypeError):
+            remaining[13000] = 0
+
+        copy = pickle.loads(pickle.dumps(result))
+        self.assertEqual(copy.total_waste, result.total_waste, "FAIL: Pickled result should keep its statistics")
+
+    def test_012_multistart_method(self):
+        """Test: il multi-start trova l'ordinamento ottimo ed è riproducibile dal seed."""
+        optimizer = StrictCuttingStockOptimizer(stock_length=10000, blade_width=0)
+        pieces = [(5000, 1), (4000, 1), (3000, 3), (2000, 1)]
+
+        optimizer.multistart_starts = 200
+        patterns, remaining = optimizer.optimize(pieces, method='multistart')
+        self.assertEqual(len(patterns), 2, f"FAIL: Expected 2 bars with multistart, but got {len(patterns)}")
+        self.assertEqual(optimizer.method_used, 'multistart',
+            f"FAIL: Expected multistart engine, but got {optimizer.method_used}")
+        self.assertTrue(all(qty == 0 for qty in remaining.values()),
+            "FAIL: No piece should remain with the multistart method")
+
+        large = [(1234, 17), (2345, 11), (987, 23), (3456, 7), (555, 31)]
+        optimizer = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3)
+        optimizer.multistart_starts = 300
+        first = [pattern.cuts for pattern in optimizer.optimize(large, method='multistart').patterns]
+        second = [pattern.cuts for pattern in optimizer.optimize(large, method='multistart').patterns]
+        self.assertEqual(first, second, "FAIL: The same seed should give the same plan")
+        self.assertLessEqual(len(first), len(optimizer.optimize(large).patterns),
+            "FAIL: Multistart should not be worse than the greedy plan on this order")
+        self.assertTrue(all(pattern.waste >= 0 for pattern in optimizer.result.patterns),
+            "FAIL: Every multistart pattern should fit in the stock")
+
+    def test_013_best_fit_decreasing(self):
+        """Test: il best-fit decreasing piazza tutti i pezzi nella barra più stretta che li contiene."""
+        index = ResidualIndex()
+        index.LOAD = 2  # blocchi piccoli per esercitare la suddivisione
+        for bar, residual in enumerate([50, 10, 30, 70, 20, 40, 60]):
+            index.add((residual, bar))
+        self.assertEqual(index.pop_fit(25), (30, 2), "FAIL: Expected the tightest residual 30")
+        self.assertEqual(index.pop_fit(25), (40, 5), "FAIL: Expected the next tightest residual 40")
+        self.assertIsNone(index.pop_fit(80), "FAIL: No bar should fit a piece of 80")
+        self.assertEqual(len(index), 5, f"FAIL: Expected 5 open bars, but got {len(index)}")
+
+        optimizer = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3)
+        pieces = [(2500, 30), (1800, 45), (1200, 60), (700, 80), (2500, 10)]
+        patterns, remaining = optimizer.optimize(pieces, method='bfd')
+        self.assertEqual(optimizer.method_used, 'bfd', f"FAIL: Expected bfd engine, but got {optimizer.method_used}")
+        self.assertEqual(sum(len(p.cuts) for p in patterns), 225,
+            "FAIL: Every piece should be placed, repeated rows included")
+        self.assertTrue(all(qty == 0 for qty in remaining.values()), "FAIL: No piece should remain")
+        self.assertGreaterEqual(len(patterns), optimizer.lower_bound, "FAIL: Bars cannot be below the lower bound")
+        for pattern in patterns:
+            used = sum(pattern.cuts) + (len(pattern.cuts) - 1) * 3
+            self.assertLessEqual(used, 6000, "FAIL: A bar exceeds the stock length")
+            self.assertEqual(pattern.cuts, sorted(pattern.cuts, reverse=True),
+                "FAIL: Cuts should be listed from the longest")
+
+    def test_014_optimize_iter(self):
+        """Test: optimize_iter restituisce le barre una alla volta con l'avanzamento."""
+        optimizer = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3)
+        pieces = [(2500, 6), (1800, 9), (1200, 12), (700, 15)]
+        expected = optimizer.optimize(pieces)
+
+        iterator = optimizer.optimize_iter(pieces)
+        first, progress = next(iterator)
+        self.assertEqual(progress.bars, 1, f"FAIL: Expected progress for 1 bar, but got {progress.bars}")
+        self.assertLess(progress.pieces_done, progress.pieces_total,
+            "FAIL: The first bar should be yielded before the plan is complete")
+
+        streamed = [first] + [pattern for pattern, progress in iterator]
+        self.assertEqual(streamed, list(expected.patterns), "FAIL: Streamed bars should match optimize()")
+        self.assertEqual(progress.pieces_total, 42, f"FAIL: Expected 42 pieces in total, but got {progress.pieces_total}")
+        self.assertEqual(list(optimizer.result.patterns), streamed, "FAIL: self.result should hold the full plan")
+
+    def test_015_length_classes(self):
+        """Test: il solutore lavora sulle classi di lunghezza e restituisce le marche originali."""
+        classes = LengthClasses({1000: 2, 1001: 1, 1003: 1, 1500: 3, 1200: 0}, tolerance=2)
+        self.assertEqual(classes.classes, {1001: 3, 1003: 1, 1500: 3},
+            f"FAIL: Unexpected length classes {classes.classes}")
+        self.assertEqual(classes.restore_cuts([1001, 1001]), [1001, 1000], "FAIL: Longest members should go first")
+        self.assertEqual(classes.remaining(), {1200: 0, 1000: 1, 1001: 0, 1003: 1, 1500: 3},
+            "FAIL: Remaining pieces should be mapped back to the original rows")
+
+        pieces = [(1200 + i % 3, 2, f"M{i}") for i in range(30)] + [(2500, 4, 'A'), (2500, 3, 'B')]
+        plain = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3)
+        reduced = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3, length_tolerance=2)
+        expected = plain.optimize(pieces)
+        patterns, remaining = reduced.optimize(pieces)
+
+        self.assertLessEqual(len(patterns), len(expected.patterns),
+            f"FAIL: Expected at most {len(expected.patterns)} bars, but got {len(patterns)}")
+        cuts = Counter((cut.length, cut.mark) for pattern in patterns for cut in pattern.cuts)
+        self.assertEqual(cuts, Counter({(length, mark): qty for length, qty, mark in pieces}),
+            "FAIL: Every original piece should be cut once with its own mark")
+        self.assertTrue(all(qty == 0 for qty in remaining.values()), "FAIL: No piece should remain")
+        for pattern in patterns:
+            self.assertAlmostEqual(pattern.waste, reduced._calculate_waste(pattern.cuts), places=6,
+                msg="FAIL: Waste should be computed on the real lengths")
+
+    def test_016_decomposition(self):
+        """Test: i blocchi hanno lo stesso mix di lunghezze e le code vengono riottimizzate insieme."""
+        chunks = split_counts([10, 7, 3], 3)
+        self.assertEqual([sum(chunk) for chunk in chunks], [7, 7, 6], f"FAIL: Unbalanced chunks {chunks}")
+        self.assertEqual([sum(column) for column in zip(*chunks)], [10, 7, 3], "FAIL: Chunks should keep every piece")
+        self.assertTrue(all(chunk[0] >= 3 for chunk in chunks), "FAIL: Each chunk should get its share of each type")
+
+        pieces = [(2500, 70), (1800, 95), (1200, 130), (700, 160)]
+        monolithic = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3)
+        expected = monolithic.optimize(pieces, method='bfd')
+
+        optimizer = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3)
+        optimizer.decompose_chunk_size = 100
+        optimizer.decompose_workers = 2
+        patterns, remaining = optimizer.optimize(pieces, method='decompose')
+        self.assertEqual(optimizer.method_used, 'decompose', f"FAIL: Expected decompose, but got {optimizer.method_used}")
+        self.assertEqual(Counter(cut for p in patterns for cut in p.cuts), Counter(dict(pieces)),
+            "FAIL: Every piece should be cut exactly once")
+        self.assertTrue(all(qty == 0 for qty in remaining.values()), "FAIL: No piece should remain")
+        self.assertLessEqual(len(patterns), len(expected.patterns) + 1,
+            f"FAIL: Decomposition lost too much yield: {len(patterns)} vs {len(expected.patterns)} bars")
+        for pattern in patterns:
+            used = sum(pattern.cuts) + (len(pattern.cuts) - 1) * 3
+            self.assertLessEqual(used, 6000, "FAIL: A bar exceeds the stock length")
+
+    def test_017_exact_deadline_on_large_order(self):
+        """Test: con molti tipi il metodo esatto rispetta la deadline e torna al piano greedy."""
+        lengths = [2950 - 45 * i for i in range(60)]
+        counts = [3 + i % 7 for i in range(60)]
+        pieces = list(zip(lengths, counts))
+        self.assertFalse(should_use_exact(lengths, counts, 6000, 3),
+            "FAIL: The cost estimate should include the pattern enumeration")
+
+        optimizer = StrictCuttingStockOptimizer(stock_length=6000, blade_width=3)
+        start = time.monotonic()
+        patterns, remaining = optimizer.optimize(pieces, deadline=start + 0.5, method='exact')
+        elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 1.5, f"FAIL: The exact method took {elapsed:.2f}s with a 0.5s deadline")
+        self.assertEqual(optimizer.method_used, 'greedy', "FAIL: Expected the greedy fallback plan")
+        self.assertEqual(sum(len(p.cuts) for p in patterns), sum(counts), "FAIL: The fallback plan should be complete")
+        self.assertTrue(all(qty == 0 for qty in remaining.values()), "FAIL: No piece should remain")
+
+        # Con budget di nodi illimitato è la deadline a fermare l'enumerazione dei pattern
+        deadline = time.monotonic() + 0.5
+        solver = ExactSolver(lengths, 6000, 3, node_limit=10 ** 12, should_stop=lambda: time.monotonic() >= deadline)
+        start = time.monotonic()
+        self.assertIsNone(solver.solve(counts, len(patterns)), "FAIL: An interrupted search should return None")
+        elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 1.5, f"FAIL: The exact search took {elapsed:.2f}s with a 0.5s deadline")
+
+    def test_018_multistart_lower_bound_and_blocks(self):
+        """Test: il multi-start si ferma al limite inferiore e genera gli ordinamenti a blocchi."""
+        sizes = np.array([1234.0, 2345, 987, 3456, 555] * 9)
+        blocks = list(perturbed_ordering_blocks(sizes, 50, 7, seed=3))
+        self.assertEqual([len(rows) for rows in blocks], [1] + [7] * 7,
+            f"FAIL: Unexpected block sizes {[len(rows) for rows in blocks]}")
+        self.assertTrue(np.array_equal(np.concatenate(blocks), perturbed_orderings(sizes, 50, seed=3)),
+            "FAIL: Block-wise orderings should match the full matrix")
+
+        # Il decrescente puro raggiunge già il limite: nessun altro blocco viene valutato
+        stops = []
+        def should_stop():
+            stops.append(1)
+            return False
+        plan = multistart_first_fit([6000, 6000, 6000, 6000, 4000, 4000, 4000, 4000], 10000, n_starts=1000,
+                                    should_stop=should_stop, lower_bound=4)
+        self.assertEqual(len(plan), 4, f"FAIL: Expected 4 bars, but got {len(plan)}")
+        self.assertEqual(stops, [], "FAIL: The search should stop at the lower bound before any other block")
+
+        optimizer = StrictCuttingStockOptimizer(stock_length=10000, blade_width=0)
+        optimizer.multistart_starts = 10 ** 7
+        start = time.monotonic()
+        patterns, _ = optimizer.optimize([(6000, 4), (4000, 4)], method='multistart')
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(patterns), optimizer.lower_bound,
+            f"FAIL: Expected {optimizer.lower_bound} bars, but got {len(patterns)}")
+        self.assertLess(elapsed, 1.0, f"FAIL: Multistart took {elapsed:.2f}s on an order solved by FFD")
+
 class CompactTestRunner(unittest.TextTestRunner):
     def __init__(self, stream=None, descriptions=True, verbosity=1):
         super().__init__(stream, descriptions, verbosity)
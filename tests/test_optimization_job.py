@@ -0,0 +1,73 @@
+import unittest
+import io
+from contextlib import redirect_stdout
+from cutting_stock_optimizer import StrictCuttingStockOptimizer
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+from optimization_job import OptimizationJob, attach_to_tk
+
+
+class FakeTk:
+    """Sostituto di un widget tkinter: after() accoda le callback, run() le esegue."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, interval_ms, callback):
+        self.callbacks.append(callback)
+
+    def run(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+class TestOptimizationJob(unittest.TestCase):
+    def setUp(self):
+        """Setup comune per i test."""
+        self.pieces = [(8000, 3, 'A'), (5000, 1, 'B'), (5990, 4, 'C')]
+
+    def test_001_background_solve_events(self):
+        """Test: il job pubblica barre, messaggi e risultato finale senza scrivere sulla console."""
+        expected_optimizer = WasteCuttingStockOptimizer(12000, 2, max_joints=2)
+        with redirect_stdout(io.StringIO()):
+            expected = expected_optimizer.optimize_with_waste(self.pieces, 4500)
+
+        optimizer = WasteCuttingStockOptimizer(12000, 2, max_joints=2)
+        console = io.StringIO()
+        with redirect_stdout(console):
+            job = OptimizationJob(optimizer, self.pieces, 4500).start()
+            result = job.wait(timeout=30)
+        events = job.poll()
+
+        self.assertEqual(console.getvalue(), "", "FAIL: Solver messages should go to the event queue")
+        self.assertEqual(list(result.patterns), list(expected.patterns),
+            "FAIL: The background solve should give the same plan")
+        kinds = [event.kind for event in events]
+        self.assertEqual(kinds[-1], 'done', f"FAIL: The last event should be 'done', got {kinds[-1]}")
+        self.assertEqual(kinds.count('progress'), result.bar_count, "FAIL: Expected one progress event per bar")
+        self.assertIn('log', kinds, "FAIL: Joint planning messages should be posted as log events")
+        self.assertIs(events[-1].result, result, "FAIL: The 'done' event should carry the result")
+        self.assertIsNone(optimizer.log_hook, "FAIL: The log hook should be removed after the job")
+
+    def test_002_cancel_and_errors(self):
+        """Test: un job annullato restituisce un piano parziale, un errore arriva come evento."""
+        optimizer = StrictCuttingStockOptimizer(6000, 3)
+        job = OptimizationJob(optimizer, [(2500, 60), (1800, 90), (700, 150)])
+        job.cancel()
+        job.start()
+        result = job.wait(timeout=30)
+        self.assertTrue(result.partial, "FAIL: A cancelled job should return a partial plan")
+        self.assertGreater(result.remaining_count, 0, "FAIL: A cancelled job should leave pieces uncut")
+
+        failing = OptimizationJob(StrictCuttingStockOptimizer(6000, 3), [(1000, 1)], method='nope').start()
+        with self.assertRaises(ValueError, msg="FAIL: wait() should re-raise the solver error"):
+            failing.wait(timeout=30)
+
+        widget, received = FakeTk(), []
+        attach_to_tk(widget, failing, received.append, max_events=1)
+        widget.run()
+        self.assertEqual(received[-1].kind, 'error', "FAIL: The tkinter pump should stop at the 'error' event")
+        self.assertIsInstance(received[-1].error, ValueError, "FAIL: The event should carry the exception")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import unittest
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from optimization_service import MAX_PIECES, OptimizationService, ServiceBusy, parse_request, solve_request
+
+
+REQUEST = {
+    "stock_length": 6000,
+    "blade_width": 2,
+    "longer_than": 4500,
+    "max_joints": 2,
+    "pieces": [[8535, 2, "P10"], [1200, 5, "P15"], [948, 5]],
+}
+
+
+class TestOptimizationService(unittest.TestCase):
+    def setUp(self):
+        """Setup comune per i test."""
+        self.executor = ThreadPoolExecutor(max_workers=2)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_001_identical_requests_share_one_solve(self):
+        """Test: richieste identiche concorrenti condividono un'unica ottimizzazione."""
+        service = OptimizationService(max_workers=2, executor=self.executor)
+        request = parse_request(REQUEST)
+
+        async def run():
+            return await asyncio.gather(*(service.submit('optimize', request) for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        self.assertEqual(service.solves, 1,
+            f"FAIL: Expected 1 solve for identical requests, but got {service.solves}")
+        self.assertEqual(service.coalesced, 4,
+            f"FAIL: Expected 4 coalesced requests, but got {service.coalesced}")
+        self.assertTrue(all(result is results[0] for result in results),
+            "FAIL: Coalesced requests should receive the same result")
+        self.assertGreater(results[0]['summary']['bars'], 0,
+            "FAIL: Expected at least one bar in the result")
+
+    def test_002_backpressure(self):
+        """Test: la coda piena rifiuta le nuove richieste."""
+        service = OptimizationService(max_workers=1, max_pending=1, executor=self.executor)
+        first = parse_request(REQUEST)
+        second = parse_request(dict(REQUEST, stock_length=12000))
+
+        async def run():
+            task = asyncio.ensure_future(service.submit('optimize', first))
+            await asyncio.sleep(0)
+            with self.assertRaises(ServiceBusy):
+                await service.submit('optimize', second)
+            return await task
+
+        result = asyncio.run(run())
+        self.assertEqual(service.pending, 0,
+            f"FAIL: Expected empty queue after completion, but got {service.pending}")
+        self.assertIn('patterns', result, "FAIL: The accepted request should complete")
+
+    def test_003_http_roundtrip(self):
+        """Test: richiesta HTTP completa su /optimize e gestione degli errori."""
+        service = OptimizationService(max_workers=2, executor=self.executor)
+
+        async def post(port, path, body):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(
+                f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, _, payload = response.partition(b'\r\n\r\n')
+            return int(head.split(b' ')[1]), payload
+
+        async def run():
+            server = await service.start('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                ok = await post(port, '/optimize', json.dumps(REQUEST).encode())
+                bad = await post(port, '/optimize', b'{"pieces": []}')
+                missing = await post(port, '/unknown', b'')
+            return ok, bad, missing
+
+        (status, payload), (bad_status, _), (missing_status, _) = asyncio.run(run())
+
+        self.assertEqual(status, 200, f"FAIL: Expected status 200, but got {status}")
+        data = json.loads(payload)
+        cut_count = sum(len(pattern['cuts']) for pattern in data['patterns'])
+        self.assertGreaterEqual(cut_count, 12,
+            f"FAIL: Expected at least 12 cuts in the plan, but got {cut_count}")
+        self.assertEqual(bad_status, 400, f"FAIL: Expected status 400, but got {bad_status}")
+        self.assertEqual(missing_status, 404, f"FAIL: Expected status 404, but got {missing_status}")
+
+    def test_004_content_length_validation(self):
+        """Test: Content-Length mancante o non valido dà 411 o 400, non un errore interno."""
+        service = OptimizationService(max_workers=2, executor=self.executor)
+        body = json.dumps(REQUEST).encode()
+        cases = [
+            (b"Content-Length: abc\r\n", 400),
+            (b"Content-Length: -5\r\n", 400),
+            (b"Content-Length: +12\r\n", 400),
+            (b"Content-Length: 1_000\r\n", 400),
+            (b"", 411),
+        ]
+
+        async def send(port, header):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"POST /optimize HTTP/1.1\r\nHost: localhost\r\n" + header + b"\r\n" + body)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return int(response.split(b' ')[1])
+
+        async def run():
+            server = await service.start('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return [await send(port, header) for header, _ in cases]
+
+        for (header, expected), status in zip(cases, asyncio.run(run())):
+            self.assertEqual(status, expected,
+                f"FAIL: Expected status {expected} for header {header!r}, but got {status}")
+        self.assertEqual(service.solves, 0, "FAIL: Invalid requests should not reach the optimizer")
+
+    def test_005_request_ranges(self):
+        """Test: valori fuori intervallo nel corpo della richiesta vengono rifiutati."""
+        bad = {
+            'negative length': dict(REQUEST, pieces=[[-100, 2000]]),
+            'zero length': dict(REQUEST, pieces=[[0, 200000]], blade_width=0),
+            'negative stock': dict(REQUEST, stock_length=-5.0),
+            'zero stock': dict(REQUEST, stock_length=0),
+            'negative blade': dict(REQUEST, blade_width=-1),
+            'negative qty': dict(REQUEST, pieces=[[1200, -3]]),
+            'fractional qty': dict(REQUEST, pieces=[[1200, 2.5]]),
+            'boolean qty': dict(REQUEST, pieces=[[1200, True]]),
+            'string length': dict(REQUEST, pieces=[["1200", 2]]),
+            'infinite stock': dict(REQUEST, stock_length=float('inf')),
+            'too many pieces': dict(REQUEST, pieces=[[1200, MAX_PIECES + 1]]),
+            'too many segments': dict(REQUEST, pieces=[[6000 * 10, MAX_PIECES // 10 + 1]]),
+        }
+        for name, payload in bad.items():
+            with self.subTest(name):
+                with self.assertRaises(ValueError, msg=f"FAIL: '{name}' should be rejected"):
+                    parse_request(payload)
+
+        # Pezzi più lunghi della barra e quantità 0 restano validi
+        request = parse_request(dict(REQUEST, pieces=[[8535, 2, "P10"], [1200, 0]]))
+        self.assertEqual(request['pieces'], [(8535.0, 2, "P10"), (1200.0, 0)],
+            f"FAIL: Unexpected normalized pieces {request['pieces']}")
+
+    def test_006_time_limit_on_many_small_pieces(self):
+        """Test: time_limit ferma anche la costruzione di una barra con moltissimi pezzi."""
+        request = parse_request(dict(REQUEST, stock_length=12000, blade_width=0, pieces=[[1, MAX_PIECES // 2]]))
+        start = time.monotonic()
+        result = solve_request('optimize', request, time_limit=0.3)
+        elapsed = time.monotonic() - start
+        self.assertLess(elapsed, 3.0, f"FAIL: The solve ignored the time limit and took {elapsed:.2f}s")
+        self.assertTrue(result['summary']['partial'], "FAIL: A stopped solve should report a partial plan")
+
+    def test_007_slow_and_malformed_clients(self):
+        """Test: un client lento riceve 408 e una riga di header troppo lunga 400."""
+        service = OptimizationService(max_workers=2, executor=self.executor, read_timeout=0.2)
+
+        async def send(port, data):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(data)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return int(response.split(b' ')[1])
+
+        async def run():
+            server = await service.start('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                slow = await send(port, b"POST /optimize HTTP/1.1\r\nHost: local")
+                long_header = await send(port, b"GET /health HTTP/1.1\r\nX-Long: " + b"a" * 100_000 + b"\r\n\r\n")
+            return slow, long_header
+
+        slow, long_header = asyncio.run(run())
+        self.assertEqual(slow, 408, f"FAIL: Expected status 408 for a stalled client, but got {slow}")
+        self.assertEqual(long_header, 400, f"FAIL: Expected status 400 for an over-long header, but got {long_header}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import redirect_stdout
+from cutting_stock_optimizer import CuttingPattern, MarkedPiece, PieceRole
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+from pattern_library import PatternLibrary
+
+
+class TestPatternLibrary(unittest.TestCase):
+    def setUp(self):
+        """Setup comune per i test."""
+        self.directory = tempfile.mkdtemp()
+        self.pieces = [(1990, 40, 'A'), (1495, 36, 'B'), (2995, 20, 'C'), (995, 30, 'D')]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _library(self, **kwargs):
+        return PatternLibrary('IPE 100', 6000, 2, directory=self.directory, **kwargs)
+
+    def test_001_warm_start_recurring_order(self):
+        """Test: un ordine ricorrente viene coperto dai pattern registrati nelle esecuzioni precedenti."""
+        first = WasteCuttingStockOptimizer(6000, 2)
+        first.pattern_library = self._library()
+        with redirect_stdout(io.StringIO()):
+            expected = first.optimize_with_waste(self.pieces, 4500)
+        self.assertEqual(first.library_bars, 0, "FAIL: An empty library should not cover any bar")
+        self.assertTrue(os.path.exists(first.pattern_library.path), "FAIL: The library should be saved to disk")
+
+        second = WasteCuttingStockOptimizer(6000, 2)
+        second.pattern_library = self._library()
+        self.assertGreater(len(second.pattern_library), 0, "FAIL: Patterns should be reloaded from disk")
+        with redirect_stdout(io.StringIO()):
+            result = second.optimize_with_waste(self.pieces, 4500)
+
+        self.assertGreater(second.library_bars, result.bar_count // 2,
+            f"FAIL: Expected most bars from the library, but got {second.library_bars} of {result.bar_count}")
+        self.assertLessEqual(result.bar_count, expected.bar_count,
+            f"FAIL: Expected at most {expected.bar_count} bars, but got {result.bar_count}")
+        cuts = Counter(cut.mark for pattern in result.patterns for cut in pattern.cuts)
+        self.assertEqual(cuts, Counter({mark: qty for _, qty, mark in self.pieces}),
+            "FAIL: Every piece should be cut once with its own mark")
+
+    def test_002_recording_rules(self):
+        """Test: si registrano solo pattern ad alta resa, validi e senza giunzioni."""
+        library = self._library(min_usage=0.9, max_patterns=2)
+        recorded = library.record([
+            CuttingPattern([2995, 2995], 8),
+            CuttingPattern([1990, 1990, 1990], 24),
+            CuttingPattern([1000], 5000),
+            CuttingPattern([MarkedPiece(3000, 'A'), MarkedPiece(2990, 'B', role=PieceRole.JOINT, segments=2)], 8),
+            CuttingPattern([1995, 1995, 1995], 9),
+        ])
+        self.assertEqual(recorded, 3, f"FAIL: Expected 3 recorded patterns, but got {recorded}")
+        self.assertEqual(list(library.patterns), [(2995.0, 2995.0), (1995.0, 1995.0, 1995.0)],
+            "FAIL: Only the most efficient patterns should be kept")
+        self.assertEqual(library.columns([2995, 1995, 500]), [(2, 0, 0), (0, 3, 0)],
+            "FAIL: Columns should count each known length")
+
+        other = PatternLibrary('IPE 100', 7000, 2, directory=self.directory)
+        library.save()
+        self.assertEqual(len(PatternLibrary('IPE 100', 7000, 2, directory=self.directory)), 0,
+            "FAIL: Patterns for another stock length should be ignored")
+        self.assertEqual(len(other), 0, "FAIL: A new library should start empty")
+
+
+if __name__ == "__main__":
+    unittest.main()
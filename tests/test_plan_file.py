@@ -0,0 +1,92 @@
+import unittest
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from cutting_stock_optimizer import StrictCuttingStockOptimizer
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+from cutting_stock_optimizer import CuttingPattern, MarkedPiece
+from plan_result import PlanResult
+from plan_file import save_plan, load_plan
+
+
+class TestPlanFile(unittest.TestCase):
+    def setUp(self):
+        """Setup comune per i test."""
+        handle, self.path = tempfile.mkstemp(suffix=".csop")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_001_roundtrip_with_joints_and_orders(self):
+        """Test: il piano ricaricato coincide con quello salvato, giunzioni e commesse comprese."""
+        optimizer = WasteCuttingStockOptimizer(6000, 2, max_joints=3)
+        with redirect_stdout(io.StringIO()):
+            result = optimizer.optimize_orders(
+                {'C1': [(8535, 3, 'P10'), (1200, 5, 'P15')], 'C2': [(948, 7), (7000, 1, 'X')]}, 4500)
+        save_plan(self.path, result)
+
+        plan = load_plan(self.path)
+        self.assertEqual(plan.bar_count, result.bar_count,
+            f"FAIL: Expected {result.bar_count} bars, but got {plan.bar_count}")
+        self.assertEqual(list(plan.patterns()), list(result.patterns), "FAIL: Reloaded patterns differ")
+        loaded = plan.to_result()
+        self.assertEqual(dict(loaded.joint_combinations), dict(result.joint_combinations),
+            "FAIL: Joint records should survive the roundtrip")
+        self.assertEqual(dict(loaded.remaining), dict(result.remaining), "FAIL: Remaining pieces differ")
+        self.assertAlmostEqual(loaded.total_waste, result.total_waste, places=6,
+            msg="FAIL: Statistics should match after reload")
+        self.assertEqual((plan.stock_length, plan.blade_width, plan.method), (6000, 2, result.method),
+            "FAIL: Plan parameters should be stored in the file")
+        params = (plan.min_waste, plan.max_joints, plan.longer_than)
+        self.assertEqual(params, (100, 3, 4500), f"FAIL: Expected joint parameters (100, 3, 4500), but got {params}")
+        self.assertEqual((loaded.min_waste, loaded.max_joints, loaded.longer_than), params,
+            "FAIL: Joint parameters should survive to_result")
+
+        # Con i parametri ricaricati il piano si riproduce identico
+        again = WasteCuttingStockOptimizer(plan.stock_length, plan.blade_width, min_waste=plan.min_waste,
+                                           max_joints=plan.max_joints)
+        with redirect_stdout(io.StringIO()):
+            again = again.optimize_orders(
+                {'C1': [(8535, 3, 'P10'), (1200, 5, 'P15')], 'C2': [(948, 7), (7000, 1, 'X')]}, plan.longer_than,
+                method=plan.method)
+        self.assertEqual(list(again.patterns), list(plan.patterns()), "FAIL: Stored parameters should reproduce the plan")
+
+    def test_002_plain_lengths_and_bad_file(self):
+        """Test: i tagli senza marca restano float e un file estraneo viene rifiutato."""
+        optimizer = StrictCuttingStockOptimizer(6000, 3)
+        with redirect_stdout(io.StringIO()):
+            result = optimizer.optimize([(1500, 4), (2500, 3), (7000, 1)])
+        save_plan(self.path, result)
+
+        plan = load_plan(self.path)
+        lengths, _, _ = plan.cut_slice(0)
+        self.assertEqual(list(lengths), list(result.patterns[0].cuts), "FAIL: Lazy bar view differs")
+        self.assertTrue(all(not hasattr(cut, 'mark') for cut in plan.cuts(0)),
+            "FAIL: Plain cuts should be reloaded as numbers")
+        self.assertEqual(dict(plan.remaining), dict(result.remaining), "FAIL: Remaining pieces differ")
+        self.assertEqual((plan.min_waste, plan.max_joints, plan.longer_than), (None, None, None),
+            "FAIL: A plan without joints should store no joint parameters")
+        plan.close()
+
+        with open(self.path, 'wb') as f:
+            f.write(b"not a plan")
+        with self.assertRaises(ValueError):
+            load_plan(self.path)
+
+    def test_003_header_length_across_digit_boundaries(self):
+        """Test: le posizioni delle sezioni nell'header sono quelle scritte, anche quando cambiano cifre."""
+        for n_bars in (9, 10, 99, 100, 999, 1000):
+            with self.subTest(bars=n_bars):
+                patterns = [CuttingPattern([MarkedPiece(1000 + i % 7, f"M{i % 13}")], 4999 - i % 7)
+                            for i in range(n_bars)]
+                result = PlanResult(patterns, {MarkedPiece(1234, 'R'): 1}, 6000, 1)
+                save_plan(self.path, result)
+                with load_plan(self.path) as plan:
+                    self.assertEqual(list(plan.patterns()), patterns,
+                        f"FAIL: A plan with {n_bars} bars should reload the same patterns")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from cutting_stock_optimizer import StrictCuttingStockOptimizer, CuttingPattern, MarkedPiece, PieceRole
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+from plan_file import save_plan, load_plan
+from plan_verify import verify_plan
+
+
+class BrokenOptimizer(StrictCuttingStockOptimizer):
+    """Solutore che riporta uno sfrido sbagliato, per il controllo a runtime."""
+
+    def _calculate_waste(self, cuts):
+        return super()._calculate_waste(cuts) + 1
+
+
+class TestPlanVerify(unittest.TestCase):
+    def setUp(self):
+        """Setup comune per i test."""
+        self.orders = {'C1': [(4000, 3, 'P10'), (1200, 1, 'P15')], 'C2': [(5000, 1), (15000, 1, 'X')]}
+        self.pieces = [(piece[0], piece[1], piece[2] if len(piece) > 2 else None, order)
+                       for order, pieces in self.orders.items() for piece in pieces]
+
+    def _solve(self, max_joints=3):
+        optimizer = WasteCuttingStockOptimizer(6000, 2, max_joints=max_joints)
+        optimizer.verify_plans = True
+        with redirect_stdout(io.StringIO()):
+            result = optimizer.optimize_orders(self.orders, 4500)
+        return optimizer, result
+
+    def test_001_valid_plans(self):
+        """Test: i piani dei solutori, con giunzioni, commesse e pezzi sovradimensionati, sono validi."""
+        optimizer, result = self._solve()
+        self.assertTrue(any(cut.role & PieceRole.JOINT for p in result.patterns for cut in p.cuts),
+            "FAIL: The test order should produce joints")
+        self.assertEqual(verify_plan(result, result.remaining, self.pieces, optimizer), [],
+            "FAIL: A solver plan should be valid")
+
+        handle, path = tempfile.mkstemp(suffix=".csop")
+        os.close(handle)
+        try:
+            save_plan(path, result)
+            with load_plan(path) as plan:
+                self.assertEqual(verify_plan(plan, plan.remaining, self.pieces, plan), [],
+                    "FAIL: A plan file should be verified on its mapped sections")
+        finally:
+            os.remove(path)
+
+        strict = StrictCuttingStockOptimizer(6000, 3)
+        strict.verify_plans = True
+        pieces = [(2500, 6), (1800, 9), (700, 15, 'x')]
+        patterns, remaining = strict.optimize(pieces, method='bfd')
+        self.assertEqual(verify_plan(patterns, remaining, pieces, {'stock_length': 6000, 'blade_width': 3}), [],
+            "FAIL: Plain and marked cuts without type ids should be matched by length and mark")
+
+    def test_002_detects_errors(self):
+        """Test: barre troppo piene, sfridi sbagliati, pezzi mancanti o in più e giunzioni incomplete."""
+        optimizer, result = self._solve()
+        patterns = list(result.patterns)
+        first = patterns[0]
+        joint_bar = next(i for i, p in enumerate(patterns) if any(c.role & PieceRole.JOINT for c in p.cuts))
+
+        def problems(patterns, remaining=result.remaining, pieces=self.pieces):
+            return " | ".join(verify_plan(patterns, remaining, pieces, optimizer))
+
+        overfilled = [CuttingPattern(first.cuts + [MarkedPiece(1200, 'P15', 'C1', type_id=1)], 0)] + patterns[1:]
+        self.assertIn("exceed the stock length", problems(overfilled), "FAIL: An overfilled bar should be found")
+        self.assertIn("more times than ordered", problems(overfilled), "FAIL: An extra piece should be found")
+
+        wrong_waste = [CuttingPattern(first.cuts, first.waste + 10)] + patterns[1:]
+        self.assertIn("wrong waste", problems(wrong_waste), "FAIL: A wrong waste should be found")
+
+        self.assertIn("neither cut nor reported", problems(patterns, pieces=self.pieces + [(777, 1)]),
+            "FAIL: A missing piece should be found")
+
+        cuts = [cut for cut in patterns[joint_bar].cuts if not cut.role & PieceRole.JOINT]
+        broken = patterns[:joint_bar] + [CuttingPattern(cuts, optimizer._calculate_waste(cuts))] \
+            + patterns[joint_bar + 1:]
+        self.assertIn("missing segments", problems(broken), "FAIL: An incomplete joint should be found")
+        self.assertIn("do not add up", problems(broken), "FAIL: Joint segments should add up to their piece")
+
+        self.assertIn("match no ordered piece", problems(patterns, {MarkedPiece(999, 'Z'): 1}),
+            "FAIL: An unknown remaining piece should be found")
+
+        broken = BrokenOptimizer(6000, 3)
+        broken.verify_plans = True
+        with self.assertRaises(ValueError, msg="FAIL: The runtime guard should reject an invalid plan"):
+            broken.optimize([(2500, 6), (1800, 9)])
+        broken.verify_plans = False
+        broken.optimize([(2500, 6), (1800, 9)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import io
+import os
+import tempfile
+from collections import Counter
+from contextlib import redirect_stdout
+from cutting_stock_optimizer import StrictCuttingStockOptimizer, PieceRole
+from waste_cutting_optimizer import WasteCuttingStockOptimizer
+from strategies import (PATTERN_STRATEGIES, JOINT_STRATEGIES, IMPROVE_STRATEGIES,
+                        get_strategy, available_strategies)
+from plan_verify import verify_plan
+import cli
+
+
+def _length(cut):
+    return cut.length if hasattr(cut, 'length') else cut
+
+
+class TestStrategyConformance(unittest.TestCase):
+    """Ogni strategia registrata deve rispettare lo stesso contratto."""
+
+    INSTANCES = [
+        [(3000, 4, 'A'), (2500, 6, 'B'), (1200, 9, 'C')],
+        [(5900, 3), (4100, 5), (1950, 7), (800, 11)],
+        [(11000, 2, 'L'), (6000, 3, 'M'), (500, 20, 'S')],
+    ]
+
+    def setUp(self):
+        """Setup comune per i test."""
+        self.stock_length = 12000
+        self.blade_width = 2
+
+    def _check_plan(self, optimizer, patterns, remaining, pieces, label):
+        expected = sum(qty for _, qty, *_ in pieces)
+        placed = sum(len(pattern.cuts) for pattern in patterns)
+        self.assertEqual(placed, expected, f"FAIL: {label} placed {placed} pieces instead of {expected}")
+        self.assertEqual(sum(remaining.values()), 0, f"FAIL: {label} left pieces unplaced")
+        self.assertGreaterEqual(len(patterns), optimizer.lower_bound,
+            f"FAIL: {label} uses fewer bars than the lower bound")
+        for pattern in patterns:
+            used = sum(_length(cut) for cut in pattern.cuts) + (len(pattern.cuts) - 1) * self.blade_width
+            self.assertLessEqual(used, self.stock_length + 1e-6, f"FAIL: {label} overfills a bar")
+            waste = max(0, self.stock_length - used - self.blade_width)
+            self.assertAlmostEqual(pattern.waste, waste, places=6,
+                msg=f"FAIL: {label} reports an inconsistent waste")
+        self.assertEqual(verify_plan(patterns, remaining, pieces, optimizer), [],
+            f"FAIL: {label} produced a plan rejected by verify_plan")
+
+    def test_001_pattern_strategies(self):
+        """Test: tutte le strategie di pattern tagliano tutti i pezzi senza eccedere la barra."""
+        for name in PATTERN_STRATEGIES:
+            for pieces in self.INSTANCES:
+                with self.subTest(strategy=name, pieces=pieces):
+                    optimizer = StrictCuttingStockOptimizer(self.stock_length, self.blade_width)
+                    patterns, remaining = optimizer.optimize(pieces, method=name)
+                    self._check_plan(optimizer, patterns, remaining, pieces, name)
+
+    def test_002_improve_strategies(self):
+        """Test: le strategie di miglioramento non cambiano i tagli e non aggiungono barre."""
+        for name in IMPROVE_STRATEGIES:
+            for pieces in self.INSTANCES:
+                with self.subTest(strategy=name, pieces=pieces):
+                    baseline = StrictCuttingStockOptimizer(self.stock_length, self.blade_width)
+                    before, _ = baseline.optimize(pieces)
+                    optimizer = StrictCuttingStockOptimizer(self.stock_length, self.blade_width)
+                    optimizer.improve = [name]
+                    patterns, remaining = optimizer.optimize(pieces)
+                    self._check_plan(optimizer, patterns, remaining, pieces, name)
+                    self.assertLessEqual(len(patterns), len(before), f"FAIL: {name} added bars")
+                    self.assertEqual(Counter(cut for p in patterns for cut in p.cuts),
+                                     Counter(cut for p in before for cut in p.cuts),
+                                     f"FAIL: {name} changed the set of cuts")
+
+    def test_003_joint_strategies(self):
+        """Test: le strategie di giunzione funzionano con ogni strategia di pattern."""
+        pieces = [(8000, 3, 'A'), (5000, 1, 'B')]
+        for joint in JOINT_STRATEGIES:
+            for method in PATTERN_STRATEGIES:
+                with self.subTest(joint=joint, method=method):
+                    optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2)
+                    optimizer.joint_strategy = joint
+                    with redirect_stdout(io.StringIO()):
+                        patterns, remaining = optimizer.optimize_with_waste(pieces, 4500, method=method)
+                    self.assertEqual(sum(remaining.values()), 0, f"FAIL: {joint}/{method} left pieces unplaced")
+                    cut_total = sum(_length(cut) for p in patterns for cut in p.cuts)
+                    self.assertAlmostEqual(cut_total, 8000 * 3 + 5000, places=2,
+                        msg=f"FAIL: {joint}/{method} changed the total cut length")
+                    self.assertEqual(verify_plan(patterns, remaining, pieces, optimizer), [],
+                        f"FAIL: {joint}/{method} produced a plan rejected by verify_plan")
+                    joined = any(cut.role & PieceRole.JOINT for p in patterns for cut in p.cuts)
+                    self.assertEqual(joined, joint != 'none', f"FAIL: unexpected joints with '{joint}'")
+
+    def test_004_unknown_strategy(self):
+        """Test: un nome sconosciuto solleva ValueError in ogni famiglia e nelle due classi."""
+        for family in available_strategies():
+            with self.assertRaises(ValueError, msg=f"FAIL: unknown {family} strategy accepted"):
+                get_strategy(family, 'does-not-exist')
+        with self.assertRaises(ValueError, msg="FAIL: unknown method accepted by optimize"):
+            StrictCuttingStockOptimizer(self.stock_length, self.blade_width).optimize([(1000, 1)], method='nope')
+        optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width)
+        optimizer.joint_strategy = 'nope'
+        with self.assertRaises(ValueError, msg="FAIL: unknown joint strategy accepted"):
+            with redirect_stdout(io.StringIO()):
+                optimizer.optimize_with_waste([(8000, 2), (5000, 1)], 4500)
+
+    def test_005_cli(self):
+        """Test: la riga di comando legge un CSV e usa le strategie scelte per nome."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.csv')
+            with open(path, 'w') as f:
+                f.write("A,4,3000\nB,6,2500\nC,9,1200\n")
+            out = io.StringIO()
+            with redirect_stdout(out):
+                code = cli.main([path, '--strategy', 'bfd', '--joint-strategy', 'none', '--improve', 'repack'])
+            self.assertEqual(code, 0, "FAIL: The CLI should exit with 0")
+            self.assertIn("Total bars", out.getvalue(), "FAIL: The CLI should print the summary")
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            cli.main(['--list-strategies'])
+        for name in PATTERN_STRATEGIES:
+            self.assertIn(name, out.getvalue(), f"FAIL: --list-strategies should list '{name}'")
+
+
+if __name__ == '__main__':
+    unittest.main()
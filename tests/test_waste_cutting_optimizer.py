@@ -0,0 +1,398 @@
+import unittest
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from cutting_stock_optimizer import PieceRole
+from waste_cutting_optimizer import WasteCuttingStockOptimizer, find_best_combination, plan_joint_assignment, split_oversize
+from plan_verify import verify_plan
+from parallel_joints import JointSearchPool, merge_candidates
+from reportlab import rl_config
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from PDF_cut_list import CuttingListPDF
+from parameter_sweep import parameter_sweep, format_sweep, prepare_pieces
+
+
+class TestWasteCuttingStockOptimizer(unittest.TestCase):
+    def setUp(self):
+        """Setup comune per i test."""
+        self.stock_length = 12000
+        self.blade_width = 2
+
+    def _optimize(self, optimizer, pieces, longer_than, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return optimizer.optimize_with_waste(pieces, longer_than, **kwargs)
+
+    def test_001_joint_eliminates_bar(self):
+        """Test: un pezzo lungo viene giuntato negli scarti di due barre."""
+        optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2)
+        patterns, _ = self._optimize(optimizer, [(8000, 3, 'A'), (5000, 1, 'B')], 4500)
+
+        self.assertEqual(len(patterns), 3, f"FAIL: Expected 3 bars after the joint, but got {len(patterns)}")
+        segments = [cut for pattern in patterns for cut in pattern.cuts if cut.display_mark == 'B/J/2']
+        self.assertEqual(len(segments), 2, f"FAIL: Expected 2 joint segments, but got {len(segments)}")
+        self.assertTrue(all(cut.mark == 'B' for cut in segments), "FAIL: The user mark should not be rewritten")
+        self.assertAlmostEqual(sum(cut.length for cut in segments), 5000, places=2,
+            msg="FAIL: Joint segments should add up to the target length")
+        for pattern in patterns:
+            used = sum(cut.length for cut in pattern.cuts) + (len(pattern.cuts) - 1) * self.blade_width
+            self.assertLessEqual(used, self.stock_length, "FAIL: A bar exceeds the stock length")
+            self.assertGreaterEqual(pattern.waste, 0, "FAIL: Waste should be non-negative")
+
+    def test_002_best_combination_search(self):
+        """Test: la ricerca indicizzata sceglie la copertura con minima eccedenza."""
+        wastes = [150, 900, 1500, 2100, 3000]
+        surplus, indices = find_best_combination(wastes, 3500, 2)
+        self.assertEqual(indices, (2, 3), f"FAIL: Expected indices (2, 3), but got {indices}")
+        self.assertAlmostEqual(surplus, 100, places=6, msg=f"FAIL: Expected surplus 100, but got {surplus}")
+
+        self.assertIsNone(find_best_combination(wastes, 10000, 3),
+            "FAIL: No combination should cover more than the total waste")
+        surplus, indices = find_best_combination(wastes, 5500, 3)
+        self.assertEqual(sum(wastes[i] for i in indices), 6000,
+            f"FAIL: Expected the tightest cover 6000, but got {sum(wastes[i] for i in indices)}")
+
+    def test_003_deadline_returns_partial_plan(self):
+        """Test: con deadline scaduta il piano è parziale ma coerente."""
+        optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=3)
+        pieces = [(8000, 3, 'A'), (5000, 2, 'B'), (1200, 4)]
+        patterns, remaining = self._optimize(optimizer, pieces, 4500, deadline=time.monotonic() - 1)
+
+        self.assertTrue(optimizer.partial, "FAIL: Expired deadline should flag the plan as partial")
+        placed = sum(len(pattern.cuts) for pattern in patterns)
+        self.assertEqual(placed + sum(qty for qty in remaining.values() if qty > 0), 9,
+            "FAIL: Every piece should be either in a pattern or in remaining")
+
+    def test_004_buffered_report(self):
+        """Test: il report viene scritto sul widget con un solo insert e può essere troncato."""
+        class FakeWidget:
+            def __init__(self):
+                self.inserts = []
+            def configure(self, **kwargs):
+                pass
+            def insert(self, index, text):
+                self.inserts.append(text)
+            def see(self, index):
+                pass
+
+        optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2)
+        patterns, remaining = self._optimize(optimizer, [(2500, 40, 'A'), (7000, 5, 'B')], 4500)
+
+        widget = FakeWidget()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            optimizer.print_solution(patterns, remaining, output_widget=widget)
+        self.assertEqual(len(widget.inserts), 1,
+            f"FAIL: Expected a single widget insert, but got {len(widget.inserts)}")
+        self.assertEqual(widget.inserts[0], output.getvalue(),
+            "FAIL: Console and widget should receive the same report")
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            optimizer.print_solution(patterns, remaining, max_lines=10)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 11, f"FAIL: Expected 10 lines plus the truncation note, but got {len(lines)}")
+        self.assertIn("more lines not shown", lines[-1], "FAIL: Truncated report should say so")
+
+    def test_005_multi_order(self):
+        """Test: più commesse condividono le barre e ogni taglio conserva la sua commessa."""
+        orders = {
+            'C1': [(8000, 3, 'A')],
+            'C2': [(5000, 1, 'B')],
+            'C3': [(14000, 1, 'X')],
+        }
+        separate = 0
+        for order, pieces in orders.items():
+            optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2)
+            separate += len(self._optimize(optimizer, pieces, 4500).patterns)
+
+        optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2)
+        with redirect_stdout(io.StringIO()):
+            result = optimizer.optimize_orders(orders, 4500)
+
+        self.assertLess(result.bar_count, separate,
+            f"FAIL: Expected fewer than {separate} bars when pooling orders, but got {result.bar_count}")
+        self.assertEqual(optimizer.orders, ['C1', 'C2', 'C3'], "FAIL: Orders should be kept in input order")
+        cuts = [cut for pattern in result.patterns for cut in pattern.cuts]
+        for cut in cuts:
+            expected = {'A': 'C1', 'B': 'C2', 'X': 'C3'}[cut.mark.split('/')[0]]
+            self.assertEqual(cut.order, expected, f"FAIL: Cut {cut} should belong to order {expected}")
+        self.assertEqual(result.order_counts['C1'], 3, "FAIL: Expected 3 cuts for order C1")
+        self.assertEqual(result.order_counts['C3'], 2, "FAIL: Oversize piece should give 2 cuts for order C3")
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            optimizer.print_solution(*result)
+        self.assertIn("[C2]", output.getvalue(), "FAIL: The report should show the order of each cut")
+
+
+    def test_006_optimize_with_waste_iter(self):
+        """Test: le barre fisse escono subito, quelle giuntate dopo le giunzioni."""
+        optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2)
+        pieces = [(8000, 3, 'A'), (5000, 1, 'B'), (5990, 4, 'C')]
+        with redirect_stdout(io.StringIO()):
+            streamed = list(optimizer.optimize_with_waste_iter(pieces, 4500))
+        result = optimizer.result
+
+        self.assertEqual(len(streamed), result.bar_count,
+            f"FAIL: Expected {result.bar_count} streamed bars, but got {len(streamed)}")
+        self.assertEqual(sorted(map(id, (p for p, _ in streamed))), sorted(map(id, result.patterns)),
+            "FAIL: Streamed bars should be the bars of the final result")
+        first, progress = streamed[0]
+        self.assertLess(first.waste, optimizer.min_waste, "FAIL: Only fixed bars should be yielded before the joints")
+        self.assertEqual([p.bars for _, p in streamed], list(range(1, result.bar_count + 1)),
+            "FAIL: Progress should count the streamed bars")
+        self.assertTrue(any(cut.display_mark == 'B/J/2' for p, _ in streamed[-2:] for cut in p.cuts),
+            "FAIL: Joint bars should be yielded last")
+
+    def test_007_parallel_joint_search(self):
+        """Test: la ricerca delle giunzioni su più processi sceglie come quella seriale."""
+        self.assertEqual(merge_candidates([None, (5.0, (1, 4)), (0.0, (2, 3)), (0.0, (0, 7))]), (0.0, (0, 7)),
+            "FAIL: A perfect fit with the smallest indices should win")
+        self.assertEqual(merge_candidates([(5.0, (3, 4)), (5.0, (1, 9)), (7.0, (0, 1))]), (5.0, (1, 9)),
+            "FAIL: Ties on surplus should go to the smallest indices")
+
+        pieces = [(3800 + 31 * i, 1, f"S{i}") for i in range(20)] + [(5500, 4, 'L')]
+        serial = WasteCuttingStockOptimizer(6000, self.blade_width, max_joints=4)
+        parallel = WasteCuttingStockOptimizer(6000, self.blade_width, max_joints=4, joint_workers=2)
+        parallel.parallel_min_joints = 2
+        parallel.parallel_min_pool = 2
+        expected = self._optimize(serial, pieces, 4500)
+        result = self._optimize(parallel, pieces, 4500)
+
+        self.assertEqual(list(result.patterns), list(expected.patterns),
+            "FAIL: Parallel joint search should give the same plan as the serial one")
+        self.assertEqual(dict(result.joint_combinations), dict(expected.joint_combinations),
+            "FAIL: Parallel joint search should record the same joints")
+        self.assertEqual(result.joint_count, 4, f"FAIL: Expected 4 joints, but got {result.joint_count}")
+        self.assertIsNone(parallel._joint_pool, "FAIL: The process pool should be closed after planning")
+
+    def test_008_parameter_sweep(self):
+        """Test: lo sweep dà gli stessi piani delle singole ottimizzazioni e marca i pareto-ottimi."""
+        pieces = [(8000, 3, 'A'), (5000, 1, 'B'), (13000, 1, 'X'), (3000, 2), (3000, 3)]
+        rows = parameter_sweep(pieces, self.blade_width, [12000, 13500], [4500], [1, 2], [100], workers=2)
+        self.assertEqual(len(rows), 4, f"FAIL: Expected 4 settings, but got {len(rows)}")
+
+        for row in rows:
+            optimizer = WasteCuttingStockOptimizer(row.stock_length, self.blade_width,
+                                                   min_waste=row.min_waste, max_joints=row.max_joints)
+            expected = self._optimize(optimizer, pieces, row.longer_than)
+            self.assertEqual((row.bars, row.joints), (expected.bar_count, expected.joint_count),
+                f"FAIL: Sweep row {row} differs from a direct optimization")
+            self.assertAlmostEqual(row.total_waste, expected.total_waste, places=6,
+                msg=f"FAIL: Sweep row {row} reports a different waste")
+
+        pareto = [row for row in rows if row.pareto]
+        self.assertTrue(pareto, "FAIL: At least one setting should be Pareto-optimal")
+        for row in rows:
+            if not row.pareto:
+                self.assertTrue(any(all(a <= b for a, b in zip(p.objectives(), row.objectives())) for p in pareto),
+                    f"FAIL: Setting {row} should be dominated by a Pareto-optimal one")
+        table = format_sweep(rows)
+        self.assertEqual(sum(line.startswith('*') for line in table[2:-1]), len(pareto),
+            "FAIL: The table should flag every Pareto-optimal setting")
+
+    def test_009_pdf_templates(self):
+        """Test: il PDF riusa un template per ogni layout di box invece di ridisegnarlo per ogni barra."""
+        optimizer = WasteCuttingStockOptimizer(6000, self.blade_width)
+        pieces = [(1990, 60, 'A'), (1495, 40, 'B'), (995, 30)]
+        result = self._optimize(optimizer, pieces, 4500)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'list.pdf')
+            optimizer.generate_pdf(path, num_columns=4)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+        self.assertTrue(data.startswith(b'%PDF'), "FAIL: The output should be a PDF file")
+        layouts = {(len(p.cuts), any(cut.order is not None for cut in p.cuts)) for p in result.patterns}
+        forms = data.count(b'/Subtype /Form')
+        self.assertEqual(forms, len(layouts) + 1,
+            f"FAIL: Expected one template per box layout plus the page header, but got {forms}")
+        self.assertIn(b'/FlateDecode', data, "FAIL: Page streams should be compressed")
+        self.assertNotIn(b'/ASCII85Decode', data, "FAIL: Compressed streams should not be ASCII85 encoded")
+
+    def test_010_piece_roles(self):
+        """Test: ruoli e type_id sostituiscono le marche fittizie e la ricerca per tolleranza."""
+        pieces = [(8000, 3, 'A'), (6000, 1), (6000, 1)]
+        for excluded, joined, mark in ((None, 2, None), ([2], 1, None), ([-1], 1, None), ([1, 2], 0, 'A')):
+            optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2,
+                                                   excluded_to_joint=excluded)
+            patterns, _ = self._optimize(optimizer, pieces, 4500)
+            segments = [cut for pattern in patterns for cut in pattern.cuts if cut.role & PieceRole.JOINT]
+            self.assertEqual(len(segments), 2, f"FAIL: Expected 2 joint segments, but got {len(segments)}")
+            self.assertEqual(segments[0].type_id, joined,
+                f"FAIL: With excluded rows {excluded} the joint should split row {joined}")
+            self.assertTrue(all(cut.mark == mark for cut in segments), "FAIL: Joint segments should keep the row mark")
+            self.assertTrue(all(cut.display_mark.endswith('J/2') for cut in segments),
+                "FAIL: The joint marker should be composed only for display")
+
+        optimizer = WasteCuttingStockOptimizer(6000, self.blade_width)
+        patterns, _ = self._optimize(optimizer, [(14000, 1, 'L'), (1000, 2)], 4500)
+        roles = Counter(cut.display_mark for pattern in patterns for cut in pattern.cuts if cut.role)
+        self.assertEqual(roles, Counter({'L/FULL': 2, 'L/COMP': 1}),
+            "FAIL: An oversize piece should be flagged FULL and COMP, keeping its mark")
+
+    def test_011_long_oversize_split(self):
+        """Test: i pezzi lunghi più barre si dividono in una passata, e il resto va negli scarti."""
+        self.assertEqual(split_oversize(30000, 12000), (2, 6000), "FAIL: 30000 should split into 2 bars + 6000")
+        self.assertEqual(split_oversize(24000, 12000), (2, 0), "FAIL: An exact multiple should have no remainder")
+
+        optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width)
+        pieces = [(30000, 2, 'L'), (24000, 1, 'M'), (5000, 2, 'S')]
+        patterns, remaining = self._optimize(optimizer, pieces, 4500)
+
+        self.assertEqual(sum(remaining.values()), 0, "FAIL: No segment of a long piece should be dropped")
+        self.assertEqual(len(patterns), 8, f"FAIL: Expected 6 full bars + 2 shared bars, but got {len(patterns)}")
+        for length, qty, mark in pieces[:2]:
+            total = sum(cut.length for pattern in patterns for cut in pattern.cuts if cut.mark == mark)
+            self.assertAlmostEqual(total, length * qty, places=2,
+                msg=f"FAIL: The segments of {mark} should add up to its total length")
+        for pattern in patterns:
+            comp = [cut for cut in pattern.cuts if cut.role == PieceRole.COMP]
+            if comp:
+                self.assertEqual(len(pattern.cuts), 2, "FAIL: The remainder should share a bar with other pieces")
+        self.assertEqual(optimizer.joint_combinations['12000.00 + 12000.00 + 6000.00'], 2,
+            "FAIL: Each long piece should record all of its segments")
+
+    def test_012_pdf_columns_do_not_overlap(self):
+        """Test: LUNGH, MARCA, COMM e casella di spunta non si sovrappongono a 3 e 4 colonne."""
+        cases = [
+            [(8535, 'P10/J/2', 'C2024-001'), (12000, 'P14/FULL', 'C2'), (948, None, None)],
+            [(8535, 'P10/J/2', None), (1200, 'P15', None)],
+            [(7807, 'A-VERY-LONG-MARK-NAME-WITH-ROLE/J/3', 'ORDER-2024-0001')],
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            for num_columns in (3, 4):
+                pdf = CuttingListPDF(os.path.join(directory, 'list.pdf'), num_columns=num_columns)
+                for cuts in cases:
+                    with self.subTest(columns=num_columns, cuts=cuts):
+                        has_orders = any(order is not None for _, _, order in cuts)
+                        layout = pdf._text_layout(pdf.box_width, cuts, has_orders)
+                        size = layout.size
+                        length_end = layout.length_x + max(stringWidth("LUNGH", "Helvetica-Bold", size),
+                                                           stringWidth(f"{12000:>6.0f}", "Helvetica", size))
+                        mark_end = layout.mark_x + max(
+                            [stringWidth("MARCA", "Helvetica-Bold", size)] +
+                            [stringWidth(pdf._mark_text(mark, layout.mark_chars), "Courier-Oblique", size)
+                             for _, mark, _ in cuts if mark])
+                        order_start = layout.order_right - max(
+                            [stringWidth("COMM", "Helvetica-Bold", size) if has_orders else 0] +
+                            [stringWidth(str(order), "Helvetica", size * 0.75) for _, _, order in cuts if order])
+                        self.assertLessEqual(length_end, layout.mark_x, "FAIL: LUNGH overlaps MARCA")
+                        self.assertLessEqual(mark_end, order_start, "FAIL: MARCA overlaps COMM")
+                        self.assertLessEqual(layout.order_right, pdf._checkbox_x(pdf.box_width),
+                            "FAIL: COMM overlaps the checkbox")
+                    pdf.add_bar_section(1, cuts)
+                pdf.save()
+
+    def test_013_global_joint_assignment(self):
+        """Test: l'assegnazione globale copre pezzi che le passate greedy lasciano scoperti."""
+        targets = [(0, 1500), (1, 1400), (2, 1300)]
+        wastes = {0: 0, 1: 0, 2: 0, 3: 600, 4: 500, 5: 700, 6: 900, 7: 400}
+        # Dal più lungo e dal più corto la prima combinazione esaurisce gli scarti utili
+        for order in (targets, targets[::-1]):
+            greedy = plan_joint_assignment(order, wastes, 2, 0, 100, node_limit=len(order) + 1)
+            self.assertEqual(len(greedy), 1, f"FAIL: Expected 1 greedy joint, but got {len(greedy)}")
+
+        plan = plan_joint_assignment(targets, wastes, 2, 0, 100)
+        self.assertEqual(len(plan), 2, f"FAIL: Expected 2 joints, but got {plan}")
+        donors = [donor for _, group in plan for donor in group]
+        self.assertEqual(len(donors), len(set(donors)), "FAIL: A waste was used twice")
+        for bar_idx, group in plan:
+            self.assertGreaterEqual(sum(wastes[donor] for donor in group), dict(targets)[bar_idx],
+                f"FAIL: Donors {group} do not cover bar {bar_idx}")
+        self.assertIsNone(plan_joint_assignment(targets, wastes, 2, 0, 100, beat=2),
+            "FAIL: No plan should beat 2 joints")
+
+    def test_014_global_joints_beat_greedy(self):
+        """Test: nell'ottimizzatore il branch and bound elimina una barra in più delle passate greedy."""
+        pieces = [(6750, 2, 'P0'), (10500, 3, 'P1'), (7250, 3, 'P2'), (4000, 3, 'P3'), (9500, 3, 'P4'),
+                  (8000, 3, 'P5'), (3500, 1, 'P6'), (4250, 1, 'P7'), (10000, 3, 'P8')]
+        bars = {}
+        for node_limit in (0, 20_000):
+            optimizer = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=3)
+            optimizer.joint_node_limit = node_limit
+            patterns, remaining = self._optimize(optimizer, pieces, 3000)
+            self.assertEqual(verify_plan(patterns, remaining, pieces, optimizer), [],
+                "FAIL: The jointed plan should verify")
+            bars[node_limit] = len(patterns)
+        self.assertEqual(bars[20_000], bars[0] - 1,
+            f"FAIL: Expected one bar less than greedy ({bars[0]}), but got {bars[20_000]}")
+    def test_015_pdf_save_from_threads(self):
+        """Test: salvataggi concorrenti non lasciano ASCII85 nei PDF né cambiano rl_config.useA85."""
+        use_a85 = rl_config.useA85
+        with tempfile.TemporaryDirectory() as directory:
+            def render(i):
+                pdf = CuttingListPDF(os.path.join(directory, f'list{i}.pdf'), num_columns=4)
+                for bar in range(200):
+                    pdf.add_bar_section(bar + 1, [(1990, 'A', 'C1'), (1495, 'B', None), (995, None, None)])
+                pdf.save()
+                with open(os.path.join(directory, f'list{i}.pdf'), 'rb') as f:
+                    return f.read()
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                outputs = list(executor.map(render, range(16)))
+
+        for data in outputs:
+            self.assertNotIn(b'/ASCII85Decode', data, "FAIL: A concurrent save wrote ASCII85 streams")
+        self.assertEqual(rl_config.useA85, use_a85, "FAIL: rl_config.useA85 should be restored after saving")
+    def test_016_parallel_search_cancel(self):
+        """Test: il cancel_token ferma anche i processi della ricerca parallela."""
+        rng = random.Random(1)
+        wastes = sorted(rng.uniform(100, 3000) for _ in range(120))
+        # Con 6 giunzioni la ricerca completa dura minuti
+        need = 0.5 * sum(wastes[-6:]) + 0.123
+        cancel = threading.Event()
+        with JointSearchPool(2, len(wastes)) as pool:
+            timer = threading.Timer(0.3, cancel.set)
+            timer.start()
+            start = time.monotonic()
+            found = pool.search(wastes, need, 6, should_stop=cancel.is_set)
+            elapsed = time.monotonic() - start
+            timer.cancel()
+            self.assertIsNone(found, "FAIL: A cancelled search should return None")
+            self.assertLess(elapsed, 3.0, f"FAIL: The workers should stop soon after the cancel, but took {elapsed:.2f}s")
+
+            # Il pool resta utilizzabile: il flag viene azzerato alla ricerca successiva
+            self.assertEqual(pool.search(wastes, 3500, 2, should_stop=lambda: False),
+                             find_best_combination(wastes, 3500, 2),
+                             "FAIL: The pool should search normally after a cancel")
+    def test_017_exclusions_on_prepared_pieces(self):
+        """Test: le esclusioni dalle giunzioni valgono anche sui pezzi già preparati dello sweep."""
+        # Il pezzo sovradimensionato in testa aggiunge un segmento: le posizioni non sono più le righe
+        pieces = [(14000, 1, 'O'), (8000, 3, 'A'), (5000, 1, 'B')]
+
+        def jointed_marks(optimizer, order):
+            result = self._optimize(optimizer, order, 4500)
+            return sorted(cut.mark for pattern in result.patterns for cut in pattern.cuts
+                          if cut.role & PieceRole.JOINT)
+
+        for excluded in ([2], [-1]):
+            with self.subTest(excluded=excluded):
+                direct = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2,
+                                                    excluded_to_joint=excluded)
+                expected = jointed_marks(direct, pieces)
+                self.assertNotIn('B', expected, "FAIL: The excluded row should not be jointed")
+
+                prepared, _ = prepare_pieces(pieces, self.stock_length, self.blade_width)
+                swept = WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2,
+                                                   excluded_to_joint=excluded)
+                self.assertEqual(jointed_marks(swept, prepared), expected,
+                    "FAIL: Prepared pieces should be excluded by their original row")
+                self.assertEqual(swept._excluded_types, direct._excluded_types,
+                    f"FAIL: Expected excluded types {direct._excluded_types}, but got {swept._excluded_types}")
+
+        row, = parameter_sweep(pieces, self.blade_width, [self.stock_length], [4500], [2], [100],
+                               workers=1, excluded_to_joint=[-1])
+        direct = self._optimize(WasteCuttingStockOptimizer(self.stock_length, self.blade_width, max_joints=2,
+                                                           excluded_to_joint=[-1]), pieces, 4500)
+        self.assertEqual((row.bars, row.joints), (direct.bar_count, direct.joint_count),
+            f"FAIL: Sweep row {row} differs from a direct optimization with the same exclusion")
+
+if __name__ == "__main__":
+    unittest.main()